@@ -2,15 +2,51 @@
 import os
 from dotenv import load_dotenv
 from flask import Flask, redirect, url_for, flash, render_template
+from flask_login import current_user
 from flask_wtf.csrf import CSRFError
 
 # Importamos extensiones y modelos
 from extensions import login_manager, csrf
-from models import db, Usuario
+from models import db, Usuario, ContadorComentarios
 
-def create_app():
-    """Crea y configura la aplicación Flask con el nuevo estándar."""
+def opciones_pool_bd():
+    """
+    Tamaño del pool de SQLAlchemy por proceso, a partir de variables de entorno.
+    Por defecto escala con los hilos de cada worker (WEB_CONCURRENCY x GUNICORN_THREADS)
+    y, si se define DB_MAX_CONEXIONES, reparte ese presupuesto entre los workers.
+    Con workers gevent el pool no crece con las conexiones de clientes (pueden ser miles):
+    se limita a DB_POOL_GEVENT y los greenlets esperan su turno en la cola del pool. Además
+    DB_MAX_CONEXIONES toma por defecto DB_MAX_CONEXIONES_GEVENT (100): 20 + overflow por cada
+    uno de los 2 x CPU + 1 workers superaría el max_connections por defecto de MySQL (151).
+    """
+    workers = int(os.getenv('WEB_CONCURRENCY', 1))
+    hilos = int(os.getenv('GUNICORN_THREADS', 1))
+    max_conexiones = os.getenv('DB_MAX_CONEXIONES')
+    if os.getenv('GUNICORN_WORKER_CLASS') == 'gevent':
+        hilos = min(int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000)), int(os.getenv('DB_POOL_GEVENT', 20)))
+        max_conexiones = max_conexiones or os.getenv('DB_MAX_CONEXIONES_GEVENT', '100')
+
+    pool_size = int(os.getenv('DB_POOL_SIZE', hilos))
+    max_overflow = int(os.getenv('DB_MAX_OVERFLOW', max(2, hilos // 2)))
+
+    if max_conexiones:
+        por_worker = max(1, int(max_conexiones) // workers)
+        pool_size = min(pool_size, por_worker)
+        max_overflow = max(0, min(max_overflow, por_worker - pool_size))
+
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": int(os.getenv('DB_POOL_TIMEOUT', 30)),
+    }
+
+def create_app(config=None):
+    """
+    Crea y configura la aplicación Flask con el nuevo estándar.
+    'config' permite sobreescribir valores (ej: una BD SQLite para benchmarks).
+    """
     app = Flask(__name__)
+    config = config or {}
     
     # Habilitar extensión 'do' para Jinja2
     app.jinja_env.add_extension('jinja2.ext.do')
@@ -19,30 +55,90 @@ def create_app():
     load_dotenv()
 
     # --- CONFIGURACIÓN DE SEGURIDAD ---
-    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
+    app.config['SECRET_KEY'] = config.get('SECRET_KEY') or os.getenv('SECRET_KEY')
     if not app.config['SECRET_KEY']:
         raise RuntimeError("Error crítico: No se ha configurado SECRET_KEY en el archivo .env")
     
     # --- CONFIGURACIÓN DE BASE DE DATOS ---
-    db_host = os.getenv('MYSQL_HOST')
-    db_port = os.getenv('MYSQL_PORT')
-    db_user = os.getenv('MYSQL_USER')
-    db_pass = os.getenv('MYSQL_PASSWORD')
-    db_name = os.getenv('MYSQL_DB')
-
-    # Validar que los datos mínimos de conexión existan
-    if not all([db_host, db_port, db_user, db_pass, db_name]):
-        raise RuntimeError("Error crítico: Configuración de base de datos incompleta en el archivo .env")
-    
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'mysql+pymysql://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}'
+    # DATABASE_URL (o la config explícita) permite apuntar a otra BD, ej: SQLite local
+    database_url = config.get('SQLALCHEMY_DATABASE_URI') or os.getenv('DATABASE_URL')
+
+    if database_url:
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    else:
+        db_host = os.getenv('MYSQL_HOST')
+        db_port = os.getenv('MYSQL_PORT')
+        db_user = os.getenv('MYSQL_USER')
+        db_pass = os.getenv('MYSQL_PASSWORD')
+        db_name = os.getenv('MYSQL_DB')
+
+        # Validar que los datos mínimos de conexión existan
+        if not all([db_host, db_port, db_user, db_pass, db_name]):
+            raise RuntimeError("Error crítico: Configuración de base de datos incompleta en el archivo .env")
+        
+        app.config['SQLALCHEMY_DATABASE_URI'] = f'mysql+pymysql://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}'
+
+    # Réplicas de solo lectura opcionales (una o varias URL separadas por coma)
+    replica_url = config.get('DATABASE_REPLICA_URL') or os.getenv('DATABASE_REPLICA_URL')
+    if replica_url:
+        from utils.replicas import binds_replicas
+        app.config['SQLALCHEMY_BINDS'] = binds_replicas(replica_url)
+    app.config['REPLICA_VENTANA_ESCRITURA'] = int(os.getenv('REPLICA_VENTANA_ESCRITURA', 10))
+
+    # Notificaciones SSE: cada conexión abierta retiene su hilo o greenlet durante EVENTOS_DURACION_MAX.
+    # Por defecto solo con workers gevent; con 'sync'/'gthread' una pestaña abierta por hilo agotaría
+    # el worker, y el navegador consulta el contador de pendientes cada EVENTOS_SONDEO_INTERVALO segundos.
+    # EVENTOS_SSE=1 lo fuerza (ej: servidor de desarrollo), EVENTOS_SSE=0 lo desactiva.
+    eventos_sse = os.getenv('EVENTOS_SSE')
+    app.config['EVENTOS_SSE_HABILITADO'] = (eventos_sse == '1' if eventos_sse is not None
+                                           else os.getenv('GUNICORN_WORKER_CLASS') == 'gevent')
+    app.config['EVENTOS_SONDEO_INTERVALO'] = int(os.getenv('EVENTOS_SONDEO_INTERVALO', 60))
+    app.config['EVENTOS_DURACION_MAX'] = int(os.getenv('EVENTOS_DURACION_MAX', 300))
+
+    # Claves de idempotencia de formularios: vigencia y espera máxima ante un doble envío simultáneo
+    app.config['IDEMPOTENCIA_TTL'] = int(os.getenv('IDEMPOTENCIA_TTL', 86400))
+    app.config['IDEMPOTENCIA_ESPERA'] = int(os.getenv('IDEMPOTENCIA_ESPERA', 10))
+
+    # Caché de fragmentos de plantillas (en memoria de cada worker)
+    app.config['CACHE_FRAGMENTOS_HABILITADO'] = os.getenv('CACHE_FRAGMENTOS', '1') != '0'
+    app.config['CACHE_FRAGMENTOS_MAX'] = int(os.getenv('CACHE_FRAGMENTOS_MAX', 1000))
+    app.config['CACHE_FRAGMENTOS_TTL'] = int(os.getenv('CACHE_FRAGMENTOS_TTL', 300))
+
+    # Caché de bytecode de plantillas en disco (instance/jinja_cache salvo PLANTILLAS_CACHE_DIR)
+    app.config['PLANTILLAS_CACHE_HABILITADO'] = os.getenv('PLANTILLAS_CACHE', '1') != '0'
+    app.config['PLANTILLAS_CACHE_DIR'] = os.getenv('PLANTILLAS_CACHE_DIR')
+
+    # Listados largos (logs con página ampliada, equipo completo) enviados en flujo por lotes de filas
+    app.config['LISTADOS_FLUJO_HABILITADO'] = os.getenv('LISTADOS_FLUJO', '1') != '0'
+    app.config['LISTADOS_FLUJO_LOTE'] = int(os.getenv('LISTADOS_FLUJO_LOTE', 200))
+
+    # Conteos de los listados paginados: vigencia en caché y tope de filas contadas (más allá, total aproximado)
+    app.config['PAGINACION_CONTEO_TTL'] = int(os.getenv('PAGINACION_CONTEO_TTL', 60))
+    app.config['PAGINACION_CONTEO_MAX'] = int(os.getenv('PAGINACION_CONTEO_MAX', 10000))
+
+    # API de integraciones (/api/v1): filas máximas por página JSON y lote de lectura del NDJSON
+    app.config['API_LIMITE_MAX'] = int(os.getenv('API_LIMITE_MAX', 5000))
+    app.config['API_LOTE'] = int(os.getenv('API_LOTE', 1000))
+
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['MAX_CONTENT_LENGTH'] = 32 * 1024 * 1024 # Límite de 32MB para subidas
+    # Adjuntos de comentarios (por defecto instance/adjuntos; compartido entre todos los workers)
+    app.config['ADJUNTOS_DIR'] = os.getenv('ADJUNTOS_DIR')
 
     # Configuración de Pool para estabilidad (Evita que las conexiones MySQL mueran por inactividad)
     app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
         "pool_pre_ping": True,
         "pool_recycle": 280
     }
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('mysql'):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"].update(opciones_pool_bd())
+    elif os.getenv('GUNICORN_WORKER_CLASS') == 'gevent' and app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        # La espera de bloqueo de SQLite no cede el turno: un greenlet que espera la escritura
+        # detiene al que tiene el bloqueo (mismo proceso) y ambos terminan en 'database is locked'
+        app.logger.warning("Workers gevent con SQLite: las escrituras concurrentes fallan. Usar MySQL o workers gthread.")
+
+    # Sobreescrituras explícitas (tienen prioridad sobre el .env)
+    app.config.update(config)
 
     # --- INICIALIZACIÓN DE EXTENSIONES ---
     db.init_app(app)
@@ -54,6 +150,30 @@ def create_app():
     login_manager.login_message = 'Por favor, inicia sesión para acceder al Libro de Novedades.'
     login_manager.login_message_category = 'warning'
 
+    # --- COMANDOS CLI (flask init-db, etc.) ---
+    from comandos import registrar_comandos
+    registrar_comandos(app)
+
+    # --- MÉTRICAS (/metrics, latencia por endpoint, pool de BD) ---
+    from utils.metricas import init_metricas
+    init_metricas(app)
+
+    # --- PERFILADOR POR MUESTREO (fracción configurable o cabecera X-Perfilar firmada) ---
+    from utils.perfilador import init_perfilador
+    init_perfilador(app)
+
+    # --- CACHÉ DE FRAGMENTOS ({% cache %} en plantillas) ---
+    from utils.cache import init_cache
+    init_cache(app)
+
+    # --- PLANTILLAS (caché de bytecode compartida entre workers y despliegues) ---
+    from utils.plantillas import init_plantillas
+    init_plantillas(app)
+
+    # --- PAGINACIÓN (conteos en caché para los listados) ---
+    from utils.paginacion import init_paginacion
+    init_paginacion(app)
+
     # --- REGISTRO DE BLUEPRINTS ---
     from blueprints.auth import auth_bp 
     app.register_blueprint(auth_bp)
@@ -73,12 +193,32 @@ def create_app():
     from blueprints.unidad import unidad_bp
     app.register_blueprint(unidad_bp)
 
+    from blueprints.api import api_bp
+    app.register_blueprint(api_bp)
+
     # --- RUTAS GLOBALES ---
     @app.route('/')
     def index():
         # Redirige siempre al login inicial
         return redirect(url_for('auth.login')) 
     
+    # --- CONTEXTO GLOBAL DE PLANTILLAS ---
+    @app.context_processor
+    def contadores_encabezado():
+        """Pendientes del usuario para el badge del encabezado (solo consulta si la plantilla lo usa)."""
+        def pendientes_usuario():
+            if not current_user.is_authenticated:
+                return 0
+            contador = db.session.get(ContadorComentarios, current_user.id)
+            return contador.pendientes if contador else 0
+        return {'pendientes_usuario': pendientes_usuario}
+
+    from utils.idempotencia import generar_clave_idempotencia
+    app.jinja_env.globals['clave_idempotencia'] = generar_clave_idempotencia
+
+    from utils.contadores import firma_contadores
+    app.jinja_env.globals['firma_contadores'] = firma_contadores
+
     # --- ERRORES Y CACHÉ ---
     @app.errorhandler(CSRFError)
     def handle_csrf_error(e):
@@ -87,7 +227,12 @@ def create_app():
     
     @app.after_request
     def add_header(response):
-        """Desactiva el caché para evitar problemas de seguridad al volver atrás en el navegador"""
+        """
+        Desactiva el caché para evitar problemas de seguridad al volver atrás en el navegador.
+        Se respeta el Cache-Control que ya defina la respuesta (ej: APIs con ETag, archivos estáticos).
+        """
+        if 'Cache-Control' in response.headers:
+            return response
         response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
         response.headers['Pragma'] = 'no-cache'
         response.headers['Expires'] = '-1'
@@ -114,13 +259,11 @@ def load_user(user_id):
     return Usuario.query.get(int(user_id))
 
 if __name__ == '__main__':
+    # Servidor de desarrollo. En producción usar: gunicorn -c gunicorn.conf.py wsgi:app
+    from comandos import inicializar_bd
+
     app = create_app()
     with app.app_context():
-        # Crea las tablas según models.py si no existen
-        try:
-            db.create_all()
-            print("✅ Libro de Novedades inicializado. Tablas verificadas en MySQL.")
-        except Exception as e:
-            print(f"❌ Error al conectar con BD: {e}")
-            
+        inicializar_bd()
+
     app.run(debug=True)
\ No newline at end of file
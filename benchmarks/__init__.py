@@ -0,0 +1,10 @@
+# benchmarks/__init__.py
+"""
+Herramientas de medición del Libro de Novedades.
+
+- datos.py: generador de datos sintéticos (árbol organizacional, comentarios y logs).
+- suite.py: benchmark reproducible de las vistas principales con el cliente de pruebas de Flask.
+- carga.py / servidores.py: prueba de carga del cambio de turno (dev server vs gunicorn).
+- arranque.py: costo de arranque por worker (tiempo, RSS y módulos de create_app()).
+- replica.py: verificación del enrutamiento primaria/réplica con dos BD locales.
+"""
@@ -0,0 +1,96 @@
+# benchmarks/arranque.py
+"""
+Mide el costo de arranque de un worker: tiempo de importación + create_app(),
+memoria residente (RSS) y módulos cargados.
+
+Cada medición corre en un intérprete nuevo (subproceso) para partir de cero.
+El modo 'diferido' es el comportamiento actual; el modo 'anticipado' importa además
+las librerías de reportes antes de create_app(), como ocurría cuando libro.py cargaba
+fpdf al importarse. La diferencia entre ambos es el ahorro por worker.
+
+Uso:
+    python -m benchmarks.arranque --repeticiones 5 --salida arranque.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.estadisticas import resumen_latencias
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Librerías que solo se necesitan al generar reportes
+LIBRERIAS_REPORTES = ['fpdf', 'fpdf.enums']
+
+SCRIPT = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+for nombre in {precargar!r}:
+    __import__(nombre)
+from app import create_app
+create_app({{'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SECRET_KEY': 'benchmark'}})
+duracion = time.perf_counter() - inicio
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss_kb //= 1024
+print(json.dumps({{
+    'tiempo_ms': duracion * 1000,
+    'rss_kb': rss_kb,
+    'modulos': len(sys.modules),
+    'reportes_cargados': [m for m in {reportes!r} if m in sys.modules],
+}}))
+"""
+
+
+def medir_una_vez(precargar):
+    codigo = SCRIPT.format(precargar=precargar, reportes=LIBRERIAS_REPORTES)
+    salida = subprocess.check_output([sys.executable, '-c', codigo], cwd=RAIZ, text=True)
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def medir_modo(precargar, repeticiones):
+    muestras = [medir_una_vez(precargar) for _ in range(repeticiones)]
+    return {
+        'tiempo_ms': resumen_latencias([m['tiempo_ms'] for m in muestras]),
+        'rss_kb_max': max(m['rss_kb'] for m in muestras),
+        'rss_kb_min': min(m['rss_kb'] for m in muestras),
+        'modulos': muestras[-1]['modulos'],
+        'reportes_cargados': muestras[-1]['reportes_cargados'],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Costo de arranque de create_app() por worker.')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--salida', help='Archivo JSON de salida (por defecto stdout).')
+    args = parser.parse_args(argv)
+
+    resultados = {
+        'diferido': medir_modo([], args.repeticiones),
+        'anticipado': medir_modo(LIBRERIAS_REPORTES, args.repeticiones),
+    }
+    diferido, anticipado = resultados['diferido'], resultados['anticipado']
+    resultados['ahorro_por_worker'] = {
+        'tiempo_ms_p50': round(anticipado['tiempo_ms']['p50'] - diferido['tiempo_ms']['p50'], 2),
+        'rss_kb': anticipado['rss_kb_min'] - diferido['rss_kb_min'],
+        'modulos': anticipado['modulos'] - diferido['modulos'],
+    }
+
+    if diferido['reportes_cargados']:
+        print(f"⚠️  create_app() sigue cargando {diferido['reportes_cargados']} al arrancar.", file=sys.stderr)
+    ahorro = resultados['ahorro_por_worker']
+    print(f"🚀 Ahorro por worker: {ahorro['tiempo_ms_p50']} ms, {ahorro['rss_kb'] / 1024:.1f} MB RSS, "
+          f"{ahorro['modulos']} módulos", file=sys.stderr)
+
+    salida = json.dumps(resultados, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(salida)
+    else:
+        print(salida)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+# benchmarks/carga.py
+"""
+Generador de carga que reproduce el "cambio de turno": ráfaga de inicios de sesión,
+apertura de mi_libro_novedades y aceptación de los comentarios pendientes en ver_comentario.
+
+Trabaja contra una app ya levantada (dev server, gunicorn, etc.). Cada usuario virtual
+tiene su propia sesión (cookies) y obtiene el csrf_token de cada formulario antes de enviarlo.
+Solo usa la librería estándar.
+
+Uso (con datos de benchmarks/datos.py):
+    python -m benchmarks.carga --url http://127.0.0.1:5000 --usuarios 200 --concurrencia 20 --salida carga.json
+"""
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+
+from benchmarks.estadisticas import resumen_latencias
+
+RE_CSRF = re.compile(r'name="csrf_token" value="([^"]+)"')
+# En la tabla de pendientes el enlace al folio es el botón "Ver y Responder"
+RE_PENDIENTE = re.compile(r'href="[^"]*/comentario/ver/(\d+)"[^>]*>\s*Ver y Responder')
+
+
+class Registro:
+    """Acumula latencias y errores por paso del escenario (seguro entre hilos)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pasos = {}
+
+    def anotar(self, paso, latencia_ms, ok, detalle=None):
+        with self._lock:
+            datos = self.pasos.setdefault(paso, {'latencias': [], 'errores': 0, 'detalle_errores': {}})
+            datos['latencias'].append(latencia_ms)
+            if not ok:
+                datos['errores'] += 1
+                if detalle:
+                    datos['detalle_errores'][detalle] = datos['detalle_errores'].get(detalle, 0) + 1
+
+
+class UsuarioVirtual:
+    """Sesión HTTP independiente (cookies propias) de un funcionario simulado."""
+
+    def __init__(self, base_url, registro, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.registro = registro
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+    def pedir(self, paso, ruta, datos=None):
+        """Ejecuta una petición (siguiendo redirecciones) y devuelve (url_final, html) o None si falla."""
+        cuerpo = urllib.parse.urlencode(datos, doseq=True).encode() if datos is not None else None
+        inicio = time.perf_counter()
+        try:
+            with self.opener.open(self.base_url + ruta, data=cuerpo, timeout=self.timeout) as respuesta:
+                html = respuesta.read().decode('utf-8', errors='replace')
+                url_final = respuesta.geturl()
+            self.registro.anotar(paso, (time.perf_counter() - inicio) * 1000, True)
+            return url_final, html
+        except urllib.error.HTTPError as e:
+            self.registro.anotar(paso, (time.perf_counter() - inicio) * 1000, False, f'HTTP {e.code}')
+        except (urllib.error.URLError, OSError) as e:
+            self.registro.anotar(paso, (time.perf_counter() - inicio) * 1000, False, type(e).__name__)
+        return None
+
+    def ejecutar_turno(self, email, password, max_aceptaciones):
+        # 1. Inicio de sesión (GET para obtener el token CSRF + POST)
+        resultado = self.pedir('login_form', '/login')
+        if not resultado:
+            return
+        token = RE_CSRF.search(resultado[1])
+        resultado = self.pedir('login', '/login', {
+            'csrf_token': token.group(1) if token else '',
+            'email': email,
+            'password': password,
+        })
+        if not resultado:
+            return
+        if urllib.parse.urlparse(resultado[0]).path.endswith('/login'):
+            # Volvió al login: credenciales inválidas o CSRF rechazado
+            self.registro.anotar('login_rechazado', 0, False, email)
+            return
+
+        # 2. Apertura del libro de novedades
+        resultado = self.pedir('mi_libro_novedades', '/libro_novedades')
+        if not resultado:
+            return
+        pendientes = RE_PENDIENTE.findall(resultado[1])[:max_aceptaciones]
+
+        # 3. Aceptación de cada comentario pendiente
+        for folio in pendientes:
+            resultado = self.pedir('ver_comentario', f'/comentario/ver/{folio}')
+            if not resultado:
+                continue
+            token = RE_CSRF.search(resultado[1])
+            self.pedir('aceptar_comentario', f'/comentario/ver/{folio}', {
+                'csrf_token': token.group(1) if token else '',
+                'tomo_conocimiento': 'on',
+                'observacion_funcionario': 'Aceptado en prueba de carga.',
+            })
+
+
+def ejecutar_carga(base_url, credenciales, concurrencia, rampa=0.0, max_aceptaciones=5, timeout=30):
+    """
+    Ejecuta el escenario para cada (email, password) con 'concurrencia' usuarios simultáneos.
+    'rampa' reparte los inicios en esa cantidad de segundos (0 = ráfaga total).
+    """
+    registro = Registro()
+    intervalo = rampa / len(credenciales) if credenciales and rampa else 0
+
+    def turno(indice_credencial):
+        indice, (email, password) = indice_credencial
+        if intervalo:
+            espera = indice * intervalo - (time.perf_counter() - inicio)
+            if espera > 0:
+                time.sleep(espera)
+        UsuarioVirtual(base_url, registro, timeout).ejecutar_turno(email, password, max_aceptaciones)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        list(pool.map(turno, enumerate(credenciales)))
+    duracion = time.perf_counter() - inicio
+
+    total_peticiones = sum(len(d['latencias']) for d in registro.pasos.values())
+    total_errores = sum(d['errores'] for d in registro.pasos.values())
+    return {
+        'url': base_url,
+        'usuarios': len(credenciales),
+        'concurrencia': concurrencia,
+        'rampa_s': rampa,
+        'duracion_s': round(duracion, 3),
+        'peticiones': total_peticiones,
+        'errores': total_errores,
+        'tasa_error': round(total_errores / total_peticiones, 4) if total_peticiones else 0,
+        'rendimiento_rps': round(total_peticiones / duracion, 2) if duracion else 0,
+        'pasos': {
+            paso: {
+                'peticiones': len(datos['latencias']),
+                'errores': datos['errores'],
+                'detalle_errores': datos['detalle_errores'],
+                'latencia_ms': resumen_latencias(datos['latencias']),
+            }
+            for paso, datos in registro.pasos.items()
+        },
+    }
+
+
+def imprimir_resumen(resultado, salida=sys.stderr):
+    print(f"\n🚦 {resultado['usuarios']} usuarios, concurrencia {resultado['concurrencia']} "
+          f"en {resultado['duracion_s']}s → {resultado['rendimiento_rps']} req/s, "
+          f"tasa de error {resultado['tasa_error']:.2%}", file=salida)
+    print(f"{'paso':24} {'peticiones':>10} {'errores':>8} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}", file=salida)
+    for paso, datos in resultado['pasos'].items():
+        latencias = datos['latencia_ms']
+        print(f"{paso:24} {datos['peticiones']:>10} {datos['errores']:>8} "
+              f"{latencias.get('p50', '-'):>10} {latencias.get('p95', '-'):>10} {latencias.get('p99', '-'):>10}",
+              file=salida)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prueba de carga del cambio de turno.')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--usuarios', type=int, default=100, help='Cantidad de funcionarios simulados.')
+    parser.add_argument('--desde', type=int, default=1, help='Primer correlativo de funcionario a usar.')
+    parser.add_argument('--patron-email', default='funcionario{}@bench.local')
+    parser.add_argument('--password', default='Benchmark123')
+    parser.add_argument('--archivo-credenciales', help='CSV "email,password" (reemplaza el patrón).')
+    parser.add_argument('--concurrencia', type=int, default=10)
+    parser.add_argument('--rampa', type=float, default=0.0, help='Segundos para repartir los inicios de sesión.')
+    parser.add_argument('--max-aceptaciones', type=int, default=5, help='Pendientes a aceptar por usuario.')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--salida', help='Archivo JSON de salida (por defecto stdout).')
+    args = parser.parse_args(argv)
+
+    if args.archivo_credenciales:
+        with open(args.archivo_credenciales, encoding='utf-8') as f:
+            credenciales = [tuple(linea.strip().split(',', 1)) for linea in f if linea.strip()]
+    else:
+        credenciales = [(args.patron_email.format(n), args.password)
+                        for n in range(args.desde, args.desde + args.usuarios)]
+
+    resultado = ejecutar_carga(args.url, credenciales, args.concurrencia, args.rampa,
+                               args.max_aceptaciones, args.timeout)
+    imprimir_resumen(resultado)
+
+    salida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(salida)
+    else:
+        print(salida)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+# benchmarks/datos.py
+"""
+Generador de datos sintéticos para pruebas de rendimiento.
+
+Construye un árbol organizacional realista (Establecimiento -> Unidad -> Usuario)
+sobre una BD local (MySQL o SQLite) y lo llena con comentarios y logs usando
+INSERT masivos por bloques. Es determinista: la misma semilla genera los mismos datos.
+
+Uso:
+    python -m benchmarks.datos --db-url sqlite:///benchmark.db --comentarios 1000000 --logs 1000000
+
+Todos los usuarios comparten la clave indicada en --password. Los correos siguen
+el patrón admin@bench.local, jefa@bench.local, recinto<E>@bench.local,
+unidad<E>_<U>@bench.local y funcionario<N>@bench.local.
+
+--niveles N encadena N Encargados de Unidad por unidad (unidad<E>_<U>, unidad<E>_<U>_n2, ...,
+cada uno jefe directo del siguiente) y los funcionarios dependen del último: jerarquías
+profundas para medir es_superior_jerarquico y la consulta recursiva de subordinados.
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from models import (db, Rol, Establecimiento, Unidad, CalidadJuridica, Categoria,
+                    Factor, SubFactor, Usuario, Comentario, Log)
+
+ROLES = ['Admin', 'Jefa Salud', 'Encargado de Recinto', 'Encargado de Unidad', 'Funcionario']
+CALIDADES = ['Planta', 'Contrata', 'Honorarios']
+CATEGORIAS = ['A', 'B', 'C', 'D', 'E', 'F']
+FACTORES = {
+    'Competencia': ['Conocimiento del cargo', 'Calidad del trabajo', 'Iniciativa'],
+    'Comportamiento': ['Trabajo en equipo', 'Trato al usuario', 'Probidad'],
+    'Condiciones Personales': ['Asistencia', 'Puntualidad', 'Presentación personal'],
+    'Rendimiento': ['Cumplimiento de metas', 'Oportunidad', 'Cantidad de trabajo'],
+}
+ACCIONES_LOG = ['Inicio de Sesión', 'Cierre de Sesión', 'Creación de Comentario',
+                'Aceptación de Comentario', 'Login Fallido', 'Edición Usuario']
+NOMBRES = ['Ana', 'Luis', 'María', 'José', 'Camila', 'Pedro', 'Valentina', 'Diego', 'Javiera', 'Felipe']
+APELLIDOS = ['González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva', 'Martínez', 'Sepúlveda']
+
+TAMANO_BLOQUE = 10000
+
+
+def _rut(numero):
+    """RUT chileno válido (con dígito verificador) a partir de un correlativo."""
+    cuerpo = 10_000_000 + numero
+    suma, factor = 0, 2
+    for digito in reversed(str(cuerpo)):
+        suma += int(digito) * factor
+        factor = 2 if factor == 7 else factor + 1
+    dv = 11 - (suma % 11)
+    dv = {11: '0', 10: 'K'}.get(dv, str(dv))
+    return f'{cuerpo}-{dv}'
+
+
+def _insertar_por_bloques(modelo, filas, etiqueta):
+    """Inserta un iterable de diccionarios en bloques, con un commit por bloque."""
+    bloque, total, inicio = [], 0, time.perf_counter()
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) >= TAMANO_BLOQUE:
+            db.session.execute(insert(modelo), bloque)
+            db.session.commit()
+            total += len(bloque)
+            bloque = []
+            print(f"   {etiqueta}: {total} filas ({time.perf_counter() - inicio:.1f}s)", end='\r')
+    if bloque:
+        db.session.execute(insert(modelo), bloque)
+        db.session.commit()
+        total += len(bloque)
+    print(f"   {etiqueta}: {total} filas ({time.perf_counter() - inicio:.1f}s)")
+    return total
+
+
+def generar_catalogos():
+    """Crea roles, catálogos y factores. Devuelve los ids necesarios para el resto."""
+    roles = {nombre: Rol(nombre=nombre) for nombre in ROLES}
+    db.session.add_all(roles.values())
+    db.session.add_all(CalidadJuridica(nombre=n) for n in CALIDADES)
+    db.session.add_all(Categoria(nombre=n) for n in CATEGORIAS)
+    for nombre_factor, subfactores in FACTORES.items():
+        factor = Factor(nombre=nombre_factor)
+        factor.subfactores = [SubFactor(nombre=n) for n in subfactores]
+        db.session.add(factor)
+    db.session.commit()
+
+    return {
+        'roles': {r.nombre: r.id for r in roles.values()},
+        'calidades': [c.id for c in CalidadJuridica.query.all()],
+        'categorias': [c.id for c in Categoria.query.all()],
+        'subfactores': [s.id for s in SubFactor.query.all()],
+    }
+
+
+def generar_organizacion(rng, catalogos, establecimientos, unidades, funcionarios, password_hash, niveles=1):
+    """
+    Genera el árbol Jefa Salud -> Encargado de Recinto -> Encargado de Unidad (x niveles) -> Funcionario.
+    Los ids se asignan explícitamente para poder insertar todo en bloque.
+    Devuelve la lista de (usuario_id, jefe_directo_id) de quienes pueden recibir comentarios.
+    """
+    roles = catalogos['roles']
+    usuarios, unidades_filas, establecimientos_filas = [], [], []
+    relaciones = []
+    siguiente_id = [0]
+
+    def nuevo_usuario(email, rol, establecimiento_id=None, unidad_id=None, jefe_id=None, segundo_jefe_id=None):
+        siguiente_id[0] += 1
+        uid = siguiente_id[0]
+        usuarios.append({
+            'id': uid,
+            'rut': _rut(uid),
+            'nombre_completo': f'{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)} {uid}',
+            'email': email,
+            'password_hash': password_hash,
+            'activo': rng.random() > 0.03,
+            'cambio_clave_requerido': False,
+            'rol_id': roles[rol],
+            'establecimiento_id': establecimiento_id,
+            'unidad_id': unidad_id,
+            'calidad_juridica_id': rng.choice(catalogos['calidades']),
+            'categoria_id': rng.choice(catalogos['categorias']),
+            'jefe_directo_id': jefe_id,
+            'segundo_jefe_id': segundo_jefe_id,
+        })
+        if jefe_id:
+            relaciones.append((uid, jefe_id))
+        return uid
+
+    nuevo_usuario('admin@bench.local', 'Admin')
+    jefa_id = nuevo_usuario('jefa@bench.local', 'Jefa Salud')
+
+    unidad_id, numero_funcionario = 0, 0
+    encargados_unidad = []
+    for e in range(1, establecimientos + 1):
+        establecimientos_filas.append({'id': e, 'nombre': f'CESFAM Sintético {e}'})
+        recinto_id = nuevo_usuario(f'recinto{e}@bench.local', 'Encargado de Recinto', e, None, jefa_id)
+        for u in range(1, unidades + 1):
+            unidad_id += 1
+            unidades_filas.append({'id': unidad_id, 'nombre': f'Unidad {u} - CESFAM {e}', 'establecimiento_id': e})
+            encargado_id = nuevo_usuario(f'unidad{e}_{u}@bench.local', 'Encargado de Unidad', e, unidad_id, recinto_id)
+            for nivel in range(2, niveles + 1):
+                encargado_id = nuevo_usuario(f'unidad{e}_{u}_n{nivel}@bench.local', 'Encargado de Unidad',
+                                             e, unidad_id, encargado_id)
+            encargados_unidad.append(encargado_id)
+            for _ in range(funcionarios):
+                numero_funcionario += 1
+                # ~10% de los funcionarios tiene un segundo jefe de otra unidad
+                segundo = rng.choice(encargados_unidad) if rng.random() < 0.1 else None
+                nuevo_usuario(f'funcionario{numero_funcionario}@bench.local', 'Funcionario',
+                              e, unidad_id, encargado_id, segundo if segundo != encargado_id else None)
+
+    db.session.execute(insert(Establecimiento), establecimientos_filas)
+    db.session.execute(insert(Unidad), unidades_filas)
+    db.session.commit()
+    # Los ids son correlativos y cada jefe se crea antes que sus subordinados,
+    # así la FK reflexiva (jefe_directo_id / segundo_jefe_id) se respeta bloque a bloque
+    _insertar_por_bloques(Usuario, usuarios, 'Usuarios')
+    return relaciones
+
+
+def generar_comentarios(rng, relaciones, subfactores, cantidad, anios):
+    hoy = date.today()
+    for _ in range(cantidad):
+        funcionario_id, jefe_id = rng.choice(relaciones)
+        fecha = hoy - timedelta(days=rng.randrange(anios * 365))
+        aceptada = rng.random() < 0.85
+        yield {
+            'tipo': 'Favorable' if rng.random() < 0.7 else 'Desfavorable',
+            'motivo_jefe': f'Comentario sintético generado para pruebas de rendimiento ({fecha.isoformat()}).',
+            'observacion_funcionario': 'Sin observaciones.' if aceptada else None,
+            'estado': 'Aceptada' if aceptada else 'Pendiente',
+            'fecha_creacion': fecha,
+            'fecha_aceptacion': datetime.combine(fecha, datetime.min.time()) + timedelta(days=rng.randrange(1, 10)) if aceptada else None,
+            'funcionario_id': funcionario_id,
+            'jefe_id': jefe_id,
+            'subfactor_id': rng.choice(subfactores),
+        }
+
+
+def generar_logs(rng, total_usuarios, cantidad, anios):
+    ahora = datetime.now()
+    for _ in range(cantidad):
+        usuario_id = rng.randint(1, total_usuarios)
+        yield {
+            'timestamp': ahora - timedelta(seconds=rng.randrange(anios * 365 * 86400)),
+            'usuario_id': usuario_id,
+            'usuario_nombre': f'Usuario {usuario_id}',
+            'accion': rng.choice(ACCIONES_LOG),
+            'detalles': 'Registro sintético para pruebas de rendimiento.',
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Genera datos sintéticos para el Libro de Novedades.')
+    parser.add_argument('--db-url', default='sqlite:///benchmark.db',
+                        help='URL SQLAlchemy de la BD destino (por defecto SQLite en instance/).')
+    parser.add_argument('--establecimientos', type=int, default=5)
+    parser.add_argument('--unidades', type=int, default=8, help='Unidades por establecimiento.')
+    parser.add_argument('--funcionarios', type=int, default=25, help='Funcionarios por unidad.')
+    parser.add_argument('--niveles', type=int, default=1,
+                        help='Encargados de Unidad encadenados por unidad (jerarquía de niveles + 3).')
+    parser.add_argument('--comentarios', type=int, default=100000)
+    parser.add_argument('--logs', type=int, default=100000)
+    parser.add_argument('--anios', type=int, default=5, help='Años de historia a simular.')
+    parser.add_argument('--password', default='Benchmark123')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--reiniciar', action='store_true', help='Elimina y recrea todas las tablas antes de generar.')
+    args = parser.parse_args(argv)
+    if args.niveles < 1:
+        parser.error('--niveles debe ser al menos 1.')
+
+    rng = random.Random(args.semilla)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': args.db_url, 'SECRET_KEY': 'benchmark'})
+
+    with app.app_context():
+        if args.reiniciar:
+            db.drop_all()
+        db.create_all()
+        if Usuario.query.first() is not None:
+            raise SystemExit("❌ La BD ya tiene usuarios. Usa --reiniciar para regenerarla.")
+
+        inicio = time.perf_counter()
+        print("🌱 Generando catálogos y organización...")
+        catalogos = generar_catalogos()
+        relaciones = generar_organizacion(rng, catalogos, args.establecimientos, args.unidades,
+                                          args.funcionarios, generate_password_hash(args.password), args.niveles)
+        total_usuarios = len(relaciones) + 2
+
+        print("🌱 Generando comentarios y logs...")
+        _insertar_por_bloques(Comentario, generar_comentarios(rng, relaciones, catalogos['subfactores'],
+                                                              args.comentarios, args.anios), 'Comentarios')
+        _insertar_por_bloques(Log, generar_logs(rng, total_usuarios, args.logs, args.anios), 'Logs')
+
+        print("🌱 Calculando contadores de comentarios...")
+        from utils.contadores import reparar_contadores
+        reparar_contadores()
+
+        print(f"✅ Datos generados en {time.perf_counter() - inicio:.1f}s "
+              f"({total_usuarios} usuarios, {args.comentarios} comentarios, {args.logs} logs).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+# benchmarks/estadisticas.py
+"""Funciones de resumen compartidas por las herramientas de medición."""
+import math
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano (valores no vacíos)."""
+    ordenados = sorted(valores)
+    # Rango = ceil(p/100 * n); round() redondea al par (0.5 -> 0) y desplazaba el índice
+    indice = max(0, min(len(ordenados) - 1, math.ceil(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def resumen_latencias(latencias_ms):
+    """Resume una lista de latencias en milisegundos (min, media, percentiles y max)."""
+    if not latencias_ms:
+        return {}
+    return {
+        'min': round(min(latencias_ms), 3),
+        'media': round(sum(latencias_ms) / len(latencias_ms), 3),
+        'p50': round(percentil(latencias_ms, 50), 3),
+        'p90': round(percentil(latencias_ms, 90), 3),
+        'p95': round(percentil(latencias_ms, 95), 3),
+        'p99': round(percentil(latencias_ms, 99), 3),
+        'max': round(max(latencias_ms), 3),
+    }
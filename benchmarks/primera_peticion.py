@@ -0,0 +1,94 @@
+# benchmarks/primera_peticion.py
+"""
+Mide la latencia de la primera petición de un worker recién creado (la que paga
+compilar base.html, _macros.html y la página) y la compara con una petición en régimen.
+
+Cada medición corre en un intérprete nuevo. Modos:
+  frio       sin caché de bytecode ni calentamiento (comportamiento anterior)
+  bytecode   caché de bytecode llena ('flask precompilar-plantillas' en el despliegue)
+  calentado  caché de bytecode + calentar_worker() antes de la petición (post_worker_init)
+
+Uso:
+    python -m benchmarks.primera_peticion --db-url sqlite:///instance/benchmark.db --repeticiones 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.estadisticas import resumen_latencias
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import json, time
+from app import create_app
+from benchmarks.suite import _login, _sujetos
+app = create_app({{'SQLALCHEMY_DATABASE_URI': {db_url!r}, 'SECRET_KEY': 'benchmark', 'WTF_CSRF_ENABLED': False,
+                  'PLANTILLAS_CACHE_HABILITADO': {cache!r}, 'PLANTILLAS_CACHE_DIR': {directorio!r}}})
+if {precompilar!r}:
+    from utils.plantillas import cargar_plantillas
+    cargar_plantillas(app)
+    raise SystemExit
+sujetos = _sujetos(app)
+if {calentar!r}:
+    from utils.plantillas import calentar_worker
+    calentar_worker(app)
+cliente = app.test_client()
+_login(cliente, sujetos['funcionario'][1], {password!r})
+tiempos = []
+for _ in range(2):
+    inicio = time.perf_counter()
+    cliente.get('/libro_novedades')
+    tiempos.append((time.perf_counter() - inicio) * 1000)
+print(json.dumps({{'primera_ms': tiempos[0], 'regimen_ms': tiempos[1]}}))
+"""
+
+MODOS = {
+    'frio': {'cache': False, 'calentar': False},
+    'bytecode': {'cache': True, 'calentar': False},
+    'calentado': {'cache': True, 'calentar': True},
+}
+
+
+def ejecutar(db_url, password, directorio, cache, calentar, precompilar=False):
+    codigo = SCRIPT.format(db_url=db_url, password=password, directorio=directorio,
+                           cache=cache, calentar=calentar, precompilar=precompilar)
+    salida = subprocess.check_output([sys.executable, '-c', codigo], cwd=RAIZ, text=True)
+    return json.loads(salida.strip().splitlines()[-1]) if not precompilar else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Latencia de la primera petición por worker.')
+    parser.add_argument('--db-url', default='sqlite:///' + os.path.join(RAIZ, 'instance', 'benchmark.db'))
+    parser.add_argument('--password', default='Benchmark123')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--salida', help='Archivo JSON de salida (por defecto stdout).')
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    with tempfile.TemporaryDirectory(prefix='jinja_cache_') as directorio:
+        ejecutar(args.db_url, args.password, directorio, cache=True, calentar=False, precompilar=True)
+        for nombre, modo in MODOS.items():
+            muestras = [ejecutar(args.db_url, args.password, directorio, **modo) for _ in range(args.repeticiones)]
+            resultados[nombre] = {
+                'primera_ms': resumen_latencias([m['primera_ms'] for m in muestras]),
+                'regimen_ms': resumen_latencias([m['regimen_ms'] for m in muestras]),
+            }
+
+    for nombre, r in resultados.items():
+        print(f"⏱️  {nombre:10} primera p50 {r['primera_ms']['p50']:.1f} ms | "
+              f"en régimen p50 {r['regimen_ms']['p50']:.1f} ms", file=sys.stderr)
+
+    salida = json.dumps(resultados, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(salida)
+    else:
+        print(salida)
+
+
+if __name__ == '__main__':
+    main()
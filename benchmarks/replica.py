@@ -0,0 +1,101 @@
+# benchmarks/replica.py
+"""
+Verifica el enrutamiento primaria/réplica con dos BD locales independientes
+(ej: dos archivos SQLite o dos instancias MySQL), contando las consultas de cada engine.
+
+Como las BD no están replicadas entre sí, también se ve qué datos lee cada vista:
+una escritura en la primaria no aparece en la réplica.
+
+Uso (con datos de benchmarks/datos.py):
+    cp instance/benchmark.db instance/benchmark_replica.db
+    python -m benchmarks.replica --db-url sqlite:///benchmark.db --replica-url sqlite:///benchmark_replica.db
+"""
+import argparse
+import sys
+import time
+
+from app import create_app
+from models import db, Usuario, Log
+from benchmarks.suite import ContadorConsultas, _sujetos, _login
+
+VENTANA_S = 1
+
+
+def _medir(contadores, accion):
+    antes = {nombre: c.total for nombre, c in contadores.items()}
+    accion()
+    return {nombre: c.total - antes[nombre] for nombre, c in contadores.items()}
+
+
+def ejecutar(db_url, replica_url, password):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': db_url,
+        'DATABASE_REPLICA_URL': replica_url,
+        'REPLICA_VENTANA_ESCRITURA': VENTANA_S,
+        'SECRET_KEY': 'benchmark',
+        'WTF_CSRF_ENABLED': False,
+    })
+    sujetos = _sujetos(app)
+    with app.app_context():
+        contadores = {('primaria' if clave is None else clave): ContadorConsultas(engine)
+                      for clave, engine in db.engines.items()}
+
+    funcionario_id, _ = sujetos['funcionario']
+    _, jefe_email = sujetos['jefe']
+    cliente = app.test_client()
+    _login(cliente, jefe_email, password)
+    time.sleep(VENTANA_S)  # El login registra un log: esperar a que venza la ventana de escritura
+
+    resultados = []
+
+    def verificar(descripcion, consultas, esperado):
+        ok = esperado(consultas)
+        resultados.append(ok)
+        print(f"{'✅' if ok else '❌'} {descripcion}: {consultas}", file=sys.stderr)
+
+    verificar('Vista de solo lectura (libro del funcionario) lee de la réplica',
+              _medir(contadores, lambda: cliente.get(f'/libro_novedades/{funcionario_id}')),
+              lambda c: c['primaria'] == 0 and c['replica1'] > 0)
+
+    verificar('Vista de escritura (crear comentario) usa solo la primaria',
+              _medir(contadores, lambda: cliente.post(f'/crear_comentario/{funcionario_id}', data={
+                  'tipo': 'Favorable', 'subfactor_id': '1', 'motivo_jefe': 'Verificación de réplica.'})),
+              lambda c: c['primaria'] > 0 and c['replica1'] == 0)
+
+    verificar('Justo después de escribir, la vista de solo lectura vuelve a la primaria',
+              _medir(contadores, lambda: cliente.get(f'/libro_novedades/{funcionario_id}')),
+              lambda c: c['primaria'] > 0 and c['replica1'] == 0)
+
+    time.sleep(VENTANA_S)
+    verificar('Vencida la ventana, vuelve a la réplica',
+              _medir(contadores, lambda: cliente.get(f'/libro_novedades/{funcionario_id}')),
+              lambda c: c['primaria'] == 0 and c['replica1'] > 0)
+
+    def lectura_escritura_lectura():
+        with app.test_request_context('/admin/ver_logs'):
+            Usuario.query.first()
+            db.session.add(Log(usuario_nombre='Verificación', accion='Verificación de Réplica'))
+            db.session.flush()
+            db.session.query(Log).order_by(Log.id.desc()).first()
+            db.session.rollback()
+
+    verificar('En una misma sesión, tras escribir se lee de la primaria (1 lectura en réplica)',
+              _medir(contadores, lectura_escritura_lectura),
+              lambda c: c['replica1'] == 1 and c['primaria'] >= 2)
+
+    return all(resultados)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Verifica el enrutamiento de lecturas a la réplica.')
+    parser.add_argument('--db-url', default='sqlite:///benchmark.db')
+    parser.add_argument('--replica-url', default='sqlite:///benchmark_replica.db')
+    parser.add_argument('--password', default='Benchmark123')
+    args = parser.parse_args(argv)
+
+    if not ejecutar(args.db_url, args.replica_url, args.password):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/servidores.py
+"""
+Compara el rendimiento del servidor de desarrollo contra gunicorn (producción)
+ejecutando el escenario de benchmarks/carga.py sobre cada uno.
+
+Cada modo se levanta como subproceso en un puerto libre, contra la misma BD, y usa
+un rango distinto de funcionarios para que todos encuentren comentarios pendientes.
+
+El modo 'gevent' es el mismo gunicorn con GUNICORN_WORKER_CLASS=gevent. Su ventaja aparece
+cuando la petición espera red (MySQL, SMTP): con SQLite las consultas no ceden el turno,
+así que para comparar concurrencia usar una BD MySQL y --concurrencia mayor que --workers.
+
+Uso (con datos de benchmarks/datos.py):
+    python -m benchmarks.servidores --db-url sqlite:///benchmark.db --usuarios 200 --concurrencia 20
+    python -m benchmarks.servidores --db-url mysql+pymysql://... --modos gunicorn gevent --workers 2 --concurrencia 100
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.carga import ejecutar_carga, imprimir_resumen
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODOS = {
+    # Equivalente a 'python app.py' sin el recargador de debug
+    'dev': lambda puerto, args: [sys.executable, '-c',
+                                 f"from app import create_app; create_app().run(port={puerto}, threaded=True)"],
+    'gunicorn': lambda puerto, args: [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                                      '--bind', f'127.0.0.1:{puerto}', '--access-logfile', '/dev/null', 'wsgi:app'],
+}
+MODOS['gevent'] = MODOS['gunicorn']
+# Variables de entorno adicionales por modo
+ENTORNO_MODOS = {
+    'gevent': {'GUNICORN_WORKER_CLASS': 'gevent'},
+}
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _esperar_puerto(puerto, proceso, limite=30):
+    fin = time.time() + limite
+    while time.time() < fin:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"El servidor terminó al iniciar (código {proceso.returncode}).")
+        with socket.socket() as s:
+            if s.connect_ex(('127.0.0.1', puerto)) == 0:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"El servidor no respondió en el puerto {puerto}.")
+
+
+def medir_modo(modo, args, desde):
+    puerto = _puerto_libre()
+    entorno = dict(os.environ, DATABASE_URL=args.db_url, WEB_CONCURRENCY=str(args.workers),
+                   GUNICORN_THREADS=str(args.hilos), GUNICORN_WORKER_CONNECTIONS=str(args.conexiones),
+                   SECRET_KEY=os.getenv('SECRET_KEY', 'benchmark'), **ENTORNO_MODOS.get(modo, {}))
+    proceso = subprocess.Popen(MODOS[modo](puerto, args), cwd=RAIZ, env=entorno,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _esperar_puerto(puerto, proceso)
+        credenciales = [(args.patron_email.format(n), args.password) for n in range(desde, desde + args.usuarios)]
+        return ejecutar_carga(f'http://127.0.0.1:{puerto}', credenciales, args.concurrencia,
+                              args.rampa, args.max_aceptaciones)
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compara servidor de desarrollo vs gunicorn (sync/gthread o gevent).')
+    parser.add_argument('--db-url', default='sqlite:///benchmark.db')
+    parser.add_argument('--modos', nargs='*', default=['dev', 'gunicorn'], choices=sorted(MODOS))
+    parser.add_argument('--workers', type=int, default=4, help='Workers de gunicorn.')
+    parser.add_argument('--hilos', type=int, default=1, help='Hilos por worker de gunicorn.')
+    parser.add_argument('--conexiones', type=int, default=1000, help='Conexiones por worker en el modo gevent.')
+    parser.add_argument('--usuarios', type=int, default=100)
+    parser.add_argument('--desde', type=int, default=1)
+    parser.add_argument('--patron-email', default='funcionario{}@bench.local')
+    parser.add_argument('--password', default='Benchmark123')
+    parser.add_argument('--concurrencia', type=int, default=10)
+    parser.add_argument('--rampa', type=float, default=0.0)
+    parser.add_argument('--max-aceptaciones', type=int, default=3)
+    parser.add_argument('--salida', help='Archivo JSON de salida (por defecto stdout).')
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    for i, modo in enumerate(args.modos):
+        print(f"\n▶ Modo {modo}", file=sys.stderr)
+        resultados[modo] = medir_modo(modo, args, args.desde + i * args.usuarios)
+        imprimir_resumen(resultados[modo])
+
+    salida = json.dumps(resultados, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(salida)
+    else:
+        print(salida)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+# benchmarks/suite.py
+"""
+Benchmark reproducible de las vistas principales del Libro de Novedades.
+
+Usa el cliente de pruebas real de Flask (misma app, mismas plantillas y consultas)
+contra una BD poblada con benchmarks/datos.py y reporta, por escenario:
+percentiles de latencia, consultas SQL por petición y memoria máxima.
+
+Uso:
+    python -m benchmarks.suite --db-url sqlite:///benchmark.db --salida resultados.json
+    python -m benchmarks.suite --comparar base.json resultados.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import event, func
+
+from app import create_app
+from models import db, Usuario, Comentario, Log, Rol
+from benchmarks.estadisticas import resumen_latencias
+
+
+class ContadorConsultas:
+    """Cuenta las sentencias SQL emitidas por el engine mientras está activo."""
+
+    def __init__(self, engine):
+        self.total = 0
+        event.listen(engine, 'before_cursor_execute', self._contar)
+
+    def _contar(self, *args, **kwargs):
+        self.total += 1
+
+
+def _sujetos(app):
+    """Elige usuarios representativos de la BD sintética para cada escenario."""
+    with app.app_context():
+        # El funcionario con más comentarios es el peor caso para su libro y su PDF
+        funcionario_id = db.session.query(Comentario.funcionario_id).join(
+            Usuario, Usuario.id == Comentario.funcionario_id
+        ).filter(Usuario.activo == True).group_by(Comentario.funcionario_id).order_by(
+            func.count().desc()
+        ).limit(1).scalar()
+        funcionario = db.session.get(Usuario, funcionario_id)
+        jefe = funcionario.jefe_directo
+        admin = Usuario.query.join(Usuario.rol).filter(Rol.nombre == 'Admin', Usuario.activo == True).first()
+        return {
+            'funcionario': (funcionario.id, funcionario.email),
+            'jefe': (jefe.id, jefe.email),
+            'admin': (admin.id, admin.email),
+            'totales': {
+                'usuarios': Usuario.query.count(),
+                'comentarios': Comentario.query.count(),
+                'logs': Log.query.count(),
+            }
+        }
+
+
+def _login(cliente, email, password):
+    respuesta = cliente.post('/login', data={'email': email, 'password': password})
+    if respuesta.status_code != 302:
+        raise SystemExit(f"❌ No fue posible iniciar sesión como {email} (HTTP {respuesta.status_code}).")
+
+
+def construir_escenarios(sujetos, password):
+    """Lista de (nombre, email, petición). La petición recibe el cliente y devuelve la respuesta."""
+    funcionario_id, funcionario_email = sujetos['funcionario']
+    _, jefe_email = sujetos['jefe']
+    _, admin_email = sujetos['admin']
+
+    def login_logout(cliente):
+        respuesta = cliente.post('/login', data={'email': funcionario_email, 'password': password})
+        cliente.get('/logout')
+        return respuesta
+
+    return [
+        ('libro.mi_libro_novedades', funcionario_email, lambda c: c.get('/libro_novedades')),
+        ('libro.ver_libro_novedades_funcionario', jefe_email,
+         lambda c: c.get(f'/libro_novedades/{funcionario_id}')),
+        ('libro.generar_pdf', jefe_email, lambda c: c.get(f'/generar_pdf/{funcionario_id}')),
+        ('admin.panel', admin_email, lambda c: c.get('/admin/panel')),
+        ('admin.ver_logs', admin_email, lambda c: c.get('/admin/ver_logs')),
+        ('auth.login', None, login_logout),
+    ]
+
+
+def medir_escenario(app, contador, email, password, peticion, iteraciones, calentamiento):
+    cliente = app.test_client()
+    if email:
+        _login(cliente, email, password)
+
+    for _ in range(calentamiento):
+        peticion(cliente)
+
+    latencias, consultas, estados = [], [], {}
+    for _ in range(iteraciones):
+        antes = contador.total
+        inicio = time.perf_counter()
+        respuesta = peticion(cliente)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(contador.total - antes)
+        estados[respuesta.status_code] = estados.get(respuesta.status_code, 0) + 1
+
+    # La memoria se mide en una pasada aparte: tracemalloc distorsiona las latencias
+    tracemalloc.start()
+    peticion(cliente)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'iteraciones': iteraciones,
+        'latencia_ms': resumen_latencias(latencias),
+        'consultas_por_peticion': {
+            'media': round(sum(consultas) / len(consultas), 2),
+            'max': max(consultas),
+        },
+        'memoria_pico_kb': round(pico / 1024, 1),
+        'estados_http': {str(k): v for k, v in sorted(estados.items())},
+    }
+
+
+def _commit_actual():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(db_url, password, iteraciones, calentamiento, solo=None):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': db_url,
+        'SECRET_KEY': 'benchmark',
+        'WTF_CSRF_ENABLED': False,
+    })
+    sujetos = _sujetos(app)
+    with app.app_context():
+        contador = ContadorConsultas(db.engine)
+        dialecto = db.engine.dialect.name
+
+    resultados = {}
+    for nombre, email, peticion in construir_escenarios(sujetos, password):
+        if solo and nombre not in solo:
+            continue
+        print(f"⏱  {nombre}...", file=sys.stderr)
+        resultados[nombre] = medir_escenario(app, contador, email, password, peticion, iteraciones, calentamiento)
+
+    return {
+        'meta': {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit_actual(),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'dialecto_bd': dialecto,
+            'filas': sujetos['totales'],
+        },
+        'escenarios': resultados,
+    }
+
+
+def comparar(base, actual):
+    """Imprime la variación de p50/p95, consultas y memoria entre dos corridas."""
+    print(f"{'escenario':40} {'p50 ms':>18} {'p95 ms':>18} {'consultas':>14} {'memoria KB':>20}")
+    for nombre, datos in actual['escenarios'].items():
+        previo = base['escenarios'].get(nombre)
+        if not previo:
+            continue
+
+        def celda(a, b):
+            variacion = ((b - a) / a * 100) if a else 0
+            return f"{a:>7} → {b:<7} ({variacion:+.0f}%)"
+
+        print(f"{nombre:40} "
+              f"{celda(previo['latencia_ms']['p50'], datos['latencia_ms']['p50']):>18} "
+              f"{celda(previo['latencia_ms']['p95'], datos['latencia_ms']['p95']):>18} "
+              f"{previo['consultas_por_peticion']['media']:>5} → {datos['consultas_por_peticion']['media']:<5} "
+              f"{celda(previo['memoria_pico_kb'], datos['memoria_pico_kb']):>20}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de las vistas principales del Libro de Novedades.')
+    parser.add_argument('--db-url', default='sqlite:///benchmark.db')
+    parser.add_argument('--password', default='Benchmark123', help='Clave usada al generar los datos.')
+    parser.add_argument('--iteraciones', type=int, default=30)
+    parser.add_argument('--calentamiento', type=int, default=3)
+    parser.add_argument('--solo', nargs='*', help='Ejecuta solo los escenarios indicados.')
+    parser.add_argument('--salida', help='Archivo JSON de salida (por defecto stdout).')
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'ACTUAL'),
+                        help='Compara dos archivos de resultados en lugar de ejecutar.')
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        with open(args.comparar[0]) as f_base, open(args.comparar[1]) as f_actual:
+            comparar(json.load(f_base), json.load(f_actual))
+        return
+
+    resultado = ejecutar(args.db_url, args.password, args.iteraciones, args.calentamiento, args.solo)
+    salida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(salida)
+        print(f"✅ Resultados guardados en {args.salida}", file=sys.stderr)
+    else:
+        print(salida)
+
+
+if __name__ == '__main__':
+    main()
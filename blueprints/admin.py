@@ -1,5 +1,5 @@
 # blueprints/admin.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, abort, current_app, jsonify
 from flask_login import login_required, current_user
 from sqlalchemy import or_
 
@@ -7,11 +7,19 @@ from sqlalchemy import or_
 from models import db, Usuario, Rol, Unidad, Establecimiento, CalidadJuridica, Categoria, Log
 
 # Importamos las utilidades limpias de nuestra nueva carpeta utils
-from utils import admin_required, check_password_change, registrar_log
+from utils import admin_required, check_password_change, registrar_log, solo_lectura
+from utils.cache import incrementar_version
+from utils.idempotencia import idempotente
+from utils.perfilador import CABECERA, generar_token_perfilado, leer_perfil_folded, listar_perfiles
+from utils.paginacion import contar, paginar, paginar_en_flujo
+from utils.plantillas import render_en_flujo
 
 # Creamos el Blueprint
 admin_bp = Blueprint('admin', __name__, template_folder='../templates', url_prefix='/admin')
 
+# Tamaños de página de ver_logs: los mayores que el primero se envían en flujo
+POR_PAGINA_LOGS = (15, 100, 500, 2000)
+
 # --- PROTECCIÓN GLOBAL DEL BLUEPRINT ---
 @admin_bp.before_request
 @login_required
@@ -28,6 +36,7 @@ def before_request():
 # --- RUTAS DE ADMINISTRACIÓN ---
 
 @admin_bp.route('/panel')
+@solo_lectura
 def panel(): # Nombre simplificado a 'panel' siguiendo tu nuevo estándar
     """
     Vista principal del Panel de Administración.
@@ -63,16 +72,16 @@ def panel(): # Nombre simplificado a 'panel' siguiendo tu nuevo estándar
             query = query.filter(Usuario.activo == False)
     
     # Paginación (10 por página)
-    pagination = query.order_by(Usuario.id).paginate(page=page, per_page=10, error_out=False)
+    pagination = paginar(query.order_by(Usuario.id), page, 10, versiones=('usuarios',))
     
     roles_para_filtro = Rol.query.order_by(Rol.nombre).all()
     unidades_para_filtro = Unidad.query.order_by(Unidad.nombre).all()
 
     # Estadísticas Rápidas adaptadas al Libro de Novedades
     stats = {
-        'total_usuarios': Usuario.query.count(),
-        'usuarios_activos': Usuario.query.filter_by(activo=True).count(),
-        'total_unidades': Unidad.query.count()
+        'total_usuarios': contar(Usuario.query, ('usuarios',)),
+        'usuarios_activos': contar(Usuario.query.filter_by(activo=True), ('usuarios',)),
+        'total_unidades': contar(Unidad.query, ('catalogos',))
     }
     
     # Renderizamos apuntando a la nueva carpeta admin/
@@ -86,7 +95,22 @@ def panel(): # Nombre simplificado a 'panel' siguiendo tu nuevo estándar
                         estado_filtro=estado_filtro,
                         stats=stats)
 
+def catalogos_formulario_usuario():
+    """
+    Catálogos de los select de crear/editar usuario. Se entregan como consultas sin ejecutar:
+    la plantilla las recorre solo si el fragmento no está en caché ({% cache %}).
+    """
+    return {
+        'roles': Rol.query.order_by(Rol.nombre),
+        'establecimientos': Establecimiento.query.order_by(Establecimiento.nombre),
+        'calidades': CalidadJuridica.query.order_by(CalidadJuridica.nombre),
+        'categorias': Categoria.query.order_by(Categoria.nombre),
+        # Los jefes no se cargan aquí: el selector los busca en admin.api_jefes (filtrable por estos roles)
+        'roles_jefatura': ROLES_JEFATURA,
+    }
+
 @admin_bp.route('/crear_usuario', methods=['GET', 'POST'])
+@idempotente
 def crear_usuario():
     """Formulario para registrar nuevos usuarios en el sistema."""
     if request.method == 'POST':
@@ -128,36 +152,15 @@ def crear_usuario():
         nuevo_usuario.cambio_clave_requerido = forzar_cambio
         
         db.session.add(nuevo_usuario)
+        incrementar_version('usuarios')
         db.session.commit()
 
         registrar_log(accion="Creación Usuario", detalles=f"Admin creó al usuario {nombre} (RUT: {rut}).")
         flash('Usuario creado con éxito.', 'success')
         return redirect(url_for('admin.panel'))
 
-    # Carga de catálogos para los select del formulario
-    roles = Rol.query.order_by(Rol.nombre).all()
-    unidades = Unidad.query.order_by(Unidad.nombre).all()
-    establecimientos = Establecimiento.query.order_by(Establecimiento.nombre).all()
-    calidades = CalidadJuridica.query.order_by(CalidadJuridica.nombre).all()
-    categorias = Categoria.query.order_by(Categoria.nombre).all()
-    
-    # Filtro complejo para jefes
-    jefes = Usuario.query.join(Usuario.rol).filter(
-        or_(
-            Rol.nombre == 'Jefa Salud',
-            Rol.nombre == 'Encargado de Recinto',
-            Rol.nombre == 'Encargado de Unidad'
-        )
-    ).order_by(Usuario.nombre_completo).all()
-
     # Renderizamos apuntando a la nueva carpeta admin/
-    return render_template('admin/crear_usuario.html', 
-                           roles=roles, 
-                           unidades=unidades, 
-                           establecimientos=establecimientos, 
-                           jefes=jefes,
-                           calidades=calidades, 
-                           categorias=categorias)
+    return render_template('admin/crear_usuario.html', **catalogos_formulario_usuario())
 
 @admin_bp.route('/editar_usuario/<int:id>', methods=['GET', 'POST'])
 def editar_usuario(id):
@@ -196,35 +199,82 @@ def editar_usuario(id):
         if password:
             usuario_a_editar.set_password(password)
         
+        incrementar_version('usuarios')
         db.session.commit()
         registrar_log(accion="Edición Usuario", detalles=f"Admin editó el perfil de {usuario_a_editar.nombre_completo}.")
         flash('Usuario actualizado con éxito.', 'success')
         return redirect(url_for('admin.panel'))
 
-    roles = Rol.query.order_by(Rol.nombre).all()
-    unidades = Unidad.query.order_by(Unidad.nombre).all()
-    establecimientos = Establecimiento.query.order_by(Establecimiento.nombre).all()
-    calidades = CalidadJuridica.query.order_by(CalidadJuridica.nombre).all()
-    categorias = Categoria.query.order_by(Categoria.nombre).all()
-    jefes = Usuario.query.join(Usuario.rol).filter(
-        or_(
-            Rol.nombre == 'Jefa Salud',
-            Rol.nombre == 'Encargado de Recinto',
-            Rol.nombre == 'Encargado de Unidad'
-        )
-    ).order_by(Usuario.nombre_completo).all()
-
     # Renderizamos apuntando a la nueva carpeta admin/
-    return render_template('admin/editar_usuario.html', 
+    return render_template('admin/editar_usuario.html',
                            usuario=usuario_a_editar,
-                           roles=roles, 
-                           unidades=unidades, 
-                           establecimientos=establecimientos, 
-                           calidades=calidades, 
-                           categorias=categorias,
-                           jefes=jefes)
+                           **catalogos_formulario_usuario())
+
+# Roles que pueden ser jefe directo o segundo jefe
+ROLES_JEFATURA = ('Jefa Salud', 'Encargado de Recinto', 'Encargado de Unidad')
+JEFES_POR_PAGINA = 20
+
+@admin_bp.route('/api/jefes')
+@solo_lectura
+def api_jefes():
+    """
+    Jefaturas activas para el selector de los formularios de usuario.
+    Filtra por nombre, rol y establecimiento (más las jefaturas sin establecimiento, como Jefa Salud).
+    La búsqueda por nombre va en dos fases: 'prefijo' (LIKE 'texto%', usa ix_usuarios_rol_nombre)
+    y, agotada esa, 'contiene' (LIKE '%texto%' sin los ya entregados, recorre las jefaturas del rol).
+    Pagina sin COUNT: se pide un registro extra para saber si hay más.
+    """
+    texto = request.args.get('q', '').strip()[:100]
+    rol = request.args.get('rol', '')
+    establecimiento_id = request.args.get('establecimiento_id', type=int)
+    pagina = max(request.args.get('pagina', 1, type=int), 1)
+    fase = 'contiene' if request.args.get('fase') == 'contiene' else 'prefijo'
+
+    roles_ids = db.session.query(Rol.id).filter(Rol.nombre.in_([rol] if rol in ROLES_JEFATURA else ROLES_JEFATURA))
+    query = db.session.query(
+        Usuario.id, Usuario.nombre_completo, Rol.nombre, Establecimiento.nombre
+    ).join(Usuario.rol).outerjoin(Usuario.establecimiento).filter(
+        Usuario.rol_id.in_(roles_ids),
+        Usuario.activo == True
+    )
+    if establecimiento_id:
+        query = query.filter(or_(Usuario.establecimiento_id == establecimiento_id, Usuario.establecimiento_id.is_(None)))
+    query = query.order_by(Usuario.nombre_completo, Usuario.id)
+
+    def pagina_de(consulta, numero):
+        """Filas de la página y si hay más (se pide un registro extra)."""
+        filas = consulta.offset((numero - 1) * JEFES_POR_PAGINA).limit(JEFES_POR_PAGINA + 1).all()
+        return filas[:JEFES_POR_PAGINA], len(filas) > JEFES_POR_PAGINA
+
+    if not texto:
+        filas, hay_mas = pagina_de(query, pagina)
+    else:
+        patron = texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        # LIKE y no ILIKE: la collation de MySQL ya ignora mayúsculas y LOWER() impediría usar el índice
+        prefijo = Usuario.nombre_completo.like(f'{patron}%', escape='\\')
+        contiene = query.filter(Usuario.nombre_completo.like(f'%{patron}%', escape='\\'), ~prefijo)
+        if fase == 'prefijo':
+            filas, hay_mas = pagina_de(query.filter(prefijo), pagina)
+            if not hay_mas:
+                # Prefijo agotado: esta respuesta suma la primera página de 'contiene' y las siguientes siguen ahí
+                fase, pagina = 'contiene', 1
+                adicionales, hay_mas = pagina_de(contiene, 1)
+                filas += adicionales
+        else:
+            filas, hay_mas = pagina_de(contiene, pagina)
+
+    return jsonify({
+        'resultados': [
+            {'id': id_, 'nombre': nombre, 'rol': nombre_rol, 'establecimiento': nombre_establecimiento}
+            for id_, nombre, nombre_rol, nombre_establecimiento in filas
+        ],
+        'pagina': pagina,
+        'fase': fase,
+        'hay_mas': hay_mas,
+    })
 
 @admin_bp.route('/toggle_activo/<int:id>', methods=['POST'])
+@idempotente
 def toggle_activo(id):
     """Habilita o deshabilita a un usuario. Protege al Admin de autodesactivarse."""
     usuario = Usuario.query.get_or_404(id)
@@ -234,6 +284,7 @@ def toggle_activo(id):
         return redirect(url_for('admin.panel'))
         
     usuario.activo = not usuario.activo
+    incrementar_version('usuarios')
     db.session.commit()
     
     accion_realizada = "Activación" if usuario.activo else "Desactivación"
@@ -247,11 +298,15 @@ def toggle_activo(id):
     return redirect(url_for('admin.panel'))
 
 @admin_bp.route('/ver_logs')
+@solo_lectura
 def ver_logs():
     """Muestra el historial de auditoría del sistema."""
     page = request.args.get('page', 1, type=int)
     usuario_filtro_id = request.args.get('usuario_id', '')
     accion_filtro = request.args.get('accion', '')
+    por_pagina = request.args.get('por_pagina', POR_PAGINA_LOGS[0], type=int)
+    if por_pagina not in POR_PAGINA_LOGS:
+        por_pagina = POR_PAGINA_LOGS[0]
 
     query = Log.query.order_by(Log.timestamp.desc())
 
@@ -260,7 +315,12 @@ def ver_logs():
     if accion_filtro:
         query = query.filter(Log.accion == accion_filtro)
         
-    logs_pagination = query.paginate(page=page, per_page=15, error_out=False)
+    # Sin versión: el conteo se renueva por vencimiento
+    if por_pagina > POR_PAGINA_LOGS[0]:
+        logs_pagination, filas = paginar_en_flujo(query, page, por_pagina)
+    else:
+        logs_pagination = paginar(query, page, por_pagina)
+        filas = logs_pagination.items
     todos_los_usuarios = Usuario.query.order_by(Usuario.nombre_completo).all()
     
     # Catálogo de acciones basado en lo que realmente hay en la base de datos
@@ -268,12 +328,41 @@ def ver_logs():
     
     filtros_actuales = {
         'usuario_id': usuario_filtro_id,
-        'accion': accion_filtro
+        'accion': accion_filtro,
+        'por_pagina': por_pagina
     }
 
-    # Renderizamos apuntando a la nueva carpeta admin/
-    return render_template('admin/ver_logs.html',
+    # Renderizamos apuntando a la nueva carpeta admin/ (en flujo con página ampliada)
+    return render_en_flujo('admin/ver_logs.html', filas,
                         pagination=logs_pagination,
+                        opciones_por_pagina=POR_PAGINA_LOGS,
                         todos_los_usuarios=todos_los_usuarios,
                         acciones_posibles=acciones_posibles,
-                        filtros=filtros_actuales)
\ No newline at end of file
+                        filtros=filtros_actuales)
+
+# --- PERFILADOR DE PETICIONES ---
+
+@admin_bp.route('/perfiles', methods=['GET', 'POST'])
+def perfiles():
+    """Lista los perfiles de peticiones muestreadas y genera tokens para la cabecera X-Perfilar."""
+    token = None
+    if request.method == 'POST':
+        token = generar_token_perfilado(current_app, current_user)
+        registrar_log("Token de Perfilado", "Generó un token para perfilar peticiones.")
+
+    return render_template('admin/perfiles.html',
+                        perfiles=listar_perfiles(current_app),
+                        token=token,
+                        cabecera=CABECERA,
+                        fraccion=current_app.config['PERFILADOR_FRACCION'],
+                        habilitado=current_app.config['PERFILADOR_HABILITADO'],
+                        ttl_minutos=current_app.config['PERFILADOR_TOKEN_TTL'] // 60)
+
+@admin_bp.route('/perfiles/<nombre>.folded')
+def descargar_perfil(nombre):
+    """Descarga las pilas agregadas de un perfil (formato folded para flamegraph.pl / speedscope)."""
+    contenido = leer_perfil_folded(current_app, nombre)
+    if contenido is None:
+        abort(404)
+    return Response(contenido, mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment;filename={nombre}.folded'})
@@ -0,0 +1,74 @@
+# blueprints/api.py
+"""API de lectura para integraciones (ver utils/api.py). Solo tokens: no usa la sesión web."""
+from flask import Blueprint, Response, current_app, g, jsonify, request
+
+from models import db
+from utils import solo_lectura
+from utils.api import (
+    LIMITE_POR_DEFECTO, RECURSOS, a_json, codificar_cursor, consulta_recurso, leer_cursor, leer_fecha,
+    lineas_ndjson, sincronizado_hasta, usuario_de_token
+)
+from utils.catalogos import obtener_catalogos, respuesta_json_condicional
+from utils.plantillas import respuesta_en_flujo
+from utils.politicas import alcance_de
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+def error_api(estado, mensaje):
+    respuesta = jsonify({'error': mensaje})
+    respuesta.status_code = estado
+    if estado == 401:
+        respuesta.headers['WWW-Authenticate'] = 'Bearer'
+    return respuesta
+
+# --- AUTENTICACIÓN POR TOKEN ---
+@api_bp.before_request
+def autenticar_token():
+    usuario = usuario_de_token(request.headers.get('Authorization'))
+    if usuario is None:
+        return error_api(401, 'Token ausente, inválido o revocado.')
+    g.alcance_api = alcance_de(usuario)
+
+@api_bp.route('/catalogos')
+@solo_lectura
+def catalogos():
+    return respuesta_json_condicional(obtener_catalogos())
+
+@api_bp.route('/<recurso>')
+@solo_lectura
+def listar(recurso):
+    """
+    Filas de 'recurso' por clave ascendente. Parámetros: campos, cursor (o despues_de), actualizado_desde,
+    limite (JSON paginado) o formato=ndjson (todas las filas restantes en flujo).
+    """
+    if recurso not in RECURSOS:
+        return error_api(404, f"Recurso desconocido. Disponibles: catalogos, {', '.join(RECURSOS)}.")
+
+    try:
+        campos = [c.strip() for c in request.args.get('campos', '').split(',') if c.strip()]
+        if request.args.get('cursor'):
+            despues_de, hasta = leer_cursor(request.args['cursor'])
+        else:
+            despues_de, hasta = request.args.get('despues_de', type=int), sincronizado_hasta()  # Antes de consultar
+        desde = request.args.get('actualizado_desde')
+        consulta, clave = consulta_recurso(recurso, g.alcance_api, campos, despues_de,
+                                           leer_fecha(desde) if desde else None)
+    except PermissionError as e:
+        return error_api(403, str(e))
+    except ValueError as e:
+        return error_api(400, str(e))
+
+    ndjson = (request.args.get('formato') == 'ndjson'
+              or request.accept_mimetypes.best == 'application/x-ndjson')
+    if ndjson:
+        lote = current_app.config['API_LOTE']
+        return respuesta_en_flujo(lambda: lineas_ndjson(db.session.execute(consulta.execution_options(yield_per=lote))),
+                                  'application/x-ndjson', headers={'X-Sincronizado-Hasta': hasta})
+
+    limite = min(max(request.args.get('limite', LIMITE_POR_DEFECTO, type=int), 1), current_app.config['API_LIMITE_MAX'])
+    filas = [dict(f) for f in db.session.execute(consulta.limit(limite + 1)).mappings()]
+    siguiente = filas[limite - 1][clave] if len(filas) > limite else None
+    cuerpo = {'datos': filas[:limite], 'siguiente': siguiente,
+              'cursor': codificar_cursor(siguiente, hasta) if siguiente is not None else None,
+              'sincronizado_hasta': hasta}
+    return Response(a_json(cuerpo), mimetype='application/json')
@@ -2,8 +2,10 @@
 from flask import Blueprint, render_template, request
 from flask_login import login_required, current_user
 from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
 from models import db, Usuario, Rol
-from utils import jefa_required, check_password_change
+from utils import jefa_required, check_password_change, solo_lectura
+from utils.paginacion import paginar
 
 jefa_salud_bp = Blueprint('jefa_salud', __name__, template_folder='../templates', url_prefix='/jefa')
 
@@ -16,11 +18,16 @@ def before_request():
     pass
 
 @jefa_salud_bp.route('/panel')
+@solo_lectura
 def panel_jefa_salud():
     page = request.args.get('page', 1, type=int)
     busqueda = request.args.get('busqueda', '')
 
-    query = Usuario.query.filter(
+    # Contadores y unidad en la misma consulta (sin un COUNT ni un SELECT extra por fila)
+    query = Usuario.query.options(
+        joinedload(Usuario.contadores),
+        joinedload(Usuario.unidad)
+    ).filter(
         Usuario.jefe_directo_id == current_user.id,
         Usuario.rol.has(or_(
             Rol.nombre == 'Encargado de Recinto',
@@ -36,9 +43,7 @@ def panel_jefa_salud():
             )
         )
 
-    encargados = query.order_by(Usuario.nombre_completo).paginate(
-        page=page, per_page=10, error_out=False
-    )
+    encargados = paginar(query.order_by(Usuario.nombre_completo), page, 10, versiones=('usuarios',))
 
     # Actualizado a la subcarpeta jefatura/
     return render_template('jefatura/panel_jefa_salud.html',
@@ -1,17 +1,48 @@
 # blueprints/libro.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, jsonify, abort
+from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, jsonify, abort, current_app
 from flask_login import login_required, current_user
-from datetime import date, datetime
+from datetime import datetime
 import pytz
-from fpdf import FPDF
-from fpdf.enums import XPos, YPos
+from sqlalchemy import insert, update
+from sqlalchemy.orm import joinedload
 
 # Importamos modelos y utilidades
-from models import db, Usuario, Comentario, Factor, SubFactor, Unidad
-from utils import check_password_change, registrar_log, enviar_correo_notificacion_comentario, es_superior_jerarquico
+from models import db, Usuario, Comentario, ComentarioArchivado, Adjunto, Factor, SubFactor, Unidad, ContadorComentarios
+from utils import (
+    check_password_change, registrar_log, enviar_correo_notificacion_comentario,
+    mensaje_notificacion_comentario, encolar_correos, solo_lectura
+)
+from utils.eventos import flujo_sse, preparar_evento_comentario, publicar_eventos
+from utils.contadores import registrar_comentarios_creados, registrar_aceptaciones
+from utils.idempotencia import idempotente
+from utils.politicas import alcance_actual
+from utils.adjuntos import almacenar_adjuntos, registrar_adjuntos, respuesta_adjunto, validar_adjuntos
+from utils.paginacion import paginar
+from utils.plantillas import filas_en_flujo, render_en_flujo
+from utils.catalogos import obtener_catalogos, respuesta_json_condicional
+from utils.archivo import (
+    consulta_comentarios, historial_comentarios, comentarios_reporte, incluye_archivo, ultimo_periodo_archivado
+)
 
 libro_bp = Blueprint('libro', __name__, template_folder='../templates')
 
+# Tope de destinatarios por envío masivo (evita transacciones y lotes SMTP gigantes)
+MAX_DESTINATARIOS_MASIVO = 500
+# Tope de folios por aceptación masiva
+MAX_FOLIOS_ACEPTACION = 200
+
+def url_panel_actual():
+    """URL del panel que corresponde al rol del usuario conectado."""
+    if current_user.rol.nombre == 'Jefa Salud':
+        return url_for('jefa_salud.panel_jefa_salud')
+    elif current_user.rol.nombre == 'Encargado de Recinto':
+        return url_for('recinto.panel_encargado_recinto')
+    elif current_user.rol.nombre == 'Encargado de Unidad':
+        return url_for('unidad.panel_encargado_unidad')
+    elif current_user.rol.nombre == 'Admin':
+        return url_for('admin.panel')
+    return url_for('libro.mi_libro_novedades')
+
 # --- PROTECCIÓN GLOBAL BASE ---
 @libro_bp.before_request
 @login_required
@@ -20,6 +51,7 @@ def before_request():
     pass
 
 @libro_bp.route('/libro_novedades')
+@solo_lectura
 def mi_libro_novedades():
     page = request.args.get('page', 1, type=int)
     tipo_filtro = request.args.get('tipo_filtro', '')
@@ -28,41 +60,34 @@ def mi_libro_novedades():
     fecha_inicio_str = request.args.get('fecha_inicio', '')
     fecha_fin_str = request.args.get('fecha_fin', '')
 
-    query = Comentario.query.filter_by(funcionario_id=current_user.id)
-    if tipo_filtro:
-        query = query.filter(Comentario.tipo == tipo_filtro)
-    if factor_filtro:
-        query = query.join(Comentario.subfactor).filter(SubFactor.factor_id == factor_filtro)
-    if subfactor_filtro:
-        query = query.filter(Comentario.subfactor_id == subfactor_filtro)
+    filtros = dict(tipo=tipo_filtro, factor_id=factor_filtro, subfactor_id=subfactor_filtro)
+    query = consulta_comentarios(Comentario, current_user.id, **filtros)
     
     comentarios_pendientes = query.filter(Comentario.estado == 'Pendiente').order_by(Comentario.folio.desc()).all()
-    historial_query = query.filter(Comentario.estado == 'Aceptada')
-    
+
+    fecha_inicio = fecha_fin = None
     try:
         if fecha_inicio_str:
             fecha_inicio = datetime.strptime(fecha_inicio_str, '%Y-%m-%d').date()
-            historial_query = historial_query.filter(Comentario.fecha_creacion >= fecha_inicio)
         if fecha_fin_str:
             fecha_fin = datetime.strptime(fecha_fin_str, '%Y-%m-%d').date()
-            historial_query = historial_query.filter(Comentario.fecha_creacion <= fecha_fin)
     except ValueError:
         flash("Formato de fecha inválido. Por favor, usa YYYY-MM-DD.", "danger")
         return redirect(request.path) 
 
-    historial_pagination = historial_query.order_by(Comentario.fecha_creacion.desc(), Comentario.folio.desc()).paginate(
-        page=page, per_page=5, error_out=False
-    )
+    # Los periodos archivados solo se leen si el filtro de fechas llega a ellos
+    historial_pagination = historial_comentarios(current_user.id, filtros, fecha_inicio, fecha_fin, page)
+    periodo_archivado = None if incluye_archivo(fecha_inicio, fecha_fin) else ultimo_periodo_archivado()
     
-    factores_para_filtro = [{'id': f.id, 'nombre': f.nombre} for f in Factor.query.order_by(Factor.nombre).all()]
-    subfactores_para_filtro = [{'id': sf.id, 'nombre': sf.nombre, 'factor_id': sf.factor_id} for sf in SubFactor.query.all()]
+    # Solo los factores para el select; los sub-factores los carga filter_helper.js desde /api/catalogos
+    factores_para_filtro = obtener_catalogos()['factores']
 
     # Actualizado a la subcarpeta libro/
     return render_template('libro/mi_libro_novedades.html', 
                         comentarios_pendientes=comentarios_pendientes,
                         historial_pagination=historial_pagination,
+                        periodo_archivado=periodo_archivado,
                         factores_para_filtro=factores_para_filtro,
-                        subfactores_para_filtro=subfactores_para_filtro,
                         tipo_filtro=tipo_filtro,
                         factor_filtro=factor_filtro,
                         subfactor_filtro=subfactor_filtro,
@@ -70,15 +95,12 @@ def mi_libro_novedades():
                         fecha_fin=fecha_fin_str)
 
 @libro_bp.route('/libro_novedades/<int:funcionario_id>')
+@solo_lectura
 def ver_libro_novedades_funcionario(funcionario_id):
     page = request.args.get('page', 1, type=int)
-    funcionario = Usuario.query.get_or_404(funcionario_id)
-    
-    es_admin = (current_user.rol.nombre == 'Admin')
-    es_superior = es_superior_jerarquico(current_user, funcionario)
-
-    if not (es_admin or es_superior):
+    if not alcance_actual().puede_ver(funcionario_id):
         abort(403)
+    funcionario = Usuario.query.get_or_404(funcionario_id)
 
     tipo_filtro = request.args.get('tipo_filtro', '')
     factor_filtro = request.args.get('factor_filtro', '')
@@ -86,42 +108,35 @@ def ver_libro_novedades_funcionario(funcionario_id):
     fecha_inicio_str = request.args.get('fecha_inicio', '')
     fecha_fin_str = request.args.get('fecha_fin', '')
     
-    query = Comentario.query.filter_by(funcionario_id=funcionario.id)
-    if tipo_filtro:
-        query = query.filter(Comentario.tipo == tipo_filtro)
-    if factor_filtro:
-        query = query.join(Comentario.subfactor).filter(SubFactor.factor_id == factor_filtro)
-    if subfactor_filtro:
-        query = query.filter(Comentario.subfactor_id == subfactor_filtro)
+    filtros = dict(tipo=tipo_filtro, factor_id=factor_filtro, subfactor_id=subfactor_filtro)
+    query = consulta_comentarios(Comentario, funcionario.id, **filtros)
 
     comentarios_pendientes = query.filter(Comentario.estado == 'Pendiente').order_by(Comentario.folio.desc()).all()
-    historial_query = query.filter(Comentario.estado == 'Aceptada')
 
+    fecha_inicio = fecha_fin = None
     try:
         if fecha_inicio_str:
             fecha_inicio = datetime.strptime(fecha_inicio_str, '%Y-%m-%d').date()
-            historial_query = historial_query.filter(Comentario.fecha_creacion >= fecha_inicio)
         if fecha_fin_str:
             fecha_fin = datetime.strptime(fecha_fin_str, '%Y-%m-%d').date()
-            historial_query = historial_query.filter(Comentario.fecha_creacion <= fecha_fin)
     except ValueError:
         flash("Formato de fecha inválido. Por favor, usa YYYY-MM-DD.", "danger")
         return redirect(request.path) 
 
-    historial_pagination = historial_query.order_by(Comentario.fecha_creacion.desc(), Comentario.folio.desc()).paginate(
-        page=page, per_page=5, error_out=False
-    )
+    # Los periodos archivados solo se leen si el filtro de fechas llega a ellos
+    historial_pagination = historial_comentarios(funcionario.id, filtros, fecha_inicio, fecha_fin, page)
+    periodo_archivado = None if incluye_archivo(fecha_inicio, fecha_fin) else ultimo_periodo_archivado()
     
-    factores_para_filtro = [{'id': f.id, 'nombre': f.nombre} for f in Factor.query.order_by(Factor.nombre).all()]
-    subfactores_para_filtro = [{'id': sf.id, 'nombre': sf.nombre, 'factor_id': sf.factor_id} for sf in SubFactor.query.all()]
+    # Solo los factores para el select; los sub-factores los carga filter_helper.js desde /api/catalogos
+    factores_para_filtro = obtener_catalogos()['factores']
     
     # Actualizado a la subcarpeta libro/
     return render_template('libro/libro_novedades_funcionario.html', 
                         funcionario=funcionario, 
                         comentarios_pendientes=comentarios_pendientes,
                         historial_pagination=historial_pagination,
+                        periodo_archivado=periodo_archivado,
                         factores_para_filtro=factores_para_filtro,
-                        subfactores_para_filtro=subfactores_para_filtro,
                         tipo_filtro=tipo_filtro,
                         factor_filtro=factor_filtro,
                         subfactor_filtro=subfactor_filtro,
@@ -129,41 +144,14 @@ def ver_libro_novedades_funcionario(funcionario_id):
                         fecha_fin=fecha_fin_str)
 
 @libro_bp.route('/crear_comentario/<int:funcionario_id>', methods=['GET', 'POST'])
+@idempotente
 def crear_comentario(funcionario_id):
     funcionario = Usuario.query.get_or_404(funcionario_id)
 
-    puede_anotar = False
-    # Regla 1: Jefa Salud
-    if (current_user.rol.nombre == 'Jefa Salud' and
-        funcionario.rol.nombre in ['Encargado de Recinto', 'Encargado de Unidad'] and
-        funcionario.jefe_directo_id == current_user.id):
-        puede_anotar = True
-
-    # Regla 2: Encargado de Recinto
-    elif (current_user.rol.nombre == 'Encargado de Recinto' and
-          funcionario.rol.nombre == 'Encargado de Unidad' and
-          funcionario.jefe_directo_id == current_user.id):
-        puede_anotar = True
-
-    # Regla 3: Encargado de Unidad
-    elif (current_user.rol.nombre == 'Encargado de Unidad' and
-          funcionario.rol.nombre == 'Funcionario' and
-          (funcionario.jefe_directo_id == current_user.id or funcionario.segundo_jefe_id == current_user.id)):
-        puede_anotar = True
-        
-    elif current_user.rol.nombre == 'Admin':
-        puede_anotar = True
-
-    if not puede_anotar:
+    # Reglas por rol centralizadas en utils/politicas.py
+    if not alcance_actual().puede_anotar(funcionario.id):
         flash('No tienes permisos para crear comentarios a este usuario.', 'danger')
-        if current_user.rol.nombre == 'Jefa Salud':
-            return redirect(url_for('jefa_salud.panel_jefa_salud'))
-        elif current_user.rol.nombre == 'Encargado de Recinto':
-            return redirect(url_for('recinto.panel_encargado_recinto'))
-        elif current_user.rol.nombre == 'Encargado de Unidad':
-            return redirect(url_for('unidad.panel_encargado_unidad'))
-        else:
-            return redirect(url_for('libro.mi_libro_novedades'))
+        return redirect(url_panel_actual())
 
     if request.method == 'POST':
         chile_tz = pytz.timezone('America/Santiago')
@@ -171,6 +159,14 @@ def crear_comentario(funcionario_id):
         subfactor_id = request.form.get('subfactor_id')
         motivo = request.form.get('motivo_jefe')
 
+        archivos = [a for a in request.files.getlist('adjuntos') if a.filename]
+        error_adjuntos = validar_adjuntos(archivos)
+        if error_adjuntos:
+            flash(error_adjuntos, 'warning')
+            return redirect(url_for('libro.crear_comentario', funcionario_id=funcionario.id))
+        # Contenido a disco antes de escribir en la BD: la copia no retiene los bloqueos de la transacción
+        adjuntos = almacenar_adjuntos(archivos)
+
         nuevo_comentario = Comentario(
             tipo=tipo,
             motivo_jefe=motivo,
@@ -181,25 +177,21 @@ def crear_comentario(funcionario_id):
         )
         db.session.add(nuevo_comentario)
         db.session.flush()
+        registrar_adjuntos(adjuntos, nuevo_comentario.folio, current_user.id)
+        registrar_comentarios_creados([nuevo_comentario])
 
         detalles_log = (f"Jefe {current_user.nombre_completo} (ID: {current_user.id}) creó comentario "
                     f"{nuevo_comentario.tipo} (Folio: {nuevo_comentario.folio}) para "
                     f"{funcionario.nombre_completo} (ID: {funcionario.id}). "
                     f"Factor: {nuevo_comentario.subfactor.factor.nombre}, "
-                    f"SubFactor: {nuevo_comentario.subfactor.nombre}.")
+                    f"SubFactor: {nuevo_comentario.subfactor.nombre}. Adjuntos: {len(archivos)}.")
         registrar_log(accion="Creación de Comentario", detalles=detalles_log)
+        evento = preparar_evento_comentario(nuevo_comentario)
         db.session.commit()
+        publicar_eventos('nuevo_comentario', [evento])
         enviar_correo_notificacion_comentario(nuevo_comentario)
         flash(f'Comentario creado con éxito para {funcionario.nombre_completo}.', 'success')
-
-        if current_user.rol.nombre == 'Jefa Salud':
-            return redirect(url_for('jefa_salud.panel_jefa_salud'))
-        elif current_user.rol.nombre == 'Encargado de Recinto':
-            return redirect(url_for('recinto.panel_encargado_recinto'))
-        elif current_user.rol.nombre == 'Encargado de Unidad':
-            return redirect(url_for('unidad.panel_encargado_unidad'))
-        else: 
-            return redirect(url_for('admin.panel'))
+        return redirect(url_panel_actual())
         
     factores = Factor.query.order_by(Factor.id).all()
     subfactores = SubFactor.query.order_by(SubFactor.id).all()
@@ -210,73 +202,289 @@ def crear_comentario(funcionario_id):
                            factores=factores, 
                            subfactores=subfactores)
 
+@libro_bp.route('/crear_comentario_masivo', methods=['GET', 'POST'])
+@idempotente
+def crear_comentario_masivo():
+    """
+    Registra el mismo comentario para varios funcionarios en una sola transacción:
+    permisos validados con una consulta, un INSERT masivo, un log y un lote de correos.
+    """
+    if request.method == 'POST':
+        funcionario_ids = {int(i) for i in request.form.getlist('funcionario_ids') if i.isdigit()}
+        tipo = request.form.get('tipo')
+        subfactor_id = request.form.get('subfactor_id', type=int)
+        motivo = request.form.get('motivo_jefe')
+
+        if not funcionario_ids:
+            flash('Debes seleccionar al menos un funcionario.', 'warning')
+            return redirect(url_for('libro.crear_comentario_masivo'))
+        if len(funcionario_ids) > MAX_DESTINATARIOS_MASIVO:
+            flash(f'Puedes seleccionar como máximo {MAX_DESTINATARIOS_MASIVO} funcionarios por envío.', 'warning')
+            return redirect(url_for('libro.crear_comentario_masivo'))
+
+        subfactor = db.session.get(SubFactor, subfactor_id) if subfactor_id else None
+        if tipo not in ('Favorable', 'Desfavorable') or not subfactor or not motivo:
+            flash('Debes completar el tipo, el sub-factor y el motivo del comentario.', 'warning')
+            return redirect(url_for('libro.crear_comentario_masivo'))
+
+        # Permisos de todo el conjunto en una sola consulta
+        funcionarios = Usuario.query.filter(
+            Usuario.id.in_(funcionario_ids),
+            Usuario.activo == True,
+            alcance_actual().filtro_anotables(Usuario.id)
+        ).all()
+
+        if len(funcionarios) != len(funcionario_ids):
+            flash('No tienes permisos para crear comentarios a uno o más de los funcionarios seleccionados.', 'danger')
+            return redirect(url_for('libro.crear_comentario_masivo'))
+
+        chile_tz = pytz.timezone('America/Santiago')
+        fecha_creacion = datetime.now(chile_tz).date()
+
+        filas = [
+            {
+                'tipo': tipo,
+                'motivo_jefe': motivo,
+                'fecha_creacion': fecha_creacion,
+                'funcionario_id': funcionario.id,
+                'jefe_id': current_user.id,
+                'subfactor_id': subfactor.id
+            }
+            for funcionario in funcionarios
+        ]
+        # Los folios salen del propio INSERT: buscarlos después (ej: MAX por funcionario) podría
+        # traer los de otro envío simultáneo del mismo jefe fuera de REPEATABLE READ
+        if db.session.get_bind().dialect.insert_executemany_returning:
+            folios_nuevos = db.session.scalars(insert(Comentario).returning(Comentario.folio), filas).all()
+        else:
+            # Sin RETURNING (MySQL): el flush inserta cada objeto y lee su folio (lastrowid)
+            objetos = [Comentario(**fila) for fila in filas]
+            db.session.add_all(objetos)
+            db.session.flush()
+            folios_nuevos = [c.folio for c in objetos]
+        registrar_comentarios_creados(filas)
+
+        nuevos_comentarios = Comentario.query.options(
+            joinedload(Comentario.funcionario),
+            joinedload(Comentario.jefe)
+        ).filter(Comentario.folio.in_(folios_nuevos)).order_by(Comentario.folio).all()
+
+        # Los correos y eventos se arman antes del commit (después los objetos quedan expirados)
+        mensajes = [mensaje_notificacion_comentario(c) for c in nuevos_comentarios]
+        eventos = [preparar_evento_comentario(c) for c in nuevos_comentarios]
+
+        detalles_log = (f"Jefe {current_user.nombre_completo} (ID: {current_user.id}) creó {len(nuevos_comentarios)} "
+                    f"comentarios {tipo} en forma masiva. "
+                    f"Factor: {subfactor.factor.nombre}, SubFactor: {subfactor.nombre}. "
+                    f"Folios: {', '.join(str(c.folio) for c in nuevos_comentarios)}.")
+        registrar_log(accion="Creación Masiva de Comentarios", detalles=detalles_log)
+        db.session.commit()
+        publicar_eventos('nuevo_comentario', eventos)
+        encolar_correos(mensajes)
+
+        flash(f'Comentario creado con éxito para {len(mensajes)} funcionarios.', 'success')
+        return redirect(url_panel_actual())
+
+    unidad_filtro = request.args.get('unidad_filtro', '', type=str)
+
+    query = Usuario.query.options(joinedload(Usuario.unidad)).filter(
+        Usuario.activo == True,
+        alcance_actual().filtro_anotables(Usuario.id)
+    )
+    if unidad_filtro:
+        query = query.filter(Usuario.unidad_id == unidad_filtro)
+    candidatos = query.order_by(Usuario.nombre_completo).limit(MAX_DESTINATARIOS_MASIVO).all()
+
+    unidades = Unidad.query.order_by(Unidad.nombre).all()
+    factores = Factor.query.order_by(Factor.id).all()
+    subfactores = SubFactor.query.options(joinedload(SubFactor.factor)).order_by(SubFactor.id).all()
+
+    return render_template('libro/crear_comentario_masivo.html',
+                           candidatos=candidatos,
+                           unidades=unidades,
+                           unidad_filtro=unidad_filtro,
+                           factores=factores,
+                           subfactores=subfactores,
+                           url_cancelar=url_panel_actual())
+
 @libro_bp.route('/comentario/ver/<int:folio>', methods=['GET', 'POST'])
 def ver_comentario(folio):
-    comentario = Comentario.query.get_or_404(folio)
-    funcionario_del_comentario = comentario.funcionario
-    es_el_funcionario = (current_user.id == funcionario_del_comentario.id)
-    es_admin = (current_user.rol.nombre == 'Admin')
-    es_superior = es_superior_jerarquico(current_user, funcionario_del_comentario)
-
-    if not (es_el_funcionario or es_admin or es_superior):
+    # Los folios archivados siguen accesibles (solo lectura: ya están aceptados)
+    comentario = db.session.get(Comentario, folio) or ComentarioArchivado.query.get_or_404(folio)
+    if not alcance_actual().puede_ver(comentario.funcionario_id):
         abort(403)
 
     if request.method == 'POST':
         if 'tomo_conocimiento' in request.form:
             chile_tz = pytz.timezone('America/Santiago')
-            comentario.estado = 'Aceptada'
-            comentario.fecha_aceptacion = datetime.now(chile_tz).replace(tzinfo=None)
             observaciones = request.form.get('observacion_funcionario')
-            comentario.observacion_funcionario = observaciones if observaciones else "Sin observaciones."
 
+            # UPDATE condicional: si otra petición (doble clic, otra pestaña) ya lo aceptó, no afecta filas
+            resultado = db.session.execute(
+                update(Comentario)
+                .where(Comentario.folio == comentario.folio, Comentario.estado == 'Pendiente')
+                .values(estado='Aceptada',
+                        fecha_aceptacion=datetime.now(chile_tz).replace(tzinfo=None),
+                        observacion_funcionario=observaciones if observaciones else "Sin observaciones.")
+            )
+            if resultado.rowcount == 0:
+                db.session.rollback()
+                flash('Este comentario ya había sido aceptado.', 'info')
+                return redirect(url_for('libro.mi_libro_novedades'))
+
+            registrar_aceptaciones(comentario.funcionario_id)
+            evento = preparar_evento_comentario(comentario)
             detalles_log = (f"Funcionario {current_user.nombre_completo} (ID: {current_user.id}) "
                         f"aceptó el comentario Folio: {comentario.folio}.")
             registrar_log(accion="Aceptación de Comentario", detalles=detalles_log)
             db.session.commit()
+            publicar_eventos('comentario_aceptado', [evento])
 
             flash('Has confirmado la lectura del comentario.', 'success')
             return redirect(url_for('libro.mi_libro_novedades'))
         else:
             flash('Debes marcar la casilla "Tomo conocimiento" para confirmar.', 'warning')
     
+    adjuntos = Adjunto.query.filter_by(folio=comentario.folio).order_by(Adjunto.id).all()
+
     # Actualizado a la subcarpeta libro/
-    return render_template('libro/ver_comentario.html', comentario=comentario)
+    return render_template('libro/ver_comentario.html', comentario=comentario, adjuntos=adjuntos)
+
+@libro_bp.route('/comentario/<int:folio>/adjuntos/<int:adjunto_id>')
+@solo_lectura
+def descargar_adjunto(folio, adjunto_id):
+    """Descarga un adjunto con los mismos permisos que ver_comentario (ETag + Range, ver utils/adjuntos.py)."""
+    comentario = db.session.get(Comentario, folio) or ComentarioArchivado.query.get_or_404(folio)
+    if not alcance_actual().puede_ver(comentario.funcionario_id):
+        abort(403)
+    adjunto = Adjunto.query.filter_by(id=adjunto_id, folio=folio).first_or_404()
+    return respuesta_adjunto(adjunto)
+
+@libro_bp.route('/libro_novedades/aceptar', methods=['POST'])
+def aceptar_comentarios_masivo():
+    """
+    "Tomo conocimiento" de varios comentarios pendientes propios en una sola transacción:
+    un UPDATE condicional (estado='Pendiente'), verificación por cantidad de filas y un log.
+    """
+    folios = {int(f) for f in request.form.getlist('folios') if f.isdigit()}
+    if not folios:
+        flash('Debes seleccionar al menos un comentario.', 'warning')
+        return redirect(url_for('libro.mi_libro_novedades'))
+    if len(folios) > MAX_FOLIOS_ACEPTACION:
+        flash(f'Puedes aceptar como máximo {MAX_FOLIOS_ACEPTACION} comentarios a la vez.', 'warning')
+        return redirect(url_for('libro.mi_libro_novedades'))
+
+    # Solo los pendientes del propio funcionario (FOR UPDATE: bloquea las filas hasta el commit en MySQL)
+    pendientes = Comentario.query.filter(
+        Comentario.folio.in_(folios),
+        Comentario.funcionario_id == current_user.id,
+        Comentario.estado == 'Pendiente'
+    ).order_by(Comentario.folio).with_for_update().all()
+
+    if not pendientes:
+        flash('Los comentarios seleccionados ya habían sido aceptados.', 'info')
+        return redirect(url_for('libro.mi_libro_novedades'))
+
+    chile_tz = pytz.timezone('America/Santiago')
+    observaciones = request.form.get('observacion_funcionario')
+    folios_pendientes = [c.folio for c in pendientes]
+
+    resultado = db.session.execute(
+        update(Comentario)
+        .where(Comentario.folio.in_(folios_pendientes), Comentario.estado == 'Pendiente')
+        .values(estado='Aceptada',
+                fecha_aceptacion=datetime.now(chile_tz).replace(tzinfo=None),
+                observacion_funcionario=observaciones if observaciones else "Sin observaciones."),
+        execution_options={'synchronize_session': False}
+    )
+    if resultado.rowcount != len(folios_pendientes):
+        # Otra petición aceptó alguno entre la lectura y el UPDATE: no se aplica nada a medias
+        db.session.rollback()
+        flash('Algunos comentarios cambiaron mientras los aceptabas. Revisa la lista e inténtalo de nuevo.', 'warning')
+        return redirect(url_for('libro.mi_libro_novedades'))
+
+    registrar_aceptaciones(current_user.id, len(folios_pendientes))
+    eventos = [preparar_evento_comentario(c) for c in pendientes]
+    detalles_log = (f"Funcionario {current_user.nombre_completo} (ID: {current_user.id}) "
+                f"aceptó {len(folios_pendientes)} comentarios en forma masiva. "
+                f"Folios: {', '.join(str(f) for f in folios_pendientes)}.")
+    registrar_log(accion="Aceptación Masiva de Comentarios", detalles=detalles_log)
+    db.session.commit()
+    publicar_eventos('comentario_aceptado', eventos)
+
+    omitidos = len(folios) - len(folios_pendientes)
+    mensaje = f'Has confirmado la lectura de {len(folios_pendientes)} comentarios.'
+    if omitidos:
+        mensaje += f' {omitidos} ya estaban aceptados o no te corresponden.'
+    flash(mensaje, 'success')
+    return redirect(url_for('libro.mi_libro_novedades'))
 
 @libro_bp.route('/ver_equipo_encargado/<int:encargado_id>')
+@solo_lectura
 def ver_equipo_encargado(encargado_id):
     page = request.args.get('page', 1, type=int)
-    encargado = Usuario.query.get_or_404(encargado_id)
-    es_jefe_directo_del_encargado = (encargado.jefe_directo_id == current_user.id)
-    es_admin = (current_user.rol.nombre == 'Admin')
-
-    if not (es_jefe_directo_del_encargado or es_admin):
+    alcance = alcance_actual()
+    if not alcance.puede_ver_equipo(encargado_id):
         abort(403)
+    encargado = Usuario.query.get_or_404(encargado_id)
         
-    query = Usuario.query.filter_by(jefe_directo_id=encargado_id)
-    funcionarios_equipo = query.order_by(Usuario.nombre_completo).paginate(page=page, per_page=10, error_out=False)
+    query = (Usuario.query.filter_by(jefe_directo_id=encargado_id)
+             .options(joinedload(Usuario.unidad))
+             .order_by(Usuario.nombre_completo))
+
+    # ?todos=1: equipo completo en una sola página, enviado en flujo
+    if request.args.get('todos') == '1':
+        funcionarios_equipo = None
+        filas = filas_en_flujo(query)
+    else:
+        funcionarios_equipo = paginar(query, page, 10, versiones=('usuarios',))
+        filas = funcionarios_equipo.items
 
     # Actualizado a la subcarpeta jefatura/ (según donde lo guardamos)
-    return render_template('jefatura/ver_equipo.html',
+    return render_en_flujo('jefatura/ver_equipo.html', filas,
                         encargado=encargado, 
-                        pagination=funcionarios_equipo)
+                        pagination=funcionarios_equipo,
+                        alcance=alcance)
+
+# --- NOTIFICACIONES EN VIVO (SSE) ---
+@libro_bp.route('/eventos/stream')
+def eventos_stream():
+    """Flujo text/event-stream con los avisos de comentarios nuevos y aceptados del usuario."""
+    if not current_app.config['EVENTOS_SSE_HABILITADO']:
+        # 204 indica al EventSource que no reintente (ej: una página abierta antes de deshabilitarlo;
+        # las páginas nuevas ni lo abren y sondean el contador de pendientes)
+        return Response(status=204)
+
+    # Se captura el id antes de salir de la vista: el flujo corre sin contexto ni conexión a BD
+    flujo = flujo_sse(current_user.id, current_app.config['EVENTOS_DURACION_MAX'])
+    return Response(flujo, mimetype='text/event-stream',
+                    headers={'X-Accel-Buffering': 'no'})
+
+# API para el contador de pendientes del encabezado (lectura O(1) de contadores_comentarios)
+@libro_bp.route('/api/contadores/pendientes')
+def api_contador_pendientes():
+    contador = db.session.get(ContadorComentarios, current_user.id)
+    return jsonify({'pendientes': contador.pendientes if contador else 0})
+
+# API para JS: catálogos de filtros y formularios (ETag + revalidación, ver utils/catalogos.py)
+@libro_bp.route('/api/catalogos')
+def api_catalogos():
+    return respuesta_json_condicional(obtener_catalogos())
 
 # API para JS (usada en formularios)
 @libro_bp.route('/api/unidades/<int:establecimiento_id>')
 def get_unidades_por_establecimiento(establecimiento_id):
-    unidades = Unidad.query.filter_by(establecimiento_id=establecimiento_id).order_by(Unidad.nombre).all()
-    unidades_lista = [{'id': u.id, 'nombre': u.nombre} for u in unidades]
-    return jsonify(unidades_lista)
+    unidades_lista = [{'id': u['id'], 'nombre': u['nombre']} for u in obtener_catalogos()['unidades']
+                      if u['establecimiento_id'] == establecimiento_id]
+    return respuesta_json_condicional(unidades_lista)
 
 # --- GENERACIÓN DE PDF ---
 @libro_bp.route('/generar_pdf/<int:funcionario_id>')
+@solo_lectura
 def generar_pdf(funcionario_id):
-    funcionario = Usuario.query.get_or_404(funcionario_id)
-    es_el_funcionario = (current_user.id == funcionario.id)
-    es_superior = es_superior_jerarquico(current_user, funcionario)
-    es_admin = (current_user.rol.nombre == 'Admin')
-
-    if not (es_el_funcionario or es_superior or es_admin):
+    if not alcance_actual().puede_exportar(funcionario_id):
         abort(403)
+    funcionario = Usuario.query.get_or_404(funcionario_id)
 
     # --- La lógica del PDF se mantiene exactamente igual (tuya) ---
     tipo_filtro = request.args.get('tipo', '')
@@ -284,24 +492,19 @@ def generar_pdf(funcionario_id):
     fecha_inicio_str = request.args.get('fecha_inicio', '')
     fecha_fin_str = request.args.get('fecha_fin', '')
 
-    query = Comentario.query.filter_by(funcionario_id=funcionario.id)
-
-    if tipo_filtro:
-        query = query.filter(Comentario.tipo == tipo_filtro)
-    if factor_filtro:
-        query = query.join(Comentario.subfactor).filter(SubFactor.factor_id == factor_filtro)
+    fecha_inicio = fecha_fin = None
     try:
         if fecha_inicio_str:
             fecha_inicio = datetime.strptime(fecha_inicio_str, '%Y-%m-%d').date()
-            query = query.filter(Comentario.fecha_creacion >= fecha_inicio)
         if fecha_fin_str:
             fecha_fin = datetime.strptime(fecha_fin_str, '%Y-%m-%d').date()
-            query = query.filter(Comentario.fecha_creacion <= fecha_fin)
     except ValueError:
         flash("Formato de fecha inválido. Por favor, usa YYYY-MM-DD.", "danger")
         return redirect(request.referrer or url_for('libro.mi_libro_novedades'))
     
-    comentarios = query.order_by(Comentario.fecha_creacion.asc()).all()
+    # Incluye los periodos archivados que alcance el rango de fechas
+    comentarios = comentarios_reporte(funcionario.id, dict(tipo=tipo_filtro, factor_id=factor_filtro),
+                                      fecha_inicio, fecha_fin)
     
     periodo_reporte = ""
     if fecha_inicio_str and fecha_fin_str:
@@ -314,115 +517,10 @@ def generar_pdf(funcionario_id):
     elif fecha_fin_str:
          fecha_fin = datetime.strptime(fecha_fin_str, '%Y-%m-%d')
          periodo_reporte = f"Hasta: {fecha_fin.strftime('%d/%m/%Y')}"
-    fecha_actual = date.today().strftime('%d/%m/%Y')
-
-    pdf = FPDF(orientation='P', unit='mm', format='Letter')
-    pdf.add_page()
-    pdf.set_font('Helvetica', '', 11)
-    pdf.set_auto_page_break(auto=True, margin=15)
-
-    pdf.set_font('Helvetica', 'B', 16)
-    pdf.cell(0, 10, 'Reporte de Registros de Eventos Funcionarios', new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C') 
-    pdf.ln(10)
-
-    pdf.set_font('Helvetica', '', 11)
-    pdf.set_fill_color(248, 249, 250)
-    pdf.set_draw_color(222, 226, 230)
-    pdf.set_line_width(0.3)
-    info = (
-        f"Funcionario: {funcionario.nombre_completo}\n"
-        f"RUT: {funcionario.rut}\n"
-        f"Unidad: {funcionario.unidad.nombre}\n"
-        f"Fecha de Generacion: {fecha_actual}\n"
-    )
-    if periodo_reporte:
-         info += f"{periodo_reporte}"
-
-    pdf.multi_cell(0, 6, info, border=1, fill=True, new_x=XPos.LMARGIN, new_y=YPos.NEXT, padding=5)
-    pdf.ln(10)
 
-    if not comentarios:
-        pdf.set_font('Helvetica', '', 11)
-        pdf.cell(0, 10, 'El funcionario no tiene comentarios registrados para los filtros seleccionados.', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-    else:
-        ancho_etiqueta = 60
-        ancho_valor = pdf.w - pdf.l_margin - pdf.r_margin - ancho_etiqueta
-        altura_linea = 6
-
-        for comentario in comentarios:
-            table_data = [
-                ("Tipo de Comentario", comentario.tipo, True),
-                ("Factor / Sub-Factor", f"{comentario.subfactor.factor.nombre} / {comentario.subfactor.nombre}", False),
-                ("Creada por (Jefatura)", comentario.jefe.nombre_completo, False),
-                ("Estado", comentario.estado, False),
-                ("Motivo (Jefatura)", comentario.motivo_jefe or 'Sin respuesta.', False),
-                ("Observaciones (Funcionario)", comentario.observacion_funcionario or 'Sin respuesta.', False),
-            ]
-            if comentario.fecha_aceptacion:
-                table_data.append(("Fecha Aceptacion", comentario.fecha_aceptacion.strftime('%d/%m/%Y a las %H:%M:%S'), False))
-
-            altura_total_tabla = 8 
-            pdf.set_font('Helvetica', 'B', 10)
-            lineas_por_fila = []
-            for etiqueta, valor, _ in table_data:
-                lineas_etiqueta = len(pdf.multi_cell(w=ancho_etiqueta, h=altura_linea, txt=etiqueta, dry_run=True, split_only=True))
-                pdf.set_font('Helvetica', '', 10)
-                lineas_valor = len(pdf.multi_cell(w=ancho_valor, h=altura_linea, txt=str(valor), dry_run=True, split_only=True))
-                lineas_max = max(lineas_etiqueta, lineas_valor)
-                lineas_por_fila.append(lineas_max)
-                altura_total_tabla += lineas_max * altura_linea
-
-            if pdf.get_y() + altura_total_tabla > pdf.page_break_trigger:
-                pdf.add_page()
-            
-            pdf.set_font('Helvetica', 'B', 11)
-            pdf.set_fill_color(52, 73, 94)
-            pdf.set_text_color(255, 255, 255)
-            pdf.cell(0, 8, f"Folio #{comentario.folio} - Fecha: {comentario.fecha_creacion.strftime('%d/%m/%Y')}", border=1, new_x=XPos.LMARGIN, new_y=YPos.NEXT, fill=True, align='C')
-            pdf.set_text_color(0, 0, 0)
-            pdf.set_draw_color(204, 204, 204)
-            pdf.set_line_width(0.2)
-
-            for i, (etiqueta, valor, es_tipo) in enumerate(table_data):
-                y_antes = pdf.get_y()
-                num_lineas = lineas_por_fila[i]
-                altura_celda = num_lineas * altura_linea
-
-                pdf.set_font('Helvetica', 'B', 10)
-                pdf.multi_cell(ancho_etiqueta, altura_linea, etiqueta, border='L', align='L', new_x=XPos.RIGHT, new_y=YPos.TOP, max_line_height=altura_linea) 
-                
-                pdf.set_xy(pdf.l_margin + ancho_etiqueta, y_antes)
-                
-                pdf.set_font('Helvetica', '', 10)
-                if es_tipo:
-                    if valor == 'Favorable':
-                        pdf.set_text_color(25, 135, 84)
-                    else:
-                        pdf.set_text_color(220, 53, 69)
-                
-                pdf.multi_cell(ancho_valor, altura_linea, str(valor), border='R', align='L', new_x=XPos.LMARGIN, new_y=YPos.NEXT, max_line_height=altura_linea) 
-                
-                pdf.set_text_color(0, 0, 0)
-                pdf.line(pdf.l_margin, y_antes + altura_celda, pdf.w - pdf.r_margin, y_antes + altura_celda)
-                pdf.set_y(y_antes + altura_celda) 
-
-            pdf.ln(10)
-
-    if pdf.get_y() > 230:
-        pdf.add_page()
-        
-    pdf.ln(5)
-    pdf.set_font('Helvetica', 'I', 9) 
-    pdf.set_text_color(100, 100, 100)
-    
-    texto_legal = (
-        "El registro de información en esta aplicación tiene carácter exclusivamente orientador y de ayuda memoria "
-        "para la gestión diaria entre el jefe directo y funcionario. No constituye antecedente válido para el proceso "
-        "de Calificación Funcionaria. Para efectos de evaluación del desempeño, se considerarán únicamente las "
-        "Anotaciones de Mérito y de Demérito debidamente formalizadas según la normativa vigente."
-    )
-    pdf.multi_cell(0, 5, texto_legal, align='C')
+    # Importación diferida: fpdf solo se carga al generar el primer reporte
+    from utils.reportes import generar_pdf_libro
 
-    return Response(bytes(pdf.output()),
+    return Response(generar_pdf_libro(funcionario, comentarios, periodo_reporte),
                     mimetype='application/pdf',
                     headers={'Content-Disposition': f'attachment;filename=libro_novedades_{funcionario.rut}.pdf'})
\ No newline at end of file
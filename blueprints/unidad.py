@@ -2,8 +2,10 @@
 from flask import Blueprint, render_template, request
 from flask_login import login_required, current_user
 from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
 from models import db, Usuario
-from utils import encargado_unidad_required, check_password_change
+from utils import encargado_unidad_required, check_password_change, solo_lectura
+from utils.paginacion import paginar
 
 unidad_bp = Blueprint('unidad', __name__, template_folder='../templates', url_prefix='/encargado_unidad')
 
@@ -16,11 +18,16 @@ def before_request():
     pass
 
 @unidad_bp.route('/panel')
+@solo_lectura
 def panel_encargado_unidad():
     page = request.args.get('page', 1, type=int)
     busqueda = request.args.get('busqueda', '')
 
-    query = Usuario.query.filter(
+    # Contadores y unidad en la misma consulta (sin un COUNT ni un SELECT extra por fila)
+    query = Usuario.query.options(
+        joinedload(Usuario.contadores),
+        joinedload(Usuario.unidad)
+    ).filter(
         or_(
             Usuario.jefe_directo_id == current_user.id,
             Usuario.segundo_jefe_id == current_user.id
@@ -37,9 +44,7 @@ def panel_encargado_unidad():
     
     query = query.filter(Usuario.rol.has(nombre='Funcionario'))
 
-    pagination = query.order_by(Usuario.nombre_completo).paginate(
-        page=page, per_page=10, error_out=False
-    )
+    pagination = paginar(query.order_by(Usuario.nombre_completo), page, 10, versiones=('usuarios',))
     
     # Actualizado a la subcarpeta jefatura/
     return render_template('jefatura/panel_encargado_unidad.html', 
@@ -0,0 +1,230 @@
+# comandos.py
+"""
+Comandos de línea para tareas de mantenimiento (fuera del arranque de la app).
+Uso: flask --app wsgi <comando>
+"""
+import click
+from sqlalchemy import func, inspect, update
+from sqlalchemy.schema import CreateColumn
+
+from models import db, obtener_hora_chile
+
+
+def _fecha_hora(columna):
+    """Columna Date como DateTime (SQLite guarda texto: sin hora no se puede leer como DateTime)."""
+    return func.datetime(columna) if db.engine.dialect.name == 'sqlite' else columna
+
+
+# Columnas agregadas a tablas existentes y con qué rellenar las filas antiguas (quedarían en NULL).
+# fecha_actualizacion en NULL nunca aparecería en /api/v1?actualizado_desde= hasta modificarse.
+RELLENOS = {
+    ('usuarios', 'fecha_actualizacion'): lambda t: func.coalesce(t.c.fecha_creacion, obtener_hora_chile()),
+    ('comentarios', 'fecha_actualizacion'): lambda t: func.coalesce(t.c.fecha_aceptacion, _fecha_hora(t.c.fecha_creacion)),
+}
+
+
+def inicializar_bd():
+    """Crea las tablas según models.py si no existen, y las columnas e índices nuevos de tablas ya existentes."""
+    from utils.cache import sembrar_versiones
+
+    try:
+        db.create_all()
+        # create_all no modifica tablas existentes: las columnas (opcionales) y los índices
+        # agregados después se crean aparte
+        columnas_actuales = inspect(db.engine)
+        preparador = db.engine.dialect.identifier_preparer
+        for tabla in db.metadata.sorted_tables:
+            existentes = {c['name'] for c in columnas_actuales.get_columns(tabla.name)}
+            for columna in tabla.columns:
+                if columna.name not in existentes:
+                    definicion = CreateColumn(columna).compile(dialect=db.engine.dialect)
+                    with db.engine.begin() as conexion:
+                        conexion.exec_driver_sql(f"ALTER TABLE {preparador.format_table(tabla)} ADD COLUMN {definicion}")
+                    print(f"➕ Columna agregada: {tabla.name}.{columna.name}")
+                relleno = RELLENOS.get((tabla.name, columna.name))
+                if relleno:
+                    # En cada ejecución (no solo al agregarla): retoma un relleno que haya fallado antes
+                    with db.engine.begin() as conexion:
+                        filas = conexion.execute(update(tabla).where(columna.is_(None)).values({columna: relleno(tabla)})).rowcount
+                    if filas:
+                        print(f"➕ {tabla.name}.{columna.name} rellenada en {filas} filas.")
+            for indice in tabla.indexes:
+                indice.create(db.engine, checkfirst=True)
+        sembrar_versiones()
+        print("✅ Libro de Novedades inicializado. Tablas verificadas en MySQL.")
+    except Exception as e:
+        # Un esquema a medio migrar rompe las vistas: el despliegue debe detenerse aquí (código de salida 1)
+        raise click.ClickException(f"❌ Error al inicializar la BD (el esquema puede haber quedado incompleto): {e}") from e
+
+
+def registrar_comandos(app):
+    """Registra los comandos CLI en la aplicación."""
+
+    @app.cli.command('init-db')
+    def init_db():
+        """Crea/verifica las tablas de la BD (ejecutar en cada despliegue, no al arrancar workers)."""
+        inicializar_bd()
+
+    @app.cli.command('precompilar-plantillas')
+    def precompilar_plantillas():
+        """Compila todas las plantillas en la caché de bytecode (ejecutar en cada despliegue)."""
+        from utils.plantillas import cargar_plantillas, directorio_plantillas_cache
+
+        if not app.config['PLANTILLAS_CACHE_HABILITADO']:
+            print("⚠️  La caché de plantillas está deshabilitada (PLANTILLAS_CACHE=0).")
+            return
+        cantidad = cargar_plantillas(app)
+        print(f"✅ {cantidad} plantillas compiladas en {directorio_plantillas_cache(app)}.")
+
+    @app.cli.command('reparar-contadores')
+    def reparar_contadores_cmd():
+        """Recalcula contadores_comentarios desde la tabla de comentarios (ejecutar tras cargas manuales)."""
+        from utils.contadores import reparar_contadores
+
+        corregidos = reparar_contadores()
+        print(f"✅ Contadores recalculados. Usuarios con diferencias corregidas: {corregidos}.")
+
+    @app.cli.command('invalidar-cache')
+    @click.argument('nombres', nargs=-1)
+    def invalidar_cache(nombres):
+        """Invalida los fragmentos en caché (ej: tras editar catálogos directo en la BD). Por defecto: catalogos."""
+        from utils.cache import incrementar_version
+
+        for nombre in nombres or ('catalogos',):
+            incrementar_version(nombre)
+        db.session.commit()
+        print(f"✅ Versiones incrementadas: {', '.join(nombres or ('catalogos',))}.")
+
+    @app.cli.command('purgar-idempotencia')
+    def purgar_idempotencia():
+        """Elimina las claves de idempotencia vencidas (programar en cron, ej: cada hora)."""
+        from utils.idempotencia import purgar_claves_vencidas
+
+        eliminadas = purgar_claves_vencidas()
+        print(f"✅ Claves de idempotencia eliminadas: {eliminadas}.")
+
+    @app.cli.command('enviar-resumenes')
+    @click.option('--dias-pendiente', default=3, show_default=True, help='Antigüedad mínima de un pendiente para recordarlo.')
+    @click.option('--periodo', default=7, show_default=True, help='Días de aceptaciones incluidas en el resumen de jefaturas.')
+    @click.option('--min-horas', default=20, show_default=True, help='No repetir un resumen a la misma persona antes de estas horas.')
+    @click.option('--por-minuto', default=30, show_default=True, help='Ritmo máximo de envío SMTP.')
+    @click.option('--url-base', envvar='URL_SISTEMA', default='http://localhost:5000', show_default=True,
+                  help='URL pública del sistema para los enlaces (o variable URL_SISTEMA).')
+    @click.option('--simular', is_flag=True, help='Solo cuenta los correos, sin enviarlos.')
+    def enviar_resumenes_cmd(dias_pendiente, periodo, min_horas, por_minuto, url_base, simular):
+        """Envía los recordatorios de pendientes y los resúmenes de jefaturas (programar en cron, ej: diario)."""
+        from utils.resumenes import enviar_resumenes
+
+        # url_for(_external=True) necesita un contexto de petición con la URL pública
+        with app.test_request_context(base_url=url_base):
+            preparados, enviados = enviar_resumenes(dias_pendiente, periodo, min_horas, por_minuto, simular)
+        if simular:
+            print(f"🔎 Simulación: se enviarían {preparados} resúmenes.")
+        else:
+            print(f"✅ Resúmenes enviados: {enviados}/{preparados}.")
+
+    @app.cli.command('archivar-periodo')
+    @click.argument('año', type=int)
+    @click.option('--lote', default=1000, show_default=True, help='Comentarios movidos por transacción.')
+    @click.option('--simular', is_flag=True, help='Solo cuenta los comentarios, sin moverlos.')
+    def archivar_periodo_cmd(año, lote, simular):
+        """Mueve los comentarios aceptados de un periodo cerrado a 'comentarios_archivados'."""
+        from models import obtener_hora_chile
+        from utils.archivo import archivar_periodo
+
+        if año >= obtener_hora_chile().year:
+            print(f"❌ El periodo {año} no está cerrado: solo se archivan años anteriores al actual.")
+            return
+        movidos = archivar_periodo(año, lote, simular)
+        if simular:
+            print(f"🔎 Simulación: se archivarían {movidos} comentarios del periodo {año}.")
+        else:
+            print(f"✅ Comentarios archivados del periodo {año}: {movidos}.")
+
+    @app.cli.command('sincronizar-nomina')
+    @click.argument('archivo', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--aplicar', is_flag=True, help='Aplica los cambios (sin esta opción solo se muestra el diff).')
+    @click.option('--max-detalle', default=50, show_default=True, help='Líneas de detalle por sección del informe.')
+    @click.option('--desactivar-jefaturas', is_flag=True,
+                  help='Desactiva también a Jefa Salud y Encargados ausentes (por defecto solo se informan).')
+    @click.option('--permitir-bajas-masivas', is_flag=True,
+                  help='Aplica aunque se desactive más del 10% de los usuarios activos.')
+    def sincronizar_nomina(archivo, aplicar, max_detalle, desactivar_jefaturas, permitir_bajas_masivas):
+        """Sincroniza los usuarios con la planilla de nómina de RR.HH. (.xlsx o .csv), por RUT."""
+        import os
+        from utils.nomina import BajasMasivasError, aplicar_diferencias, calcular_diferencias, verificar_bajas
+
+        try:
+            diferencias = calcular_diferencias(archivo, incluir_jefaturas=desactivar_jefaturas)
+        except ValueError as e:
+            print(f"❌ {e}")
+            raise click.exceptions.Exit(1)
+
+        secciones = (
+            ('Altas', diferencias['nuevos'], lambda n: f"{n['rut']}  {n['nombre_completo']} <{n['email']}>"),
+            ('Actualizaciones', diferencias['cambios'],
+             lambda c: f"{c[1]}  " + ', '.join(f"{campo}: {antes} -> {despues}" for campo, (antes, despues) in c[2].items())),
+            ('Desactivaciones', diferencias['bajas'], lambda b: f"{b[1]}  {b[2]}"),
+            ('Jefaturas ausentes (no se desactivan, ver --desactivar-jefaturas)', diferencias['jefaturas_ausentes'],
+             lambda b: f"{b[1]}  {b[2]}"),
+            ('Errores', diferencias['errores'], lambda e: f"fila {e[0] or '-'}  {e[1]}  {e[2]}"),
+        )
+        for titulo, elementos, formato in secciones:
+            print(f"{titulo}: {len(elementos)}")
+            for elemento in elementos[:max_detalle]:
+                print(f"   {formato(elemento)}")
+            if len(elementos) > max_detalle:
+                print(f"   ... y {len(elementos) - max_detalle} más")
+
+        try:
+            verificar_bajas(diferencias, permitir_bajas_masivas)
+        except BajasMasivasError as e:
+            print(f"⚠️  {e}")
+            if aplicar:
+                raise click.exceptions.Exit(1)
+
+        if not aplicar:
+            print("🔎 Simulación: no se modificó la BD (usar --aplicar).")
+            return
+        aplicar_diferencias(diferencias, origen=os.path.basename(archivo), permitir_bajas_masivas=permitir_bajas_masivas)
+        print("✅ Nómina sincronizada.")
+
+    @app.cli.command('crear-token-api')
+    @click.argument('email')
+    @click.option('--nombre', required=True, help='Sistema que usará el token (ej: "BI nocturno").')
+    def crear_token_api(email, nombre):
+        """Crea un token de /api/v1 con el alcance del usuario EMAIL (se muestra una sola vez)."""
+        from models import Usuario
+        from utils.api import crear_token
+
+        usuario = Usuario.query.filter_by(email=email.strip().lower()).first()
+        if usuario is None or not usuario.activo:
+            print(f"❌ No existe un usuario activo con el correo '{email}'.")
+            return
+        token = crear_token(usuario, nombre)
+        print(f"✅ Token '{nombre}' creado con el alcance de {usuario.nombre_completo} ({usuario.rol.nombre}):")
+        print(f"   {token}")
+        print("⚠️  Guárdalo ahora: no se puede volver a consultar.")
+
+    @app.cli.command('revocar-token-api')
+    @click.argument('nombre')
+    def revocar_token_api(nombre):
+        """Revoca los tokens de /api/v1 creados con ese nombre."""
+        from utils.api import revocar_tokens
+
+        revocados = revocar_tokens(nombre)
+        if not revocados:
+            print(f"❌ No hay tokens vigentes con el nombre '{nombre}'.")
+            return
+        print(f"✅ Tokens revocados: {revocados}.")
+
+    @app.cli.command('eventos-broker')
+    @click.option('--host', default='127.0.0.1')
+    @click.option('--puerto', default=8766, type=int)
+    def eventos_broker(host, puerto):
+        """Broker local de notificaciones: reparte los eventos SSE entre todos los workers."""
+        from utils.eventos import BrokerEventos
+
+        print(f"📡 Broker de eventos escuchando en tcp://{host}:{puerto}")
+        with BrokerEventos((host, puerto)) as servidor:
+            servidor.serve_forever()
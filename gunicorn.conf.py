@@ -0,0 +1,109 @@
+# gunicorn.conf.py
+"""
+Configuración de producción: workers con la app precargada en el proceso maestro,
+pool de conexiones por worker y ciclo de vida controlado de los workers.
+
+Variables de entorno:
+    GUNICORN_BIND          Dirección de escucha (por defecto 0.0.0.0:8000)
+    WEB_CONCURRENCY        Cantidad de workers (por defecto 2 x CPU + 1)
+    GUNICORN_THREADS       Hilos por worker (>1 usa workers 'gthread')
+    GUNICORN_WORKER_CLASS  'gevent' = workers cooperativos: cada petición es un greenlet y
+                           la espera de MySQL, SMTP o del cliente no bloquea al worker
+    GUNICORN_WORKER_CONNECTIONS  Conexiones simultáneas por worker gevent (por defecto 1000)
+    GUNICORN_MAX_REQUESTS  Peticiones antes de reciclar un worker (0 = nunca)
+    DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_MAX_CONEXIONES  Ver app.opciones_pool_bd()
+    PROMETHEUS_MULTIPROC_DIR  Carpeta de métricas compartida entre workers (ver utils/metricas.py)
+    CALENTAR_WORKERS       1 = cargar plantillas, catálogos y pool antes de aceptar peticiones (por defecto)
+"""
+import glob
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS') or ('gthread' if threads > 1 else 'sync')
+
+if worker_class == 'gevent':
+    # Se parcha antes de precargar la app: PyMySQL y smtplib usan el socket cooperativo, y los
+    # locks y colas que se crean al importar (pool de SQLAlchemy, utils/cache.py, utils/eventos.py)
+    # ceden el turno en vez de bloquear el worker completo. Por eso gevent se elige con
+    # GUNICORN_WORKER_CLASS y no con '-k gevent' (ese parche llega recién en cada worker).
+    from gevent import monkey
+    monkey.patch_all()
+    worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+    os.environ['GUNICORN_WORKER_CONNECTIONS'] = str(worker_connections)
+
+# create_app() lee estos valores para dimensionar el pool de cada worker
+os.environ['WEB_CONCURRENCY'] = str(workers)
+os.environ['GUNICORN_THREADS'] = str(threads)
+os.environ['GUNICORN_WORKER_CLASS'] = worker_class
+
+# Métricas multiproceso: debe definirse antes de importar prometheus_client (al precargar la app).
+# Se limpian los archivos de una ejecución anterior para no sumar workers que ya no existen.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/libro_novedades_metricas')
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+for archivo in glob.glob(os.path.join(os.environ['PROMETHEUS_MULTIPROC_DIR'], '*.db')):
+    os.remove(archivo)
+
+# Carga la app una vez en el maestro; los workers la heredan por fork (copy-on-write)
+preload_app = True
+
+# Ciclo de vida: reciclar workers periódicamente (con jitter para no reiniciarlos todos juntos)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max(1, max_requests // 10)
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+
+
+def _desechar_conexiones():
+    from wsgi import app
+    from models import db
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: no cerrar sockets que pueda estar usando el proceso padre
+            engine.dispose(close=False)
+
+
+def post_fork(server, worker):
+    """Cada worker parte con un pool vacío: las conexiones no se comparten entre procesos."""
+    _desechar_conexiones()
+
+
+def post_worker_init(worker):
+    """Calienta el worker antes de que acepte peticiones (ver utils/plantillas.py)."""
+    if os.getenv('CALENTAR_WORKERS', '1') == '0':
+        return
+    from wsgi import app
+    from utils.plantillas import calentar_worker
+    try:
+        calentar_worker(app)
+    except Exception as e:
+        # Un worker sin calentar igual puede atender: no se aborta el arranque
+        worker.log.warning(f"No se pudo calentar el worker: {e}")
+
+
+def worker_exit(server, worker):
+    """Espera los correos en envío y cierra las conexiones del worker al terminar (reciclaje o apagado ordenado)."""
+    from wsgi import app
+    from models import db
+    from utils.email import esperar_envios
+    # Con margen bajo graceful_timeout (SIGKILL del maestro al apagar) y timeout (el worker ya no
+    # informa latidos mientras espera)
+    limite = max(1, min(server.cfg.graceful_timeout, server.cfg.timeout) - 5)
+    pendientes = esperar_envios(limite)
+    if pendientes:
+        worker.log.warning(f"{pendientes} envíos de correo por lote no terminaron en {limite}s y se interrumpen.")
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def child_exit(server, worker):
+    """Descarta los gauges 'live' del worker que terminó para que no se sigan sumando en /metrics."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -6,9 +6,12 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import pytz
 
+from utils.replicas import SesionEnrutada
+
 # Creamos la instancia de SQLAlchemy aquí. 
 # La conectaremos a la aplicación en app.py para evitar importaciones circulares.
-db = SQLAlchemy()
+# SesionEnrutada envía las lecturas de vistas @solo_lectura a la réplica (si está configurada).
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
 
 # --- 2. FUNCIÓN AYUDANTE PARA HORA CHILE ---
 # NOTA IMPORTANTE:
@@ -80,6 +83,10 @@ class SubFactor(db.Model):
 
 class Usuario(db.Model, UserMixin):
     __tablename__ = 'usuarios'
+    __table_args__ = (
+        # Búsqueda de jefaturas por rol y prefijo del nombre (admin.api_jefes)
+        db.Index('ix_usuarios_rol_nombre', 'rol_id', 'nombre_completo'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     rut = db.Column(db.String(12), unique=True, nullable=False)
     nombre_completo = db.Column(db.String(255), nullable=False)
@@ -90,6 +97,8 @@ class Usuario(db.Model, UserMixin):
     cambio_clave_requerido = db.Column(db.Boolean, default=False, nullable=False)
     reset_token = db.Column(db.String(32), nullable=True)
     reset_token_expiracion = db.Column(db.DateTime, nullable=True)
+    # Última modificación: sincronización incremental de la API (?actualizado_desde=)
+    fecha_actualizacion = db.Column(db.DateTime, default=obtener_hora_chile, onupdate=obtener_hora_chile, index=True)
 
     # --- Llaves Foráneas y Relaciones ---
     rol_id = db.Column(db.Integer, db.ForeignKey('roles.id'))
@@ -135,6 +144,8 @@ class Comentario(db.Model):
     estado = db.Column(db.Enum('Pendiente', 'Aceptada'), default='Pendiente')
     fecha_creacion = db.Column(db.Date, nullable=False)
     fecha_aceptacion = db.Column(db.DateTime)
+    # Última modificación: sincronización incremental de la API (?actualizado_desde=)
+    fecha_actualizacion = db.Column(db.DateTime, default=obtener_hora_chile, onupdate=obtener_hora_chile, index=True)
     
     # Llaves Foráneas
     funcionario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
@@ -148,11 +159,125 @@ class Comentario(db.Model):
     funcionario = db.relationship('Usuario', foreign_keys=[funcionario_id], backref='comentarios_recibidos')
     jefe = db.relationship('Usuario', foreign_keys=[jefe_id], backref='comentarios_emitidos')
 
+class ComentarioArchivado(db.Model):
+    """
+    Comentarios aceptados de periodos de evaluación cerrados ('flask archivar-periodo').
+    Mismas columnas que Comentario (conserva el folio) + el periodo archivado.
+    La tabla 'comentarios' queda solo con el periodo en curso y los pendientes;
+    las vistas consultan esta tabla cuando los filtros de fecha llegan a periodos archivados (utils/archivo.py).
+    """
+    __tablename__ = 'comentarios_archivados'
+    folio = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    tipo = db.Column(db.Enum('Favorable', 'Desfavorable'), nullable=False)
+    motivo_jefe = db.Column(db.Text, nullable=False)
+    observacion_funcionario = db.Column(db.Text)
+    estado = db.Column(db.Enum('Pendiente', 'Aceptada'), default='Aceptada')
+    fecha_creacion = db.Column(db.Date, nullable=False)
+    fecha_aceptacion = db.Column(db.DateTime)
+    fecha_actualizacion = db.Column(db.DateTime)
+    funcionario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    jefe_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    subfactor_id = db.Column(db.Integer, db.ForeignKey('subfactores.id'), nullable=False)
+
+    periodo = db.Column(db.Integer, nullable=False, index=True)
+    fecha_archivado = db.Column(db.DateTime, default=obtener_hora_chile, index=True)
+
+    # Sin backrefs: solo se leen desde utils/archivo.py
+    subfactor = db.relationship('SubFactor')
+    funcionario = db.relationship('Usuario', foreign_keys=[funcionario_id])
+    jefe = db.relationship('Usuario', foreign_keys=[jefe_id])
+
+    __table_args__ = (
+        db.Index('ix_comentarios_archivados_funcionario_fecha', 'funcionario_id', 'fecha_creacion'),
+    )
+
+class Adjunto(db.Model):
+    """
+    Archivo de respaldo de un comentario. El contenido vive en disco, nombrado por su
+    SHA-256 (utils/adjuntos.py): el mismo archivo subido dos veces se guarda una sola vez.
+    """
+    __tablename__ = 'adjuntos'
+    id = db.Column(db.Integer, primary_key=True)
+    # Sin llave foránea: el folio se conserva al mover el comentario a 'comentarios_archivados'
+    folio = db.Column(db.Integer, nullable=False, index=True)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    nombre_original = db.Column(db.String(255), nullable=False)
+    tipo_mime = db.Column(db.String(100), nullable=False)
+    tamano = db.Column(db.Integer, nullable=False)  # Bytes
+    subido_por_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    fecha_subida = db.Column(db.DateTime, nullable=False, default=obtener_hora_chile)
+
+class ContadorComentarios(db.Model):
+    """
+    Totales de comentarios recibidos por usuario (desnormalizados).
+    Se mantienen en la misma transacción que crea o acepta el comentario (utils/contadores.py)
+    y se reconcilian con 'flask reparar-contadores'.
+    """
+    __tablename__ = 'contadores_comentarios'
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), primary_key=True)
+    pendientes = db.Column(db.Integer, nullable=False, default=0)
+    aceptados = db.Column(db.Integer, nullable=False, default=0)
+    favorables = db.Column(db.Integer, nullable=False, default=0)
+    desfavorables = db.Column(db.Integer, nullable=False, default=0)
+    fecha_ultimo_comentario = db.Column(db.Date)
+
+    # Sin backref dinámico: los paneles lo cargan con joinedload(Usuario.contadores)
+    usuario = db.relationship('Usuario', backref=db.backref('contadores', uselist=False))
+
+class ClaveIdempotencia(db.Model):
+    """
+    Envíos ya procesados de formularios que cambian datos (utils/idempotencia.py).
+    Un reintento o doble envío con la misma clave recibe la respuesta original sin re-ejecutar la vista.
+    Las filas vencen según IDEMPOTENCIA_TTL y se eliminan con 'flask purgar-idempotencia'.
+    """
+    __tablename__ = 'claves_idempotencia'
+    clave = db.Column(db.String(64), primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    ruta = db.Column(db.String(255), nullable=False)  # La clave solo vale para la misma URL
+    estado = db.Column(db.Enum('En proceso', 'Completada'), nullable=False, default='En proceso')
+    ubicacion = db.Column(db.String(500))  # Destino del redirect original
+    mensajes = db.Column(db.Text)  # Mensajes flash originales (JSON)
+    # Índice para la purga por antigüedad (MySQL no tiene índices TTL nativos)
+    fecha_creacion = db.Column(db.DateTime, nullable=False, default=obtener_hora_chile, index=True)
+
+class VersionCache(db.Model):
+    """Versión de cada grupo de datos usada en las claves de la caché de fragmentos (utils/cache.py)."""
+    __tablename__ = 'versiones_cache'
+    nombre = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class EnvioResumen(db.Model):
+    """Resúmenes por correo ya enviados: evita repetirlos a la misma persona antes de tiempo (utils/resumenes.py)."""
+    __tablename__ = 'envios_resumen'
+    __table_args__ = (
+        db.Index('ix_envios_resumen_tipo_fecha', 'tipo', 'fecha'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    tipo = db.Column(db.Enum('Pendientes', 'Jefatura'), nullable=False)
+    cantidad = db.Column(db.Integer, nullable=False)  # Comentarios incluidos en el resumen
+    fecha = db.Column(db.DateTime, nullable=False, default=obtener_hora_chile)
+
+class TokenApi(db.Model):
+    """
+    Tokens de la API de integraciones (/api/v1, 'flask crear-token-api').
+    Solo se guarda el SHA-256 del token; cada token lee con el alcance de su usuario.
+    """
+    __tablename__ = 'tokens_api'
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), nullable=False)  # Sistema que lo usa, ej: 'BI nocturno'
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    fecha_creacion = db.Column(db.DateTime, nullable=False, default=obtener_hora_chile)
+    fecha_revocacion = db.Column(db.DateTime)
+
+    usuario = db.relationship('Usuario')
+
 class Log(db.Model):
     __tablename__ = 'logs'
     id = db.Column(db.Integer, primary_key=True)
     # Usamos datetime.utcnow para guardar la hora en UTC (más estándar)
-    timestamp = db.Column(db.DateTime, nullable=False, default=obtener_hora_chile) 
+    timestamp = db.Column(db.DateTime, nullable=False, default=obtener_hora_chile, index=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True) # Permitimos NULL
     usuario_nombre = db.Column(db.String(255))
     accion = db.Column(db.String(255), nullable=False)
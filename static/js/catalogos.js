@@ -0,0 +1,21 @@
+// Catálogos compartidos (factores, sub-factores, establecimientos y unidades) desde /api/catalogos.
+// El navegador guarda la respuesta y la revalida con ETag: mientras no cambie recibe un 304 sin cuerpo.
+(function () {
+    const url = document.currentScript.dataset.url;
+    let promesa = null;
+
+    window.obtenerCatalogos = function () {
+        if (!promesa) {
+            promesa = fetch(url, { credentials: 'same-origin' })
+                .then(response => {
+                    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                    return response.json();
+                })
+                .catch(error => {
+                    promesa = null;  // Permite reintentar en el próximo uso
+                    throw error;
+                });
+        }
+        return promesa;
+    };
+})();
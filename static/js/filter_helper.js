@@ -2,20 +2,10 @@ document.addEventListener('DOMContentLoaded', function () {
     const factorSelect = document.getElementById('factor_filtro');
     const subfactorSelect = document.getElementById('subfactor_filtro');
 
-    // Leemos los datos desde el div oculto en el HTML
+    // El sub-factor ya filtrado viene en el div oculto; el catálogo, de /api/catalogos
     const filterDataEl = document.getElementById('filter-data');
     let allSubfactors = [];
-    let selectedSubfactor = '';
-
-    if (filterDataEl) {
-        try {
-            // Usamos JSON.parse para convertir el string de datos en un objeto JavaScript
-            allSubfactors = JSON.parse(filterDataEl.dataset.subfactores || '[]');
-        } catch (e) {
-            console.error('Error al procesar los datos de subfactores:', e);
-        }
-        selectedSubfactor = filterDataEl.dataset.selectedSubfactor || '';
-    }
+    const selectedSubfactor = filterDataEl ? (filterDataEl.dataset.selectedSubfactor || '') : '';
 
     function updateSubfactorOptions() {
         const selectedFactorId = factorSelect.value;
@@ -52,6 +42,12 @@ document.addEventListener('DOMContentLoaded', function () {
 
     factorSelect.addEventListener('change', updateSubfactorOptions);
 
-    // Ejecutar una vez al cargar la página para establecer el estado inicial correcto
+    // Cargar el catálogo y establecer el estado inicial correcto
     updateSubfactorOptions();
+    window.obtenerCatalogos()
+        .then(catalogos => {
+            allSubfactors = catalogos.subfactores;
+            updateSubfactorOptions();
+        })
+        .catch(error => console.error('Error al cargar los sub-factores:', error));
 });
\ No newline at end of file
@@ -0,0 +1,119 @@
+/*
+ * notificaciones.js
+ * -------------------------------------------------------
+ * Avisos en vivo de comentarios nuevos y aceptados (Server-Sent Events).
+ *
+ * Funcionamiento:
+ * - Abre un EventSource contra /eventos/stream (data-url del <script>)
+ * - El servidor cierra el flujo cada algunos minutos y el navegador reconecta solo
+ * - Cada evento muestra un aviso con enlace al folio, sin recargar la página
+ * - Los avisos propios actualizan el badge de pendientes del encabezado
+ * - Sin data-url (SSE deshabilitado, ej: workers gthread) consulta el contador de
+ *   pendientes cada data-intervalo-sondeo segundos, solo con la pestaña visible
+ */
+
+(function() {
+
+    const script = document.currentScript;
+    const URL_STREAM = script.dataset.url;
+    // URL de ver_comentario con folio 0, se reemplaza por el folio real
+    const URL_COMENTARIO = script.dataset.urlComentario;
+    const USUARIO_ID = parseInt(script.dataset.usuarioId, 10);
+    const INTERVALO_SONDEO = parseInt(script.dataset.intervaloSondeo, 10) || 60;
+
+    function contenedor() {
+        let caja = document.getElementById('notificaciones-vivo');
+        if (!caja) {
+            caja = document.createElement('div');
+            caja.id = 'notificaciones-vivo';
+            caja.className = 'fixed bottom-5 right-5 z-50 w-full max-w-sm space-y-3';
+            document.body.appendChild(caja);
+        }
+        return caja;
+    }
+
+    function mostrarAviso(texto, href, textoEnlace, colorBorde) {
+        const aviso = document.createElement('div');
+        aviso.className = `p-4 rounded-lg shadow-lg border-l-4 ${colorBorde} bg-white flex justify-between items-start gap-4`;
+        aviso.setAttribute('role', 'status');
+
+        const cuerpo = document.createElement('div');
+        cuerpo.className = 'text-sm text-gray-700';
+        cuerpo.textContent = texto;
+
+        const enlace = document.createElement('a');
+        enlace.href = href;
+        enlace.className = 'block mt-1 font-semibold text-blue-600 hover:underline';
+        enlace.textContent = textoEnlace;
+        cuerpo.appendChild(enlace);
+
+        const cerrar = document.createElement('button');
+        cerrar.className = 'text-gray-400 hover:text-gray-900';
+        cerrar.textContent = '✕';
+        cerrar.addEventListener('click', () => aviso.remove());
+
+        aviso.append(cuerpo, cerrar);
+        contenedor().appendChild(aviso);
+    }
+
+    function avisoFolio(texto, folio, colorBorde) {
+        mostrarAviso(texto, URL_COMENTARIO.replace(/0$/, folio), `Ver folio #${folio}`, colorBorde);
+    }
+
+    // Refresca el badge del encabezado leyendo el contador desnormalizado (una consulta por PK).
+    // Devuelve la cantidad de pendientes (o null si no se pudo leer).
+    function actualizarBadge() {
+        const badge = document.getElementById('badge-pendientes');
+        if (!badge) return Promise.resolve(null);
+        return fetch(badge.dataset.url, { headers: { 'Accept': 'application/json' } })
+            .then(r => r.ok ? r.json() : null)
+            .then(d => {
+                if (!d) return null;
+                badge.textContent = d.pendientes;
+                badge.classList.toggle('hidden', d.pendientes === 0);
+                return d.pendientes;
+            })
+            .catch(() => null);
+    }
+
+    // --- Sin SSE: sondeo del contador de pendientes ---
+    if (!URL_STREAM || !window.EventSource) {
+        const badge = document.getElementById('badge-pendientes');
+        if (!badge) return;
+        let anteriores = parseInt(badge.textContent, 10) || 0;
+
+        setInterval(() => {
+            if (document.hidden) return; // Pestañas en segundo plano no consultan
+            actualizarBadge().then(pendientes => {
+                if (pendientes === null) return;
+                if (pendientes > anteriores) {
+                    const nuevos = pendientes - anteriores;
+                    mostrarAviso(
+                        nuevos === 1 ? 'Tienes un nuevo comentario en tu Libro de Novedades.'
+                                     : `Tienes ${nuevos} nuevos comentarios en tu Libro de Novedades.`,
+                        badge.closest('a').href, 'Ver mi Libro de Novedades', 'border-blue-500');
+                }
+                anteriores = pendientes;
+            });
+        }, INTERVALO_SONDEO * 1000);
+        return;
+    }
+
+    const fuente = new EventSource(URL_STREAM);
+
+    fuente.addEventListener('nuevo_comentario', (e) => {
+        const d = JSON.parse(e.data);
+        const texto = d.funcionario_id === USUARIO_ID
+            ? `Tienes un nuevo comentario ${d.tipo_comentario} en tu Libro de Novedades.`
+            : `Nuevo comentario ${d.tipo_comentario} para ${d.funcionario_nombre}.`;
+        avisoFolio(texto, d.folio, d.tipo_comentario === 'Favorable' ? 'border-green-500' : 'border-red-500');
+        if (d.funcionario_id === USUARIO_ID) actualizarBadge();
+    });
+
+    fuente.addEventListener('comentario_aceptado', (e) => {
+        const d = JSON.parse(e.data);
+        if (d.funcionario_id === USUARIO_ID) return; // Quien acepta ya ve la confirmación
+        avisoFolio(`${d.funcionario_nombre} tomó conocimiento de un comentario.`, d.folio, 'border-blue-500');
+    });
+
+})();
@@ -10,16 +10,19 @@ document.addEventListener('DOMContentLoaded', function() {
 
         const target = event.currentTarget;
         const pdfUrl = target.dataset.pdfUrl; // URL base para el PDF
-        const factores = JSON.parse(target.dataset.factores || '[]');
 
-        // Llenar el select de factores
+        // Llenar el select de factores (desde /api/catalogos, revalidado por el navegador)
         factorSelect.innerHTML = '<option value="">Todos</option>'; // Resetear
-        factores.forEach(factor => {
-            const option = document.createElement('option');
-            option.value = factor.id;
-            option.textContent = factor.nombre;
-            factorSelect.appendChild(option);
-        });
+        window.obtenerCatalogos()
+            .then(catalogos => {
+                catalogos.factores.forEach(factor => {
+                    const option = document.createElement('option');
+                    option.value = factor.id;
+                    option.textContent = factor.nombre;
+                    factorSelect.appendChild(option);
+                });
+            })
+            .catch(error => console.error('Error al cargar los factores:', error));
 
         // Establecer la URL base en el formulario
         reportForm.action = pdfUrl;
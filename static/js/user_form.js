@@ -10,9 +10,9 @@ document.addEventListener('DOMContentLoaded', function () {
             return;
         }
 
-        // Realiza una petición a nuestra API para obtener las unidades.
-        fetch(`/api/unidades/${establecimientoId}`)
-            .then(response => response.json())
+        // Las unidades salen del catálogo compartido (revalidado con ETag, sin consultar la BD cada vez).
+        window.obtenerCatalogos()
+            .then(catalogos => catalogos.unidades.filter(unidad => unidad.establecimiento_id == establecimientoId))
             .then(data => {
                 // Limpia el menú de unidades.
                 unidadSelect.innerHTML = '<option value="" disabled selected>Selecciona una unidad...</option>';
@@ -52,4 +52,78 @@ document.addEventListener('DOMContentLoaded', function () {
             fetchUnidades(initialEstablecimientoId, initialUnidadId);
         }
     }
-});
\ No newline at end of file
+
+    // --- Selectores de jefatura con búsqueda (reemplazan la lista completa de jefes) ---
+    document.querySelectorAll('.selector-jefe').forEach(function (selector) {
+        const url = selector.dataset.url;
+        const valor = selector.querySelector('.jefe-valor');
+        const busqueda = selector.querySelector('.jefe-busqueda');
+        const resultados = selector.querySelector('.jefe-resultados');
+        const filtroRol = selector.querySelector('.jefe-rol');
+        let temporizador = null;
+        let ultimoTexto = '';
+
+        function elegir(id, nombre) {
+            valor.value = id;
+            busqueda.value = nombre;
+            resultados.classList.add('hidden');
+        }
+
+        function buscar(texto, nuevaPagina, fase = 'prefijo') {
+            // Mismos filtros que el formulario: rol elegido en el selector y establecimiento del usuario
+            const params = new URLSearchParams({ q: texto, pagina: nuevaPagina, fase: fase });
+            if (filtroRol && filtroRol.value) params.set('rol', filtroRol.value);
+            if (establecimientoSelect.value) params.set('establecimiento_id', establecimientoSelect.value);
+            fetch(`${url}?${params}`)
+                .then(response => response.json())
+                .then(data => {
+                    // Descarta respuestas atrasadas si el usuario siguió escribiendo
+                    if (texto !== busqueda.value.trim()) return;
+                    if (nuevaPagina === 1 && fase === 'prefijo') resultados.innerHTML = '';
+                    resultados.querySelector('.jefe-mas')?.remove();
+
+                    data.resultados.forEach(jefe => {
+                        const item = document.createElement('li');
+                        item.className = 'px-3 py-2 cursor-pointer hover:bg-blue-50';
+                        item.innerHTML = '<div class="font-medium text-gray-800"></div><div class="text-xs text-gray-500"></div>';
+                        item.children[0].textContent = jefe.nombre;
+                        item.children[1].textContent = [jefe.rol, jefe.establecimiento].filter(Boolean).join(' · ');
+                        item.addEventListener('mousedown', e => { e.preventDefault(); elegir(jefe.id, jefe.nombre); });
+                        resultados.appendChild(item);
+                    });
+
+                    if (data.hay_mas) {
+                        const mas = document.createElement('li');
+                        mas.className = 'jefe-mas px-3 py-2 text-center text-xs text-blue-600 cursor-pointer hover:bg-gray-50';
+                        mas.textContent = 'Ver más resultados...';
+                        mas.addEventListener('mousedown', e => { e.preventDefault(); buscar(texto, data.pagina + 1, data.fase); });
+                        resultados.appendChild(mas);
+                    }
+                    if (!resultados.children.length) {
+                        resultados.innerHTML = '<li class="px-3 py-2 text-gray-500">Sin resultados.</li>';
+                    }
+                    resultados.classList.remove('hidden');
+                })
+                .catch(error => console.error('Error al buscar jefaturas:', error));
+        }
+
+        busqueda.addEventListener('input', function () {
+            valor.value = '';  // Texto editado: hasta elegir de la lista no hay jefe asignado
+            clearTimeout(temporizador);
+            const texto = this.value.trim();
+            temporizador = setTimeout(() => {
+                if (texto !== ultimoTexto || resultados.classList.contains('hidden')) {
+                    ultimoTexto = texto;
+                    buscar(texto, 1);
+                }
+            }, 250);
+        });
+        busqueda.addEventListener('focus', () => { if (!valor.value) buscar(busqueda.value.trim(), 1); });
+        busqueda.addEventListener('blur', () => {
+            resultados.classList.add('hidden');
+            if (!valor.value) busqueda.value = '';
+        });
+        selector.querySelector('.jefe-limpiar').addEventListener('click', () => elegir('', ''));
+        filtroRol?.addEventListener('change', () => buscar(busqueda.value.trim(), 1));
+    });
+});
@@ -4,7 +4,13 @@ from .decorators import (
     admin_required, 
     jefa_required, 
     encargado_unidad_required, 
-    encargado_recinto_required
+    encargado_recinto_required,
+    solo_lectura
 )
-from .helpers import es_superior_jerarquico, registrar_log
-from .email import enviar_correo_reseteo, enviar_correo_notificacion_comentario
\ No newline at end of file
+from .helpers import es_superior_jerarquico, filtro_puede_anotar, registrar_log
+from .email import (
+    enviar_correo_reseteo, 
+    enviar_correo_notificacion_comentario, 
+    mensaje_notificacion_comentario, 
+    encolar_correos
+)
\ No newline at end of file
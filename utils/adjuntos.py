@@ -0,0 +1,116 @@
+# utils/adjuntos.py
+"""
+Adjuntos de comentarios guardados en disco por contenido.
+
+- Werkzeug ya deja en un archivo temporal las subidas grandes (no en memoria);
+  almacenar_adjuntos() lo copia por bloques al directorio de adjuntos calculando el
+  SHA-256 en la misma pasada. Se llama antes de escribir en la BD: copiar hasta 32 MB
+  no ocurre dentro de la transacción del comentario (ni con sus bloqueos tomados), y
+  registrar_adjuntos() solo agrega las filas.
+- El archivo final se llama como su hash (ADJUNTOS_DIR/ab/cd/abcd...): si ya existe,
+  se descarta la copia nueva y las filas de 'adjuntos' apuntan al mismo contenido.
+- El tipo MIME sale de la extensión permitida, nunca del que declara el navegador, y la
+  descarga lleva 'X-Content-Type-Options: nosniff'.
+- La descarga usa send_file(conditional=True): ETag = hash, soporte de Range y envío
+  sin copias (wsgi.file_wrapper / sendfile de gunicorn).
+"""
+import hashlib
+import os
+import tempfile
+
+from flask import current_app, send_file
+from werkzeug.utils import secure_filename
+
+BLOQUE = 64 * 1024
+# Extensión permitida -> tipo MIME con que se guarda y se descarga
+EXTENSIONES_PERMITIDAS = {
+    'pdf': 'application/pdf',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'doc': 'application/msword',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'xls': 'application/vnd.ms-excel',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'odt': 'application/vnd.oasis.opendocument.text',
+    'txt': 'text/plain',
+}
+MAX_ADJUNTOS = 5
+
+def directorio_adjuntos(app):
+    return app.config.get('ADJUNTOS_DIR') or os.path.join(app.instance_path, 'adjuntos')
+
+def ruta_contenido(sha256):
+    return os.path.join(directorio_adjuntos(current_app), sha256[:2], sha256[2:4], sha256)
+
+def extension_permitida(nombre):
+    return '.' in nombre and nombre.rsplit('.', 1)[1].lower() in EXTENSIONES_PERMITIDAS
+
+def tipo_mime(nombre):
+    extension = nombre.rsplit('.', 1)[1].lower() if '.' in nombre else ''
+    return EXTENSIONES_PERMITIDAS.get(extension, 'application/octet-stream')
+
+def validar_adjuntos(archivos):
+    """Mensaje de error para el flash, o None si los archivos se pueden guardar."""
+    if len(archivos) > MAX_ADJUNTOS:
+        return f'Puedes adjuntar como máximo {MAX_ADJUNTOS} archivos por comentario.'
+    rechazados = [a.filename for a in archivos if not extension_permitida(a.filename)]
+    if rechazados:
+        return (f"Tipo de archivo no permitido: {', '.join(rechazados)}. "
+                f"Formatos aceptados: {', '.join(sorted(EXTENSIONES_PERMITIDAS))}.")
+    return None
+
+def _guardar_contenido(stream):
+    """Copia el stream al almacén por bloques. Devuelve (sha256, tamaño en bytes)."""
+    directorio = directorio_adjuntos(current_app)
+    os.makedirs(directorio, exist_ok=True)
+    sha = hashlib.sha256()
+    tamano = 0
+    # Temporal en el mismo sistema de archivos: os.replace es atómico
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, prefix='.subida-')
+    try:
+        with os.fdopen(descriptor, 'wb') as destino:
+            while bloque := stream.read(BLOQUE):
+                sha.update(bloque)
+                destino.write(bloque)
+                tamano += len(bloque)
+        digest = sha.hexdigest()
+        ruta = ruta_contenido(digest)
+        if os.path.exists(ruta):
+            os.remove(temporal)  # Contenido repetido: se reutiliza el existente
+        else:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            os.replace(temporal, ruta)
+        return digest, tamano
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+def almacenar_adjuntos(archivos):
+    """Guarda el contenido de los FileStorage (ya validados). Llamar antes de abrir la transacción."""
+    almacenados = []
+    for archivo in archivos:
+        sha256, tamano = _guardar_contenido(archivo.stream)
+        nombre = secure_filename(archivo.filename) or 'adjunto'
+        almacenados.append({'sha256': sha256, 'tamano': tamano, 'nombre_original': nombre,
+                            'tipo_mime': tipo_mime(archivo.filename)})
+    return almacenados
+
+def registrar_adjuntos(almacenados, folio, usuario_id):
+    """Agrega a la sesión las filas de 'adjuntos' del comentario (sin commit)."""
+    from models import db, Adjunto  # Importación diferida
+
+    adjuntos = [Adjunto(folio=folio, subido_por_id=usuario_id, **datos) for datos in almacenados]
+    db.session.add_all(adjuntos)
+    return adjuntos
+
+def respuesta_adjunto(adjunto):
+    """Descarga con ETag (el hash), Range y revalidación en cada uso (el permiso puede cambiar)."""
+    # Tipo según la extensión también para filas antiguas (guardaban el que enviaba el navegador)
+    respuesta = send_file(ruta_contenido(adjunto.sha256), mimetype=tipo_mime(adjunto.nombre_original),
+                          as_attachment=True, download_name=adjunto.nombre_original, conditional=True,
+                          etag=adjunto.sha256)
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    respuesta.headers['X-Content-Type-Options'] = 'nosniff'
+    return respuesta
@@ -0,0 +1,179 @@
+# utils/api.py
+"""
+API de lectura para integraciones (RR.HH., BI), en /api/v1 (blueprints/api.py).
+
+- Autenticación: cabecera 'Authorization: Bearer <token>'. Los tokens se crean con
+  'flask crear-token-api' y en la BD solo queda su SHA-256. Cada token lee con el
+  alcance de su usuario (utils/politicas.py), igual que en las vistas web.
+- Paginación por clave (keyset): ?cursor=<'cursor' de la respuesta anterior>&limite=N. La
+  consulta avanza por el índice de la clave primaria en vez de OFFSET: la página mil cuesta lo
+  mismo que la primera, y las filas nuevas no desplazan las páginas siguientes. El cursor es
+  opaco (última clave + 'sincronizado_hasta' de la primera página); ?despues_de=<clave> sigue
+  aceptándose, pero entonces el cliente debe guardar el 'sincronizado_hasta' de la primera página.
+- ?campos=a,b lee solo esas columnas (la clave se incluye siempre).
+- ?actualizado_desde=<ISO 8601> trae solo lo creado o modificado desde esa fecha. Cada
+  respuesta informa 'sincronizado_hasta' para usarlo en la próxima sincronización
+  (con un margen hacia atrás: puede repetir filas, nunca saltarse una). Es el instante de la
+  primera página: las siguientes lo heredan del cursor, porque un valor posterior saltaría
+  las filas modificadas mientras se recorrían las páginas ya leídas.
+- ?formato=ndjson (o 'Accept: application/x-ndjson') envía en flujo todas las filas
+  restantes, una por línea, leyendo la BD por lotes de API_LOTE.
+"""
+import base64
+import binascii
+import hashlib
+import json
+import secrets
+from datetime import date, datetime, timedelta
+
+import pytz
+from sqlalchemy import select
+
+LIMITE_POR_DEFECTO = 500
+# 'sincronizado_hasta' se informa con este margen: una fila modificada justo antes de la
+# consulta puede confirmarse (commit) después de ella
+MARGEN_SINCRONIZACION = timedelta(minutes=5)
+
+# Recursos expuestos. 'alcance': columna del usuario dueño de la fila, filtrada con
+# Alcance.filtro_visibles; None = solo Admin (como ver_logs).
+RECURSOS = {
+    'usuarios': {
+        'modelo': 'Usuario', 'clave': 'id', 'actualizado': 'fecha_actualizacion', 'alcance': 'id',
+        'campos': ('id', 'rut', 'nombre_completo', 'email', 'activo', 'rol_id', 'establecimiento_id', 'unidad_id',
+                   'calidad_juridica_id', 'categoria_id', 'jefe_directo_id', 'segundo_jefe_id',
+                   'fecha_creacion', 'fecha_actualizacion'),
+    },
+    'comentarios': {
+        'modelo': 'Comentario', 'clave': 'folio', 'actualizado': 'fecha_actualizacion', 'alcance': 'funcionario_id',
+        'campos': ('folio', 'tipo', 'estado', 'motivo_jefe', 'observacion_funcionario', 'fecha_creacion',
+                   'fecha_aceptacion', 'fecha_actualizacion', 'funcionario_id', 'jefe_id', 'subfactor_id'),
+    },
+    'comentarios_archivados': {
+        'modelo': 'ComentarioArchivado', 'clave': 'folio', 'actualizado': 'fecha_archivado', 'alcance': 'funcionario_id',
+        'campos': ('folio', 'tipo', 'estado', 'motivo_jefe', 'observacion_funcionario', 'fecha_creacion',
+                   'fecha_aceptacion', 'funcionario_id', 'jefe_id', 'subfactor_id', 'periodo', 'fecha_archivado'),
+    },
+    'logs': {
+        'modelo': 'Log', 'clave': 'id', 'actualizado': 'timestamp', 'alcance': None,
+        'campos': ('id', 'timestamp', 'usuario_id', 'usuario_nombre', 'accion', 'detalles'),
+    },
+}
+
+# --- Tokens ---
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def crear_token(usuario, nombre):
+    """Crea un token para 'usuario' y lo devuelve en claro (no se puede volver a consultar)."""
+    from models import db, TokenApi, Log  # Importación diferida
+
+    token = secrets.token_urlsafe(32)
+    db.session.add(TokenApi(nombre=nombre, token_hash=hash_token(token), usuario_id=usuario.id))
+    db.session.add(Log(usuario_nombre='Sistema/API', accion='Creación de Token API',
+                       detalles=f"Token '{nombre}' con el alcance de {usuario.nombre_completo} ({usuario.email})."))
+    db.session.commit()
+    return token
+
+def revocar_tokens(nombre):
+    """Revoca los tokens vigentes con ese nombre. Devuelve cuántos revocó."""
+    from models import db, TokenApi, Log, obtener_hora_chile  # Importación diferida
+
+    tokens = TokenApi.query.filter_by(nombre=nombre, fecha_revocacion=None).all()
+    for token in tokens:
+        token.fecha_revocacion = obtener_hora_chile()
+    if tokens:
+        db.session.add(Log(usuario_nombre='Sistema/API', accion='Revocación de Token API',
+                           detalles=f"Token '{nombre}' revocado ({len(tokens)})."))
+        db.session.commit()
+    return len(tokens)
+
+def usuario_de_token(cabecera):
+    """Usuario (activo) del token de 'Authorization: Bearer ...', o None si falta, no existe o está revocado."""
+    from models import db, TokenApi, Usuario  # Importación diferida
+
+    tipo, _, token = (cabecera or '').partition(' ')
+    if tipo.lower() != 'bearer' or not token.strip():
+        return None
+    return db.session.scalar(
+        select(Usuario).join(TokenApi, TokenApi.usuario_id == Usuario.id)
+        .where(TokenApi.token_hash == hash_token(token.strip()), TokenApi.fecha_revocacion.is_(None),
+               Usuario.activo.is_(True))
+    )
+
+# --- Consultas ---
+
+def leer_fecha(valor):
+    """ISO 8601 ('2025-03-01', '2025-03-01T08:00:00-03:00') -> datetime en hora de Chile sin zona."""
+    try:
+        fecha = datetime.fromisoformat(valor)
+    except ValueError:
+        raise ValueError(f"Fecha inválida en actualizado_desde: '{valor}' (usar ISO 8601).") from None
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(pytz.timezone('America/Santiago')).replace(tzinfo=None)
+    return fecha
+
+def consulta_recurso(nombre, alcance, campos=None, despues_de=None, actualizado_desde=None):
+    """
+    SELECT de las columnas pedidas, ordenado por la clave, con el alcance del usuario.
+    Lanza PermissionError (recurso solo para Admin) o ValueError (parámetros inválidos).
+    """
+    import models  # Importación diferida
+
+    recurso = RECURSOS[nombre]
+    modelo = getattr(models, recurso['modelo'])
+    if recurso['alcance'] is None and not alcance.es_admin:
+        raise PermissionError(f"El recurso '{nombre}' solo está disponible para tokens de administrador.")
+
+    if campos:
+        desconocidos = [c for c in campos if c not in recurso['campos']]
+        if desconocidos:
+            raise ValueError(f"Campos desconocidos: {', '.join(desconocidos)}. "
+                             f"Disponibles: {', '.join(recurso['campos'])}.")
+        campos = [recurso['clave']] + [c for c in campos if c != recurso['clave']]
+    else:
+        campos = recurso['campos']
+
+    clave = getattr(modelo, recurso['clave'])
+    consulta = select(*(getattr(modelo, c) for c in campos)).order_by(clave)
+    if recurso['alcance'] is not None:
+        consulta = consulta.where(alcance.filtro_visibles(getattr(modelo, recurso['alcance'])))
+    if despues_de is not None:
+        consulta = consulta.where(clave > despues_de)
+    if actualizado_desde is not None:
+        consulta = consulta.where(getattr(modelo, recurso['actualizado']) >= actualizado_desde)
+    return consulta, recurso['clave']
+
+def sincronizado_hasta():
+    """Valor de 'actualizado_desde' para la próxima sincronización incremental."""
+    from models import obtener_hora_chile  # Importación diferida
+
+    return (obtener_hora_chile() - MARGEN_SINCRONIZACION).isoformat(timespec='seconds')
+
+def codificar_cursor(clave, hasta):
+    """Cursor opaco de la página siguiente: última clave entregada y 'sincronizado_hasta' de la primera página."""
+    return base64.urlsafe_b64encode(json.dumps([clave, hasta]).encode()).decode().rstrip('=')
+
+def leer_cursor(cursor):
+    """Cursor -> (clave, hasta). Lanza ValueError si no lo generó codificar_cursor."""
+    try:
+        clave, hasta = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        datetime.fromisoformat(hasta)
+        if not isinstance(clave, int):
+            raise TypeError
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Cursor inválido (usar el valor 'cursor' de la respuesta anterior).") from None
+    return clave, hasta
+
+def _valor_json(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+def a_json(datos):
+    return json.dumps(datos, default=_valor_json, ensure_ascii=False, separators=(',', ':'))
+
+def lineas_ndjson(resultado):
+    """Un bloque de texto por lote leído de la BD (evita una escritura al socket por fila)."""
+    for lote in resultado.mappings().partitions():
+        yield ''.join(a_json(dict(fila)) + '\n' for fila in lote)
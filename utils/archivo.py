@@ -0,0 +1,152 @@
+# utils/archivo.py
+"""
+Archivo de periodos de evaluación cerrados (tabla 'comentarios_archivados').
+
+- archivar_periodo(año): mueve los comentarios 'Aceptada' de un año ya cerrado desde
+  'comentarios' por lotes (INSERT ... SELECT + DELETE por folio, un commit por lote).
+  Los pendientes se quedan en la tabla activa aunque sean de un año anterior.
+- Lectura unificada: las vistas y el PDF solo consultan el archivo cuando el rango de
+  fechas pedido llega a un periodo archivado (incluye_archivo). Sin filtros de fecha se
+  muestra el periodo activo y la plantilla avisa cómo consultar los anteriores.
+- Los folios se conservan, así que enlaces como /comentario/ver/<folio> siguen funcionando.
+"""
+from datetime import date
+
+from flask import g
+from flask_sqlalchemy.pagination import Pagination
+from sqlalchemy import and_, delete, func, insert, literal, select, union_all
+
+from .cache import incrementar_version
+from .paginacion import paginar
+
+# --- Archivado (CLI) ---
+
+def archivar_periodo(año, lote=1000, simular=False):
+    """Mueve los comentarios aceptados de 'año' al archivo. Devuelve cuántos movió (o movería)."""
+    from models import db, Comentario, ComentarioArchivado, obtener_hora_chile  # Importación diferida
+
+    condicion = and_(Comentario.estado == 'Aceptada',
+                     Comentario.fecha_creacion >= date(año, 1, 1),
+                     Comentario.fecha_creacion < date(año + 1, 1, 1))
+    if simular:
+        return db.session.scalar(select(func.count()).select_from(Comentario).where(condicion))
+
+    columnas = [c.name for c in Comentario.__table__.columns]
+    movidos = 0
+    while True:
+        folios = db.session.scalars(
+            select(Comentario.folio).where(condicion).order_by(Comentario.folio).limit(lote).with_for_update()
+        ).all()
+        if not folios:
+            break
+        db.session.execute(insert(ComentarioArchivado).from_select(
+            columnas + ['periodo', 'fecha_archivado'],
+            select(*Comentario.__table__.columns, literal(año), literal(obtener_hora_chile()))
+            .where(Comentario.folio.in_(folios))
+        ))
+        db.session.execute(delete(Comentario).where(Comentario.folio.in_(folios)))
+        incrementar_version('comentarios')  # Conteos del historial en caché
+        db.session.commit()
+        movidos += len(folios)
+    return movidos
+
+# --- Lectura unificada ---
+
+def ultimo_periodo_archivado():
+    """Año más reciente del archivo (None si está vacío). Una consulta por petición."""
+    from models import db, ComentarioArchivado
+
+    if '_ultimo_periodo_archivado' not in g:
+        g._ultimo_periodo_archivado = db.session.scalar(select(func.max(ComentarioArchivado.periodo)))
+    return g._ultimo_periodo_archivado
+
+def incluye_archivo(fecha_inicio=None, fecha_fin=None):
+    """True si el rango pedido llega a un periodo archivado ('Hasta' sin 'Desde' llega a todos)."""
+    if fecha_inicio is None and fecha_fin is None:
+        return False
+    ultimo = ultimo_periodo_archivado()
+    if ultimo is None:
+        return False
+    return fecha_inicio is None or fecha_inicio.year <= ultimo
+
+def consulta_comentarios(modelo, funcionario_id, tipo='', factor_id='', subfactor_id=''):
+    """Filtros del libro sobre Comentario o ComentarioArchivado (mismas columnas)."""
+    from models import SubFactor
+
+    query = modelo.query.filter(modelo.funcionario_id == funcionario_id)
+    if tipo:
+        query = query.filter(modelo.tipo == tipo)
+    if factor_id:
+        query = query.join(modelo.subfactor).filter(SubFactor.factor_id == factor_id)
+    if subfactor_id:
+        query = query.filter(modelo.subfactor_id == subfactor_id)
+    return query
+
+def filtrar_fechas(query, modelo, fecha_inicio=None, fecha_fin=None):
+    if fecha_inicio:
+        query = query.filter(modelo.fecha_creacion >= fecha_inicio)
+    if fecha_fin:
+        query = query.filter(modelo.fecha_creacion <= fecha_fin)
+    return query
+
+def _modelos(fecha_inicio, fecha_fin):
+    from models import Comentario, ComentarioArchivado
+
+    if incluye_archivo(fecha_inicio, fecha_fin):
+        return (Comentario, ComentarioArchivado)
+    return (Comentario,)
+
+class PaginacionUnion(Pagination):
+    """
+    Misma interfaz que query.paginate(), sobre varias tablas de comentarios.
+    Pagina la unión de las claves (folio, fecha) en la BD y luego carga solo los de la página.
+    """
+
+    def _query_items(self):
+        from models import db
+
+        claves = union_all(*[
+            query.with_entities(literal(i).label('origen'), modelo.folio.label('folio'),
+                                modelo.fecha_creacion.label('fecha')).order_by(None).statement
+            for i, (modelo, query) in enumerate(self._query_args['consultas'])
+        ]).subquery()
+        filas = db.session.execute(
+            select(claves.c.origen, claves.c.folio)
+            .order_by(claves.c.fecha.desc(), claves.c.folio.desc())
+            .limit(self.per_page).offset(self._query_offset)
+        ).all()
+
+        cargados = {}
+        for i, (modelo, _) in enumerate(self._query_args['consultas']):
+            folios = [folio for origen, folio in filas if origen == i]
+            if folios:
+                cargados.update({(i, c.folio): c for c in modelo.query.filter(modelo.folio.in_(folios))})
+        return [cargados[(origen, folio)] for origen, folio in filas]
+
+    def _query_count(self):
+        return sum(query.order_by(None).count() for _, query in self._query_args['consultas'])
+
+def historial_comentarios(funcionario_id, filtros, fecha_inicio, fecha_fin, page, per_page=5):
+    """Historial aceptado paginado (fecha y folio descendentes), con el archivo si las fechas llegan a él."""
+    consultas = [
+        (modelo, filtrar_fechas(consulta_comentarios(modelo, funcionario_id, **filtros)
+                                .filter(modelo.estado == 'Aceptada'), modelo, fecha_inicio, fecha_fin))
+        for modelo in _modelos(fecha_inicio, fecha_fin)
+    ]
+    if len(consultas) == 1:
+        from models import db, ContadorComentarios  # Importación diferida
+
+        # El conteo en caché se invalida cuando el funcionario acepta un comentario
+        contador = db.session.get(ContadorComentarios, funcionario_id)
+        modelo, query = consultas[0]
+        return paginar(query.order_by(modelo.fecha_creacion.desc(), modelo.folio.desc()), page, per_page,
+                       versiones=('comentarios',), firma=contador.aceptados if contador else 0)
+    return PaginacionUnion(page=page, per_page=per_page, error_out=False, consultas=consultas)
+
+def comentarios_reporte(funcionario_id, filtros, fecha_inicio, fecha_fin):
+    """Comentarios del PDF (todos los estados), en orden cronológico."""
+    comentarios = []
+    for modelo in _modelos(fecha_inicio, fecha_fin):
+        query = filtrar_fechas(consulta_comentarios(modelo, funcionario_id, **filtros), modelo, fecha_inicio, fecha_fin)
+        comentarios += query.order_by(modelo.fecha_creacion.asc()).all()
+    return sorted(comentarios, key=lambda c: c.fecha_creacion)
@@ -0,0 +1,154 @@
+# utils/cache.py
+"""
+Caché de fragmentos renderizados de plantillas.
+
+Uso en plantillas:
+    {% cache 'panel_unidad', current_user.id, pagination.page, version_cache('usuarios') %}
+        ... HTML costoso ...
+    {% endcache %}
+
+- Las partes de la clave identifican el fragmento y el alcance de quien lo ve
+  (ej: su id, la página y la búsqueda).
+- version_cache(...) agrega el número de versión de los datos que usa el fragmento.
+  Las versiones viven en la tabla 'versiones_cache' y se incrementan en la misma
+  transacción que modifica esos datos (incrementar_version), así que todos los
+  workers dejan de usar los fragmentos antiguos al mismo tiempo. Cada incremento toma
+  el bloqueo de esa fila hasta el commit: solo se usan para datos que cambian poco.
+- Los datos que cambian con cada comentario (contadores de los paneles, historial) no
+  tienen versión global: la clave usa los contadores de las filas mostradas
+  (utils/contadores.py, firma_contadores).
+- Los fragmentos se guardan en memoria de cada proceso (CacheLocal): con tope de
+  entradas (CACHE_FRAGMENTOS_MAX, se descartan las menos usadas) y vencimiento
+  (CACHE_FRAGMENTOS_TTL segundos).
+
+Versiones usadas:
+  'catalogos'   roles, establecimientos, unidades, calidades, categorías, factores
+                (se editan directo en la BD: 'flask invalidar-cache catalogos').
+  'usuarios'    altas, ediciones y activación de usuarios.
+  'comentarios' cambios masivos de comentarios (reparar-contadores, archivar-periodo).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from sqlalchemy import select, update
+from sqlalchemy.dialects.mysql import insert as insert_mysql
+from sqlalchemy.dialects.postgresql import insert as insert_postgresql
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+
+VERSIONES = ('catalogos', 'usuarios', 'comentarios')
+
+class CacheLocal:
+    """Diccionario LRU con vencimiento, seguro entre hilos."""
+
+    def __init__(self, max_entradas=1000, ttl=300):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None or entrada[0] < time.monotonic():
+                if entrada is not None:
+                    del self._datos[clave]
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+cache_fragmentos = CacheLocal()
+
+# --- Versiones de los datos ---
+
+def version_cache(*nombres):
+    """Versiones de los datos indicados, ej: '3.17'. Una consulta por petición (se memoriza en g)."""
+    from models import db, VersionCache  # Importación diferida
+
+    versiones = g.get('_versiones_cache')
+    if versiones is None:
+        versiones = g._versiones_cache = dict(db.session.execute(select(VersionCache.nombre, VersionCache.version)).all())
+    return '.'.join(str(versiones.get(nombre, 0)) for nombre in nombres)
+
+def sembrar_versiones():
+    """Crea las filas de VERSIONES que falten (init-db), para que incrementar_version sea un UPDATE simple."""
+    from models import db, VersionCache  # Importación diferida
+
+    existentes = set(db.session.scalars(select(VersionCache.nombre)))
+    for nombre in VERSIONES:
+        if nombre not in existentes:
+            db.session.add(VersionCache(nombre=nombre, version=0))
+    db.session.commit()
+
+def incrementar_version(nombre):
+    """Invalida los fragmentos que dependen de 'nombre'. Queda en la transacción actual (no hace commit)."""
+    from models import db, VersionCache  # Importación diferida
+
+    tabla = VersionCache.__table__
+    dialecto = db.session.get_bind().dialect.name
+    # UPSERT: dos primeras escrituras simultáneas no chocan al crear la fila
+    if dialecto == 'mysql':
+        stmt = insert_mysql(tabla).values(nombre=nombre, version=1)
+        stmt = stmt.on_duplicate_key_update(version=tabla.c.version + 1)
+    elif dialecto in ('sqlite', 'postgresql'):
+        stmt = (insert_sqlite if dialecto == 'sqlite' else insert_postgresql)(tabla).values(nombre=nombre, version=1)
+        stmt = stmt.on_conflict_do_update(index_elements=[tabla.c.nombre], set_={'version': tabla.c.version + 1})
+    else:
+        # Otros motores: las filas existen desde init-db (sembrar_versiones)
+        stmt = update(tabla).where(tabla.c.nombre == nombre).values(version=tabla.c.version + 1)
+    db.session.execute(stmt)
+    g.pop('_versiones_cache', None)
+
+# --- Extensión de Jinja ---
+
+class ExtensionCache(Extension):
+    """Etiqueta {% cache partes... %}...{% endcache %}."""
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        partes = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            partes.append(parser.parse_expression())
+        cuerpo = parser.parse_statements(['name:endcache'], drop_needle=True)
+        llamada = self.call_method('_renderizar', [nodes.Const(parser.name), nodes.List(partes)])
+        return nodes.CallBlock(llamada, [], [], cuerpo).set_lineno(lineno)
+
+    def _renderizar(self, plantilla, partes, caller):
+        if not current_app.config.get('CACHE_FRAGMENTOS_HABILITADO', True):
+            return caller()
+        clave = '|'.join([plantilla or ''] + [str(p) for p in partes])
+        fragmento = cache_fragmentos.obtener(clave)
+        if fragmento is None:
+            fragmento = Markup(caller())
+            cache_fragmentos.guardar(clave, fragmento)
+        return fragmento
+
+def init_cache(app):
+    """Registra la etiqueta {% cache %}, la función version_cache y dimensiona la caché local."""
+    cache_fragmentos.max_entradas = app.config['CACHE_FRAGMENTOS_MAX']
+    cache_fragmentos.ttl = app.config['CACHE_FRAGMENTOS_TTL']
+    app.jinja_env.add_extension(ExtensionCache)
+    app.jinja_env.globals['version_cache'] = version_cache
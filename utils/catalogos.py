@@ -0,0 +1,53 @@
+# utils/catalogos.py
+"""
+Catálogos para los filtros y formularios del lado del navegador (/api/catalogos).
+
+El JSON (factores, sub-factores, establecimientos y unidades) se arma una vez por
+versión de 'catalogos' (utils/cache.py) y se guarda en memoria junto con su ETag
+(hash del contenido). Las respuestas llevan 'Cache-Control: private, no-cache':
+el navegador guarda la copia y la revalida en cada uso con If-None-Match, recibiendo
+un 304 sin cuerpo mientras el catálogo no cambie.
+"""
+import hashlib
+import json
+
+from flask import Response, request
+
+from utils.cache import CacheLocal, version_cache
+
+CACHE_CONTROL = 'private, no-cache'
+
+_catalogos = CacheLocal(max_entradas=8, ttl=300)
+
+def _armar_catalogos():
+    from models import Establecimiento, Factor, SubFactor, Unidad  # Importación diferida
+
+    return {
+        'factores': [{'id': f.id, 'nombre': f.nombre} for f in Factor.query.order_by(Factor.nombre)],
+        'subfactores': [{'id': sf.id, 'nombre': sf.nombre, 'factor_id': sf.factor_id}
+                        for sf in SubFactor.query.order_by(SubFactor.id)],
+        'establecimientos': [{'id': e.id, 'nombre': e.nombre}
+                             for e in Establecimiento.query.order_by(Establecimiento.nombre)],
+        'unidades': [{'id': u.id, 'nombre': u.nombre, 'establecimiento_id': u.establecimiento_id}
+                     for u in Unidad.query.order_by(Unidad.nombre)],
+    }
+
+def obtener_catalogos():
+    """Catálogos de la versión vigente (dict). Solo consulta la BD al cambiar la versión o vencer el TTL."""
+    version = version_cache('catalogos')
+    datos = _catalogos.obtener(version)
+    if datos is None:
+        datos = _armar_catalogos()
+        _catalogos.guardar(version, datos)
+    return datos
+
+def respuesta_json_condicional(datos):
+    """
+    JSON con ETag fuerte y Cache-Control revalidable; 304 si el navegador ya tiene esa versión.
+    El add_header global respeta el Cache-Control que trae la respuesta.
+    """
+    cuerpo = json.dumps(datos, ensure_ascii=False, separators=(',', ':')).encode()
+    respuesta = Response(cuerpo, mimetype='application/json')
+    respuesta.set_etag(hashlib.sha256(cuerpo).hexdigest()[:32])
+    respuesta.headers['Cache-Control'] = CACHE_CONTROL
+    return respuesta.make_conditional(request)
@@ -0,0 +1,144 @@
+# utils/contadores.py
+"""
+Mantenimiento de la tabla 'contadores_comentarios'.
+
+Los incrementos se hacen en la BD (UPSERT con 'columna = columna + delta'), dentro de la
+transacción de la vista, por lo que dos jefaturas anotando a la vez no pierden conteos.
+Si algo queda desalineado (cargas manuales, datos previos a la tabla), reparar_contadores()
+recalcula todo desde 'comentarios' (y su archivo).
+
+Crear o aceptar un comentario no incrementa ninguna versión global de caché (sería una
+fila bloqueada por todas las escrituras de la organización): los fragmentos que muestran
+contadores usan firma_contadores() de sus filas como parte de la clave.
+"""
+import hashlib
+
+from sqlalchemy import case, func, insert, literal, or_, select, union_all, update
+from sqlalchemy.dialects.mysql import insert as insert_mysql
+from sqlalchemy.dialects.postgresql import insert as insert_postgresql
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Comentario, ComentarioArchivado, ContadorComentarios
+from utils.cache import incrementar_version
+
+COLUMNAS_SUMA = ('pendientes', 'aceptados', 'favorables', 'desfavorables')
+
+def _valores_suma(tabla, nuevos):
+    """SET del UPSERT: suma los deltas y conserva la fecha de último comentario más reciente."""
+    valores = {col: tabla.c[col] + nuevos[col] for col in COLUMNAS_SUMA}
+    fecha_actual, fecha_nueva = tabla.c.fecha_ultimo_comentario, nuevos['fecha_ultimo_comentario']
+    valores['fecha_ultimo_comentario'] = case(
+        (or_(fecha_actual.is_(None), fecha_actual < fecha_nueva), fecha_nueva),
+        else_=fecha_actual
+    )
+    return valores
+
+def _actualizar_o_insertar(tabla, filas):
+    """
+    UPSERT portable (motores sin ON CONFLICT / ON DUPLICATE KEY): UPDATE sumando y, si el
+    usuario aún no tiene fila, INSERT en un SAVEPOINT. Si otra transacción la insertó entre
+    medio, el INSERT choca con la clave primaria y se repite el UPDATE.
+    """
+    for fila in filas:
+        nuevos = {col: literal(fila[col], tabla.c[col].type) for col in fila}
+        actualizar = update(tabla).where(tabla.c.usuario_id == fila['usuario_id']).values(_valores_suma(tabla, nuevos))
+        if db.session.execute(actualizar).rowcount:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(tabla).values(fila))
+        except IntegrityError:
+            db.session.execute(actualizar)
+
+def _upsert_sumando(filas):
+    """Inserta los deltas o, si el usuario ya tiene fila, los suma a los valores actuales."""
+    tabla = ContadorComentarios.__table__
+    dialecto = db.session.get_bind().dialect.name
+
+    if dialecto == 'mysql':
+        stmt = insert_mysql(tabla).values(filas)
+        stmt = stmt.on_duplicate_key_update(**_valores_suma(tabla, stmt.inserted))
+    elif dialecto in ('sqlite', 'postgresql'):
+        stmt = (insert_sqlite if dialecto == 'sqlite' else insert_postgresql)(tabla).values(filas)
+        stmt = stmt.on_conflict_do_update(index_elements=[tabla.c.usuario_id], set_=_valores_suma(tabla, stmt.excluded))
+    else:
+        _actualizar_o_insertar(tabla, filas)
+        return
+    db.session.execute(stmt)
+
+def registrar_comentarios_creados(comentarios):
+    """
+    Suma al contador de cada funcionario los comentarios nuevos.
+    'comentarios' son objetos Comentario o diccionarios con funcionario_id, tipo y fecha_creacion.
+    """
+    por_usuario = {}
+    for c in comentarios:
+        datos = c if isinstance(c, dict) else {
+            'funcionario_id': c.funcionario_id, 'tipo': c.tipo, 'fecha_creacion': c.fecha_creacion
+        }
+        fila = por_usuario.setdefault(datos['funcionario_id'], {
+            'usuario_id': datos['funcionario_id'], 'pendientes': 0, 'aceptados': 0,
+            'favorables': 0, 'desfavorables': 0, 'fecha_ultimo_comentario': datos['fecha_creacion'],
+        })
+        fila['pendientes'] += 1
+        fila['favorables' if datos['tipo'] == 'Favorable' else 'desfavorables'] += 1
+        fila['fecha_ultimo_comentario'] = max(fila['fecha_ultimo_comentario'], datos['fecha_creacion'])
+
+    if por_usuario:
+        _upsert_sumando(list(por_usuario.values()))
+
+def registrar_aceptaciones(funcionario_id, cantidad=1):
+    """Mueve 'cantidad' comentarios de pendientes a aceptados."""
+    db.session.execute(
+        update(ContadorComentarios)
+        .where(ContadorComentarios.usuario_id == funcionario_id)
+        .values(pendientes=ContadorComentarios.pendientes - cantidad,
+                aceptados=ContadorComentarios.aceptados + cantidad)
+    )
+
+def firma_contadores(usuarios):
+    """
+    Firma de los contadores de 'usuarios' (con .contadores ya cargado) para la clave de
+    {% cache %}: cambia solo cuando cambian los comentarios de esas filas.
+    """
+    valores = []
+    for u in usuarios:
+        c = u.contadores
+        valores.append((u.id,) + ((c.pendientes, c.aceptados, c.favorables, c.desfavorables,
+                                   c.fecha_ultimo_comentario) if c else ()))
+    return hashlib.sha1(repr(valores).encode()).hexdigest()[:16]
+
+def _consulta_totales():
+    """Totales reales por funcionario calculados desde 'comentarios' y 'comentarios_archivados'."""
+    columnas = lambda m: select(m.funcionario_id, m.estado, m.tipo, m.fecha_creacion)
+    c = union_all(columnas(Comentario), columnas(ComentarioArchivado)).subquery().c
+    return select(
+        c.funcionario_id,
+        func.sum(case((c.estado == 'Pendiente', 1), else_=0)),
+        func.sum(case((c.estado == 'Aceptada', 1), else_=0)),
+        func.sum(case((c.tipo == 'Favorable', 1), else_=0)),
+        func.sum(case((c.tipo == 'Desfavorable', 1), else_=0)),
+        func.max(c.fecha_creacion),
+    ).group_by(c.funcionario_id)
+
+def reparar_contadores():
+    """
+    Recalcula todos los contadores desde 'comentarios' en una transacción.
+    Devuelve cuántos usuarios tenían valores distintos (incluye filas faltantes o sobrantes).
+    """
+    reales = {fila[0]: tuple(fila[1:]) for fila in db.session.execute(_consulta_totales())}
+    actuales = {
+        c.usuario_id: (c.pendientes, c.aceptados, c.favorables, c.desfavorables, c.fecha_ultimo_comentario)
+        for c in ContadorComentarios.query.all()
+    }
+    corregidos = sum(1 for uid in reales.keys() | actuales.keys() if reales.get(uid) != actuales.get(uid))
+
+    db.session.execute(ContadorComentarios.__table__.delete())
+    db.session.execute(insert(ContadorComentarios).from_select(
+        ['usuario_id', 'pendientes', 'aceptados', 'favorables', 'desfavorables', 'fecha_ultimo_comentario'],
+        _consulta_totales()
+    ))
+    incrementar_version('comentarios')
+    db.session.commit()
+    return corregidos
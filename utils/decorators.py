@@ -43,4 +43,12 @@ def encargado_recinto_required(f):
         if not current_user.is_authenticated or (current_user.rol.nombre not in ['Admin', 'Jefa Salud', 'Encargado de Recinto']):
             abort(403)
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
+
+def solo_lectura(f):
+    """
+    Marca una vista como de solo lectura: sus SELECT pueden ir a una réplica
+    (ver utils/replicas.py). Debe ir debajo de @route.
+    """
+    f._solo_lectura = True
+    return f
@@ -1,11 +1,15 @@
 # utils/email.py
 import os
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.utils import formataddr
 from flask import url_for
 
+from .metricas import CORREO_DURACION
+
 def get_email_template(titulo, contenido):
     """Plantilla HTML base con el estilo del Departamento de Salud."""
     return f"""
@@ -23,6 +27,16 @@ def get_email_template(titulo, contenido):
     </div>
     """
 
+def _construir_mensaje(remitente, destinatario, asunto, cuerpo_html):
+    """Arma el MIME del correo con el remitente institucional."""
+    msg = MIMEMultipart()
+    msg['Subject'] = asunto
+    msg['From'] = formataddr(("Sistema Libro de Novedades", remitente))
+    msg['To'] = destinatario
+
+    msg.attach(MIMEText(cuerpo_html, 'html'))
+    return msg
+
 def enviar_correo_generico(destinatario, asunto, cuerpo_html):
     """Motor de envío de correos reutilizable."""
     remitente = os.getenv("EMAIL_USUARIO")
@@ -32,23 +46,98 @@ def enviar_correo_generico(destinatario, asunto, cuerpo_html):
         print("ERROR: Credenciales de correo no configuradas en .env")
         return False
 
-    msg = MIMEMultipart()
-    msg['Subject'] = asunto
-    msg['From'] = formataddr(("Sistema Libro de Novedades", remitente))
-    msg['To'] = destinatario
-
-    msg.attach(MIMEText(cuerpo_html, 'html'))
+    msg = _construir_mensaje(remitente, destinatario, asunto, cuerpo_html)
 
+    inicio = time.perf_counter()
     try:
         with smtplib.SMTP('smtp.gmail.com', 587) as server:
             server.starttls()
             server.login(remitente, contrasena)
             server.send_message(msg)
+        CORREO_DURACION.labels('individual', 'ok').observe(time.perf_counter() - inicio)
         return True
     except Exception as e:
+        CORREO_DURACION.labels('individual', 'error').observe(time.perf_counter() - inicio)
         print(f"Error al enviar correo '{asunto}': {e}")
         return False
 
+def enviar_correos_lote(mensajes, por_minuto=None, al_enviar=None):
+    """
+    Envía una lista de tuplas (destinatario, asunto, cuerpo_html) usando
+    una sola sesión SMTP. Devuelve la cantidad de correos enviados.
+    'por_minuto' limita el ritmo de envío (cuota del proveedor SMTP en lotes grandes)
+    y 'al_enviar(indice)' se llama tras cada correo aceptado por el servidor.
+    """
+    remitente = os.getenv("EMAIL_USUARIO")
+    contrasena = os.getenv("EMAIL_CONTRASENA")
+
+    if not remitente or not contrasena:
+        print("ERROR: Credenciales de correo no configuradas en .env")
+        return 0
+
+    enviados = 0
+    resultado = 'ok'
+    inicio = time.perf_counter()
+    try:
+        with smtplib.SMTP('smtp.gmail.com', 587) as server:
+            server.starttls()
+            server.login(remitente, contrasena)
+            intervalo = 60 / por_minuto if por_minuto else 0
+            for i, (destinatario, asunto, cuerpo_html) in enumerate(mensajes):
+                if intervalo and i:
+                    time.sleep(intervalo)
+                try:
+                    server.send_message(_construir_mensaje(remitente, destinatario, asunto, cuerpo_html))
+                    enviados += 1
+                    if al_enviar:
+                        al_enviar(i)
+                except smtplib.SMTPRecipientsRefused as e:
+                    # Un destinatario inválido no debe cortar el resto del lote
+                    print(f"Correo rechazado para {destinatario}: {e}")
+                except smtplib.SMTPServerDisconnected:
+                    raise  # Sin sesión no se puede seguir con el lote
+                except smtplib.SMTPException as e:
+                    # Error de un mensaje (ej: SMTPDataError): se informa y se sigue con el siguiente
+                    print(f"Error al enviar correo a {destinatario}: {e}")
+    except Exception as e:
+        resultado = 'error'
+        print(f"Error en envío por lote ({enviados}/{len(mensajes)} enviados): {e}")
+    CORREO_DURACION.labels('lote', resultado).observe(time.perf_counter() - inicio)
+    return enviados
+
+# Envíos en segundo plano en curso. Los hilos son daemon y se cortarían sin aviso al salir el
+# worker (reciclaje por max_requests, despliegues): worker_exit de gunicorn.conf.py los espera.
+_hilos_envio = set()
+_hilos_envio_lock = threading.Lock()
+
+def _enviar_lote_registrado(mensajes):
+    try:
+        enviar_correos_lote(mensajes)
+    finally:
+        with _hilos_envio_lock:
+            _hilos_envio.discard(threading.current_thread())
+
+def encolar_correos(mensajes):
+    """
+    Despacha el envío por lote en un hilo de fondo para no bloquear la petición.
+    Los mensajes deben venir ya renderizados (url_for requiere el contexto de la petición).
+    """
+    if not mensajes:
+        return
+    hilo = threading.Thread(target=_enviar_lote_registrado, args=(list(mensajes),), daemon=True)
+    with _hilos_envio_lock:
+        _hilos_envio.add(hilo)
+    hilo.start()
+
+def esperar_envios(limite):
+    """Espera hasta 'limite' segundos a los envíos en curso. Devuelve cuántos quedaron sin terminar."""
+    fin = time.monotonic() + limite
+    with _hilos_envio_lock:
+        hilos = list(_hilos_envio)
+    for hilo in hilos:
+        hilo.join(max(0, fin - time.monotonic()))
+    return sum(hilo.is_alive() for hilo in hilos)
+
 def enviar_correo_reseteo(usuario, token):
     url = url_for('auth.resetear_clave', token=token, _external=True)
     contenido = f"""
@@ -64,7 +153,8 @@ def enviar_correo_reseteo(usuario, token):
     html = get_email_template("Recuperación de Contraseña", contenido)
     enviar_correo_generico(usuario.email, 'Restablecimiento de Contraseña - Libro de Novedades', html)
 
-def enviar_correo_notificacion_comentario(comentario):
+def mensaje_notificacion_comentario(comentario):
+    """Construye (destinatario, asunto, html) del aviso de nuevo comentario."""
     url_sistema = url_for('auth.login', _external=True)
     funcionario = comentario.funcionario
     jefe = comentario.jefe
@@ -82,4 +172,7 @@ def enviar_correo_notificacion_comentario(comentario):
         </div>
     """
     html = get_email_template("Nuevo Comentario Registrado", contenido)
-    enviar_correo_generico(funcionario.email, f'Nuevo Comentario en tu Libro de Novedades - Folio #{comentario.folio}', html)
\ No newline at end of file
+    return funcionario.email, f'Nuevo Comentario en tu Libro de Novedades - Folio #{comentario.folio}', html
+
+def enviar_correo_notificacion_comentario(comentario):
+    enviar_correo_generico(*mensaje_notificacion_comentario(comentario))
\ No newline at end of file
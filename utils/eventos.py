@@ -0,0 +1,232 @@
+# utils/eventos.py
+"""
+Notificaciones en vivo (Server-Sent Events).
+
+- Bus en memoria: cada conexión SSE abierta se suscribe con el id de su usuario y recibe
+  en una cola los eventos dirigidos a él.
+- Con varios workers, cada proceso solo conoce a sus propios suscriptores. Si se define
+  EVENTOS_BROKER_URL (ej: tcp://127.0.0.1:8766), cada publicación se envía a un broker
+  local que la reparte a todos los workers conectados (ver comando 'flask eventos-broker').
+  Es un reemplazo mínimo de un pub/sub externo (ej: Redis) con el mismo contrato.
+"""
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+
+class Bus:
+    """Pub/sub en memoria del proceso: usuario_id -> colas de las conexiones abiertas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suscriptores = {}
+        self._broker = None
+
+    # --- Suscripciones locales ---
+    def suscribir(self, usuario_id):
+        cola = queue.Queue(maxsize=100)
+        with self._lock:
+            self._suscriptores.setdefault(usuario_id, set()).add(cola)
+        self._conectar_broker()
+        return cola
+
+    def desuscribir(self, usuario_id, cola):
+        with self._lock:
+            colas = self._suscriptores.get(usuario_id)
+            if colas:
+                colas.discard(cola)
+                if not colas:
+                    del self._suscriptores[usuario_id]
+
+    def entregar_local(self, destinatarios, evento):
+        """Pone el evento en las colas de los destinatarios conectados a este proceso."""
+        with self._lock:
+            colas = [c for uid in destinatarios for c in self._suscriptores.get(uid, ())]
+        for cola in colas:
+            try:
+                cola.put_nowait(evento)
+            except queue.Full:
+                pass  # Cliente lento: se descarta el evento en vez de bloquear al publicador
+
+    # --- Publicación ---
+    def publicar(self, destinatarios, tipo, datos):
+        destinatarios = sorted(set(destinatarios))
+        evento = {'tipo': tipo, 'datos': datos}
+        conexion = self._conectar_broker()
+        if conexion and conexion.enviar({'destinatarios': destinatarios, 'evento': evento}):
+            return  # El broker lo devuelve a todos los workers, incluido este
+        self.entregar_local(destinatarios, evento)
+
+    def _conectar_broker(self):
+        url = os.getenv('EVENTOS_BROKER_URL')
+        if not url:
+            return None
+        with self._lock:
+            # Tras un fork (gunicorn) la conexión heredada no sirve: cada proceso abre la suya
+            if self._broker is None or self._broker.pid != os.getpid():
+                self._broker = ConexionBroker(url, self)
+            return self._broker
+
+class ConexionBroker:
+    """Conexión de un worker al broker: envía publicaciones y reparte localmente lo que recibe."""
+
+    def __init__(self, url, bus):
+        self.host, puerto = url.removeprefix('tcp://').rsplit(':', 1)
+        self.puerto = int(puerto)
+        self.bus = bus
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._socket = None
+        threading.Thread(target=self._escuchar, daemon=True).start()
+
+    def enviar(self, mensaje):
+        linea = (json.dumps(mensaje) + '\n').encode()
+        with self._lock:
+            if self._socket is None:
+                return False
+            try:
+                self._socket.sendall(linea)
+                return True
+            except OSError:
+                return False
+
+    def _escuchar(self):
+        while True:
+            try:
+                with socket.create_connection((self.host, self.puerto), timeout=5) as s:
+                    s.settimeout(None)
+                    with self._lock:
+                        self._socket = s
+                    for linea in s.makefile('rb'):
+                        mensaje = json.loads(linea)
+                        self.bus.entregar_local(mensaje['destinatarios'], mensaje['evento'])
+            except (OSError, ValueError) as e:
+                print(f"Broker de eventos no disponible ({e}); reintentando...")
+            with self._lock:
+                self._socket = None
+            time.sleep(2)
+
+bus = Bus()
+
+def destinatarios_comentario(funcionario):
+    """El funcionario, su segundo jefe y toda su cadena de jefaturas."""
+    ids = {funcionario.id}
+    if funcionario.segundo_jefe_id:
+        ids.add(funcionario.segundo_jefe_id)
+    jefe = funcionario.jefe_directo
+    while jefe and jefe.id not in ids:
+        ids.add(jefe.id)
+        jefe = jefe.jefe_directo
+    return ids
+
+def preparar_evento_comentario(comentario):
+    """
+    (destinatarios, datos) del evento de un comentario. Se arma antes del commit,
+    igual que los correos, para no recargar los objetos expirados después.
+    """
+    funcionario = comentario.funcionario
+    return destinatarios_comentario(funcionario), {
+        'folio': comentario.folio,
+        'tipo_comentario': comentario.tipo,
+        'funcionario_id': funcionario.id,
+        'funcionario_nombre': funcionario.nombre_completo,
+    }
+
+def publicar_eventos(tipo, eventos):
+    """Publica 'nuevo_comentario' o 'comentario_aceptado' (llamar tras el commit)."""
+    for destinatarios, datos in eventos:
+        bus.publicar(destinatarios, tipo, datos)
+
+def flujo_sse(usuario_id, duracion_max, intervalo_latido=20):
+    """
+    Generador text/event-stream para un usuario. Cierra tras 'duracion_max' segundos
+    (el navegador reconecta solo) para no retener hilos indefinidamente.
+    """
+    cola = bus.suscribir(usuario_id)
+    fin = time.monotonic() + duracion_max
+    try:
+        yield 'retry: 5000\n\n'
+        while time.monotonic() < fin:
+            try:
+                evento = cola.get(timeout=min(intervalo_latido, max(0.1, fin - time.monotonic())))
+            except queue.Empty:
+                yield ': latido\n\n'
+                continue
+            yield f"event: {evento['tipo']}\ndata: {json.dumps(evento['datos'], ensure_ascii=False)}\n\n"
+    finally:
+        bus.desuscribir(usuario_id, cola)
+
+# --- Broker local (un proceso aparte, ver 'flask eventos-broker') ---
+
+class _ClienteBroker:
+    """
+    Worker conectado al broker. Cada uno tiene su cola y su hilo de escritura: un worker
+    lento (o colgado) no frena el reparto a los demás.
+    """
+
+    def __init__(self, conexion, wfile, maximo=1000):
+        self.conexion = conexion
+        self.wfile = wfile
+        self.cola = queue.Queue(maxsize=maximo)
+        threading.Thread(target=self._escribir, daemon=True).start()
+
+    def encolar(self, linea):
+        try:
+            self.cola.put_nowait(linea)
+            return True
+        except queue.Full:
+            return False
+
+    def cerrar(self):
+        try:
+            self.cola.put_nowait(None)
+        except queue.Full:
+            pass  # El hilo de escritura termina con el OSError tras el shutdown
+        try:
+            # Desbloquea un sendall detenido y termina el handle() del cliente; el worker reconecta solo
+            self.conexion.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _escribir(self):
+        while (linea := self.cola.get()) is not None:
+            try:
+                self.wfile.write(linea)
+                self.wfile.flush()
+            except OSError:
+                return
+
+class _ManejadorBroker(socketserver.StreamRequestHandler):
+    def handle(self):
+        servidor = self.server
+        cliente = _ClienteBroker(self.connection, self.wfile)
+        with servidor.lock:
+            servidor.clientes.add(cliente)
+        try:
+            for linea in self.rfile:
+                with servidor.lock:
+                    clientes = list(servidor.clientes)
+                # Solo se encola: ninguna escritura a un socket ocurre en este hilo ni bajo el lock
+                for otro in clientes:
+                    if not otro.encolar(linea):
+                        print("Worker lento en el broker de eventos (cola llena): se desconecta.")
+                        with servidor.lock:
+                            servidor.clientes.discard(otro)
+                        otro.cerrar()
+        finally:
+            with servidor.lock:
+                servidor.clientes.discard(cliente)
+            cliente.cerrar()
+
+class BrokerEventos(socketserver.ThreadingTCPServer):
+    """Reenvía cada línea recibida a todos los workers conectados."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, direccion):
+        super().__init__(direccion, _ManejadorBroker)
+        self.lock = threading.Lock()
+        self.clientes = set()
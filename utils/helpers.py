@@ -16,6 +16,33 @@ def es_superior_jerarquico(usuario_actual, funcionario_a_ver):
         jefe_actual = jefe_actual.jefe_directo
     return False
 
+def filtro_puede_anotar(usuario_actual):
+    """
+    Devuelve la condición SQL equivalente a las reglas de 'puede_anotar' de
+    crear_comentario, para validar un conjunto de funcionarios en una sola consulta.
+    """
+    from sqlalchemy import or_, true, false
+    from models import Usuario, Rol  # Importación diferida
+
+    rol_actual = usuario_actual.rol.nombre
+
+    # Regla 1: Jefa Salud -> Encargados que dependen directamente de ella
+    if rol_actual == 'Jefa Salud':
+        return (Usuario.rol.has(Rol.nombre.in_(['Encargado de Recinto', 'Encargado de Unidad'])) &
+                (Usuario.jefe_directo_id == usuario_actual.id))
+    # Regla 2: Encargado de Recinto -> Encargados de Unidad directos
+    if rol_actual == 'Encargado de Recinto':
+        return (Usuario.rol.has(nombre='Encargado de Unidad') &
+                (Usuario.jefe_directo_id == usuario_actual.id))
+    # Regla 3: Encargado de Unidad -> Funcionarios como jefe directo o segundo jefe
+    if rol_actual == 'Encargado de Unidad':
+        return (Usuario.rol.has(nombre='Funcionario') &
+                or_(Usuario.jefe_directo_id == usuario_actual.id,
+                    Usuario.segundo_jefe_id == usuario_actual.id))
+    if rol_actual == 'Admin':
+        return true()
+    return false()
+
 def registrar_log(accion, detalles=""):
     """
     Registra un evento en la tabla 'logs'.
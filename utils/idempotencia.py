@@ -0,0 +1,119 @@
+# utils/idempotencia.py
+"""
+Claves de idempotencia para formularios que cambian datos.
+
+Cada formulario incluye un campo oculto 'idempotency_key' generado al renderizarlo
+(global de Jinja clave_idempotencia()). La vista decorada con @idempotente:
+  - reserva la clave en 'claves_idempotencia' (commit propio) antes de ejecutar la vista;
+  - al terminar guarda el redirect y los mensajes flash de la respuesta;
+  - ante un reintento o doble envío con la misma clave, repite esa respuesta sin volver
+    a ejecutar el INSERT, el log ni los correos. Si el envío original sigue en curso,
+    espera hasta IDEMPOTENCIA_ESPERA segundos a que termine.
+Sin clave (ej: clientes antiguos) la vista se ejecuta como siempre.
+"""
+import json
+import random
+import time
+import uuid
+from datetime import timedelta
+from functools import wraps
+
+from flask import abort, current_app, flash, redirect, request, session
+from flask_login import current_user
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+CAMPO = 'idempotency_key'
+
+def generar_clave_idempotencia():
+    """Clave nueva para el campo oculto de un formulario (global de Jinja)."""
+    return uuid.uuid4().hex
+
+def purgar_claves_vencidas():
+    """Elimina las claves más antiguas que IDEMPOTENCIA_TTL. Retorna cuántas se eliminaron."""
+    from models import db, ClaveIdempotencia, obtener_hora_chile  # Importación diferida
+
+    limite = obtener_hora_chile() - timedelta(seconds=current_app.config.get('IDEMPOTENCIA_TTL', 86400))
+    resultado = db.session.execute(delete(ClaveIdempotencia).where(ClaveIdempotencia.fecha_creacion < limite))
+    db.session.commit()
+    return resultado.rowcount
+
+def _reservar(clave):
+    """Inserta la clave 'En proceso'. Retorna False si ya existía."""
+    from models import db, ClaveIdempotencia
+
+    db.session.add(ClaveIdempotencia(clave=clave, usuario_id=current_user.id, ruta=request.path))
+    try:
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+def _esperar_original(clave):
+    """Registro de la clave, esperando a que el envío original termine (o None si no terminó)."""
+    from models import db, ClaveIdempotencia
+
+    limite = time.monotonic() + current_app.config.get('IDEMPOTENCIA_ESPERA', 10)
+    while True:
+        registro = db.session.get(ClaveIdempotencia, clave, populate_existing=True)
+        if registro is None or registro.estado == 'Completada' or time.monotonic() >= limite:
+            return registro
+        db.session.rollback()  # Cierra la transacción para ver el commit del envío original
+        time.sleep(0.2)
+
+def _repetir_respuesta(registro):
+    if registro.usuario_id != current_user.id or registro.ruta != request.path:
+        abort(422)
+    if registro.estado != 'Completada':
+        flash('Tu solicitud anterior aún se está procesando. Revisa el resultado en unos segundos.', 'info')
+        return redirect(request.referrer or request.host_url)
+    for categoria, mensaje in json.loads(registro.mensajes or '[]'):
+        flash(mensaje, categoria)
+    return redirect(registro.ubicacion or request.host_url)
+
+def idempotente(f):
+    """
+    Hace idempotentes los POST de la vista (ver docstring del módulo).
+    Aplicar debajo de @route; la vista debe responder con un redirect.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        clave = request.form.get(CAMPO, '')[:64] if request.method == 'POST' else ''
+        if not clave:
+            return f(*args, **kwargs)
+
+        from models import db, ClaveIdempotencia  # Importación diferida
+
+        if not _reservar(clave):
+            registro = _esperar_original(clave)
+            if registro is not None:
+                return _repetir_respuesta(registro)
+            # La reserva original se liberó (la vista falló): se procesa este envío
+            if not _reservar(clave):
+                abort(409)
+
+        flashes_previos = len(session.get('_flashes', []))
+        try:
+            respuesta = f(*args, **kwargs)
+        except Exception:
+            db.session.rollback()
+            db.session.execute(delete(ClaveIdempotencia).where(ClaveIdempotencia.clave == clave))
+            db.session.commit()
+            raise
+
+        registro = db.session.get(ClaveIdempotencia, clave)
+        if getattr(respuesta, 'status_code', 200) in (301, 302, 303, 307, 308):
+            registro.estado = 'Completada'
+            registro.ubicacion = respuesta.location
+            registro.mensajes = json.dumps(session.get('_flashes', [])[flashes_previos:], ensure_ascii=False)
+        else:
+            # Solo se memorizan redirects; cualquier otra respuesta permite reenviar el formulario
+            db.session.delete(registro)
+        db.session.commit()
+
+        # Purga oportunista de claves vencidas (consulta por índice, ~1 de cada 100 envíos)
+        if random.random() < 0.01:
+            purgar_claves_vencidas()
+        return respuesta
+    return decorated_function
@@ -0,0 +1,129 @@
+# utils/metricas.py
+"""
+Métricas de operación en formato Prometheus (endpoint /metrics).
+
+- Peticiones: contador e histograma de latencia por endpoint (blueprint.vista), y peticiones en curso.
+- Pool de SQLAlchemy: conexiones abiertas, en uso y checkouts.
+- Correo y PDF: duración de cada envío SMTP y de cada render de reporte.
+
+Con gunicorn (varios procesos) se usa el modo multiproceso de prometheus_client:
+cada worker escribe sus valores en PROMETHEUS_MULTIPROC_DIR y /metrics los agrega
+al momento de la consulta, sin importar qué worker atienda la petición.
+"""
+import hmac
+import os
+import time
+
+from flask import Response, abort, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+)
+from sqlalchemy import event
+
+PETICIONES = Counter(
+    'libro_novedades_peticiones_total', 'Peticiones HTTP atendidas.',
+    ['endpoint', 'metodo', 'estado']
+)
+LATENCIA = Histogram(
+    'libro_novedades_peticion_duracion_segundos', 'Latencia de las peticiones HTTP por endpoint.',
+    ['endpoint', 'metodo'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+EN_CURSO = Gauge(
+    'libro_novedades_peticiones_en_curso', 'Peticiones en proceso (suma de todos los workers).',
+    multiprocess_mode='livesum'
+)
+
+BD_CONEXIONES_ABIERTAS = Gauge(
+    'libro_novedades_bd_conexiones_abiertas', 'Conexiones abiertas en el pool de SQLAlchemy.',
+    multiprocess_mode='livesum'
+)
+BD_CONEXIONES_EN_USO = Gauge(
+    'libro_novedades_bd_conexiones_en_uso', 'Conexiones del pool entregadas a una petición.',
+    multiprocess_mode='livesum'
+)
+BD_CHECKOUTS = Counter(
+    'libro_novedades_bd_checkouts_total', 'Conexiones solicitadas al pool de SQLAlchemy.'
+)
+
+CORREO_DURACION = Histogram(
+    'libro_novedades_correo_duracion_segundos', 'Duración de los envíos SMTP.',
+    ['modo', 'resultado'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+PDF_DURACION = Histogram(
+    'libro_novedades_pdf_duracion_segundos', 'Duración del render de reportes PDF.',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+def _registro_actual():
+    """Registro a exponer: agregado de todos los workers en modo multiproceso, o el del proceso."""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+        return registro
+    return REGISTRY
+
+def _instrumentar_pool(engine):
+    @event.listens_for(engine, 'connect')
+    def al_conectar(dbapi_connection, connection_record):
+        BD_CONEXIONES_ABIERTAS.inc()
+
+    @event.listens_for(engine, 'close')
+    def al_cerrar(dbapi_connection, connection_record):
+        BD_CONEXIONES_ABIERTAS.dec()
+
+    @event.listens_for(engine, 'checkout')
+    def al_entregar(dbapi_connection, connection_record, connection_proxy):
+        BD_CHECKOUTS.inc()
+        BD_CONEXIONES_EN_USO.inc()
+
+    @event.listens_for(engine, 'checkin')
+    def al_devolver(dbapi_connection, connection_record):
+        BD_CONEXIONES_EN_USO.dec()
+
+def init_metricas(app):
+    """Registra los hooks de medición, los eventos del pool y la ruta /metrics."""
+    from models import db  # Importación diferida
+
+    with app.app_context():
+        for engine in db.engines.values():
+            _instrumentar_pool(engine)
+
+    @app.before_request
+    def iniciar_medicion():
+        g._metricas_inicio = time.perf_counter()
+        g._metricas_en_curso = True
+        EN_CURSO.inc()
+
+    @app.after_request
+    def registrar_medicion(response):
+        inicio = g.pop('_metricas_inicio', None)
+        if inicio is not None:
+            endpoint = request.endpoint or 'sin_ruta'
+            LATENCIA.labels(endpoint, request.method).observe(time.perf_counter() - inicio)
+            PETICIONES.labels(endpoint, request.method, str(response.status_code)).inc()
+        return response
+
+    @app.teardown_request
+    def cerrar_medicion(exc):
+        # teardown siempre se ejecuta, incluso si la vista lanzó una excepción
+        if g.pop('_metricas_en_curso', False):
+            EN_CURSO.dec()
+
+    @app.route('/metrics')
+    def metrics():
+        """
+        Métricas en texto Prometheus. Exige METRICS_TOKEN ('Authorization: Bearer <token>');
+        sin token solo responde en modo debug y a 127.0.0.1.
+        """
+        token = app.config.get('METRICS_TOKEN') or os.getenv('METRICS_TOKEN')
+        if token:
+            enviado = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+            # En bytes: compare_digest lanza TypeError con str no ASCII (werkzeug decodifica en latin-1)
+            if not hmac.compare_digest(enviado.encode(), token.encode()):
+                abort(403)
+        elif not app.debug or request.remote_addr not in ('127.0.0.1', '::1'):
+            # Detrás del proxy inverso todas las peticiones llegan desde 127.0.0.1: la IP no basta
+            abort(403)
+        return Response(generate_latest(_registro_actual()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,259 @@
+# utils/nomina.py
+"""
+Sincronización de usuarios con la nómina mensual de RR.HH. ('flask sincronizar-nomina').
+
+La planilla (.xlsx o .csv, una fila por funcionario) se lee en modo streaming y se compara
+contra 'usuarios' usando diccionarios en memoria indexados por RUT:
+- RUT nuevo                -> alta (rol Funcionario, sin contraseña: la define con "¿Olvidaste tu contraseña?").
+- RUT existente con datos  -> actualización solo de los campos que cambiaron
+  distintos                   (establecimiento, unidad, calidad jurídica, categoría, jefes)
+                              o reactivación si estaba inactivo.
+- Activo que no viene      -> desactivación (nunca a usuarios con rol Admin). Las jefaturas
+                              (ROLES_JEFATURA) solo se informan, salvo con incluir_jefaturas.
+Las filas con errores (catálogo o jefe desconocido, correo repetido) se informan y no se aplican,
+igual que las que dependen de ellas (ej: un jefe que es un alta rechazada).
+
+Resguardo ante planillas truncadas o de un solo establecimiento: si las desactivaciones
+superan MAX_PROPORCION_BAJAS de los usuarios activos, aplicar_diferencias se niega
+(BajasMasivasError) salvo con permitir_bajas_masivas.
+
+Los cambios se aplican en una transacción con sentencias por lote (INSERT múltiple,
+UPDATE por clave primaria en executemany, UPDATE ... WHERE id IN (...)).
+Sin --aplicar solo se informa el diff.
+
+Columnas (encabezados sin importar mayúsculas, tildes ni espacios):
+  rut, nombre_completo, email, establecimiento, unidad        obligatorias
+  calidad_juridica, categoria, rut_jefe, rut_segundo_jefe     opcionales: si la columna
+                                                              no viene, ese dato no se toca
+"""
+import csv
+import unicodedata
+
+from sqlalchemy import insert, select, update
+
+COLUMNAS_OBLIGATORIAS = ('rut', 'nombre_completo', 'email', 'establecimiento', 'unidad')
+ALIAS_COLUMNAS = {
+    'nombre': 'nombre_completo',
+    'correo': 'email',
+    'calidad': 'calidad_juridica',
+    'jefe': 'rut_jefe',
+    'rut_jefe_directo': 'rut_jefe',
+    'segundo_jefe': 'rut_segundo_jefe',
+}
+# Columna de la planilla -> columna de 'usuarios'
+CAMPOS_JEFES = {'rut_jefe': 'jefe_directo_id', 'rut_segundo_jefe': 'segundo_jefe_id'}
+TAMANO_LOTE = 1000
+ROLES_JEFATURA = ('Jefa Salud', 'Encargado de Recinto', 'Encargado de Unidad')
+# Proporción máxima de usuarios activos (sin Admin) que una sincronización puede desactivar
+MAX_PROPORCION_BAJAS = 0.10
+# Hash inválido: check_password_hash siempre falla hasta que el usuario defina su clave
+SIN_CLAVE = '!'
+
+class BajasMasivasError(ValueError):
+    """La planilla desactivaría más usuarios de lo razonable (ver MAX_PROPORCION_BAJAS)."""
+
+def normalizar_texto(valor):
+    """Minúsculas, sin tildes ni espacios repetidos (para encabezados y nombres de catálogo)."""
+    texto = unicodedata.normalize('NFKD', str(valor or '')).encode('ascii', 'ignore').decode()
+    return ' '.join(texto.lower().split())
+
+def normalizar_rut(valor):
+    """'12.345.678-k' -> '12345678-K'."""
+    return str(valor or '').replace('.', '').replace(' ', '').upper()
+
+def _normalizar_encabezado(valor):
+    columna = normalizar_texto(valor).replace(' ', '_')
+    return ALIAS_COLUMNAS.get(columna, columna)
+
+def leer_planilla(ruta):
+    """Genera (número de fila, dict) sin cargar el archivo completo en memoria."""
+    if ruta.lower().endswith('.csv'):
+        with open(ruta, newline='', encoding='utf-8-sig') as f:
+            muestra = f.read(4096)
+            f.seek(0)
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+            lector = csv.reader(f, dialecto)
+            encabezados = [_normalizar_encabezado(c) for c in next(lector)]
+            for numero, fila in enumerate(lector, start=2):
+                if any(fila):
+                    yield numero, dict(zip(encabezados, (c.strip() for c in fila)))
+        return
+
+    from openpyxl import load_workbook  # Importación diferida: solo la usa este comando
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezados = [_normalizar_encabezado(c) for c in next(filas)]
+        for numero, fila in enumerate(filas, start=2):
+            if any(c not in (None, '') for c in fila):
+                yield numero, dict(zip(encabezados, ('' if c is None else str(c).strip() for c in fila)))
+    finally:
+        libro.close()
+
+def _catalogos():
+    from models import db, Establecimiento, Unidad, CalidadJuridica, Categoria  # Importación diferida
+
+    def por_nombre(modelo):
+        return {normalizar_texto(nombre): id_ for id_, nombre in db.session.execute(select(modelo.id, modelo.nombre))}
+
+    unidades = {
+        (establecimiento_id, normalizar_texto(nombre)): id_
+        for id_, nombre, establecimiento_id in db.session.execute(select(Unidad.id, Unidad.nombre, Unidad.establecimiento_id))
+    }
+    return por_nombre(Establecimiento), unidades, por_nombre(CalidadJuridica), por_nombre(Categoria)
+
+def calcular_diferencias(ruta, incluir_jefaturas=False):
+    """
+    Compara la planilla con 'usuarios'. Devuelve un dict con:
+      nuevos   [dict de columnas]           cambios  [(id, rut, {campo: (antes, después)})]
+      bajas    [(id, rut, nombre)]           errores  [(fila, rut, mensaje)]
+      jefaturas_ausentes [(id, rut, nombre)] (no se desactivan sin incluir_jefaturas)
+      activos  usuarios activos sin rol Admin (base de MAX_PROPORCION_BAJAS)
+    Los jefes se guardan como RUT normalizado (se resuelven a id al aplicar).
+    """
+    from models import db, Usuario, Rol  # Importación diferida
+
+    establecimientos, unidades, calidades, categorias = _catalogos()
+    columnas_usuario = ('id', 'rut', 'nombre_completo', 'email', 'activo', 'establecimiento_id', 'unidad_id',
+                        'calidad_juridica_id', 'categoria_id', 'jefe_directo_id', 'segundo_jefe_id')
+    actuales = {}
+    for fila in db.session.execute(select(*(getattr(Usuario, c) for c in columnas_usuario), Rol.nombre)
+                                   .outerjoin(Rol, Usuario.rol_id == Rol.id)):
+        datos = dict(zip(columnas_usuario + ('rol',), fila))
+        actuales[normalizar_rut(datos['rut'])] = datos
+    rut_por_id = {u['id']: rut for rut, u in actuales.items()}
+    emails = {u['email'].lower(): rut for rut, u in actuales.items()}
+
+    resultado = {'nuevos': [], 'cambios': [], 'bajas': [], 'jefaturas_ausentes': [], 'errores': []}
+    vistos = set()
+    columnas = None
+    for numero, fila in leer_planilla(ruta):
+        if columnas is None:
+            columnas = set(fila)
+            faltantes = [c for c in COLUMNAS_OBLIGATORIAS if c not in columnas]
+            if faltantes:
+                raise ValueError(f"Faltan columnas obligatorias en la planilla: {', '.join(faltantes)}.")
+        rut = normalizar_rut(fila['rut'])
+        if not rut:
+            resultado['errores'].append((numero, '', 'Fila sin RUT.'))
+            continue
+        if rut in vistos:
+            resultado['errores'].append((numero, rut, 'RUT repetido en la planilla.'))
+            continue
+        vistos.add(rut)
+
+        establecimiento_id = establecimientos.get(normalizar_texto(fila['establecimiento']))
+        deseado = {
+            'establecimiento_id': establecimiento_id,
+            'unidad_id': unidades.get((establecimiento_id, normalizar_texto(fila['unidad']))),
+        }
+        if 'calidad_juridica' in columnas:
+            deseado['calidad_juridica_id'] = calidades.get(normalizar_texto(fila['calidad_juridica']))
+        if 'categoria' in columnas:
+            deseado['categoria_id'] = categorias.get(normalizar_texto(fila['categoria']))
+        desconocidos = [c for c, v in deseado.items() if v is None]
+        if desconocidos:
+            resultado['errores'].append((numero, rut, f"Valor desconocido en: {', '.join(desconocidos)}."))
+            continue
+        for columna, campo in CAMPOS_JEFES.items():
+            if columna in columnas:
+                deseado[campo] = normalizar_rut(fila[columna]) or None
+
+        actual = actuales.get(rut)
+        if actual is None:
+            email = fila['email'].lower()
+            if not email or email in emails:
+                resultado['errores'].append((numero, rut, f"Correo vacío o ya registrado: '{email}'."))
+                continue
+            emails[email] = rut
+            resultado['nuevos'].append(dict(deseado, rut=rut, nombre_completo=fila['nombre_completo'], email=email))
+            continue
+
+        cambios = {}
+        for campo, valor in deseado.items():
+            valor_actual = actual[campo]
+            if campo in CAMPOS_JEFES.values():
+                valor_actual = rut_por_id.get(valor_actual)
+            if valor_actual != valor:
+                cambios[campo] = (valor_actual, valor)
+        if not actual['activo']:
+            cambios['activo'] = (False, True)
+        if cambios:
+            resultado['cambios'].append((actual['id'], rut, cambios))
+
+    resultado['activos'] = sum(1 for u in actuales.values() if u['activo'] and u['rol'] != 'Admin')
+    for rut, u in actuales.items():
+        if rut in vistos or not u['activo'] or u['rol'] == 'Admin':
+            continue
+        destino = 'jefaturas_ausentes' if u['rol'] in ROLES_JEFATURA and not incluir_jefaturas else 'bajas'
+        resultado[destino].append((u['id'], rut, u['nombre_completo']))
+
+    # Jefes: deben existir en la BD o venir como altas (aceptadas) en la misma planilla.
+    # Rechazar una fila puede dejar sin jefe a otra: se repite hasta que no haya más rechazos.
+    rechazo = True
+    while rechazo:
+        rechazo = False
+        conocidos = set(actuales) | {n['rut'] for n in resultado['nuevos']}
+        for lista, rut_de in ((resultado['nuevos'], lambda n: n['rut']), (resultado['cambios'], lambda c: c[1])):
+            for elemento in list(lista):
+                datos = elemento if isinstance(elemento, dict) else {k: v[1] for k, v in elemento[2].items()}
+                for campo in CAMPOS_JEFES.values():
+                    jefe = datos.get(campo)
+                    if jefe and jefe not in conocidos:
+                        motivo = 'viene en la planilla con errores' if jefe in vistos else 'no existe'
+                        resultado['errores'].append((None, rut_de(elemento), f"Jefe con RUT {jefe} {motivo}."))
+                        lista.remove(elemento)
+                        rechazo = True
+                        break
+    return resultado
+
+def verificar_bajas(diferencias, permitir_bajas_masivas=False):
+    """Lanza BajasMasivasError si las desactivaciones superan MAX_PROPORCION_BAJAS de los activos."""
+    bajas, activos = len(diferencias['bajas']), diferencias['activos']
+    if not permitir_bajas_masivas and bajas > MAX_PROPORCION_BAJAS * activos:
+        raise BajasMasivasError(
+            f"La planilla desactivaría {bajas} de {activos} usuarios activos (más del {MAX_PROPORCION_BAJAS:.0%}). "
+            f"¿Está incompleta o es de un solo establecimiento? Si es correcto, usar --permitir-bajas-masivas."
+        )
+
+def aplicar_diferencias(diferencias, origen='', permitir_bajas_masivas=False):
+    """Aplica el diff de calcular_diferencias y su registro en 'logs' en una sola transacción."""
+    from models import db, Usuario, Rol, Log
+    from .cache import incrementar_version
+
+    verificar_bajas(diferencias, permitir_bajas_masivas)
+
+    rol_funcionario = db.session.scalar(select(Rol.id).where(Rol.nombre == 'Funcionario'))
+
+    # 1. Altas (sin jefes: pueden ser otras altas de la misma planilla)
+    nuevos = [
+        {'rut': n['rut'], 'nombre_completo': n['nombre_completo'], 'email': n['email'], 'password_hash': SIN_CLAVE,
+         'cambio_clave_requerido': True, 'activo': True, 'rol_id': rol_funcionario,
+         **{c: v for c, v in n.items() if c.endswith('_id') and c not in CAMPOS_JEFES.values()}}
+        for n in diferencias['nuevos']
+    ]
+    for i in range(0, len(nuevos), TAMANO_LOTE):
+        db.session.execute(insert(Usuario), nuevos[i:i + TAMANO_LOTE])
+
+    # 2. Resolver RUT de jefes a id, con las altas ya insertadas
+    id_por_rut = {normalizar_rut(rut): id_ for id_, rut in db.session.execute(select(Usuario.id, Usuario.rut))}
+    filas = [{'id': id_, **{c: (id_por_rut.get(v[1]) if c in CAMPOS_JEFES.values() else v[1]) for c, v in cambios.items()}}
+             for id_, _, cambios in diferencias['cambios']]
+    filas += [{'id': id_por_rut[n['rut']], **{c: id_por_rut.get(n[c]) for c in CAMPOS_JEFES.values() if n.get(c)}}
+              for n in diferencias['nuevos'] if any(n.get(c) for c in CAMPOS_JEFES.values())]
+
+    # 3. Actualizaciones por clave primaria (executemany agrupado por columnas)
+    for i in range(0, len(filas), TAMANO_LOTE):
+        db.session.execute(update(Usuario), filas[i:i + TAMANO_LOTE])
+
+    # 4. Bajas
+    ids_bajas = [id_ for id_, _, _ in diferencias['bajas']]
+    for i in range(0, len(ids_bajas), TAMANO_LOTE):
+        db.session.execute(update(Usuario).where(Usuario.id.in_(ids_bajas[i:i + TAMANO_LOTE])).values(activo=False))
+
+    incrementar_version('usuarios')  # Paneles y alcances de permisos (utils/politicas.py)
+    db.session.add(Log(usuario_nombre='Sistema/Nómina', accion='Sincronización de Nómina',
+                       detalles=f"{origen}: {len(nuevos)} altas, {len(diferencias['cambios'])} actualizaciones, "
+                                f"{len(ids_bajas)} desactivaciones, {len(diferencias['errores'])} filas con errores."))
+    db.session.commit()
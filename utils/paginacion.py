@@ -0,0 +1,112 @@
+# utils/paginacion.py
+"""
+Paginación de listados sin un COUNT(*) completo en cada página.
+
+query.paginate() cuenta toda la consulta en cada petición; en 'logs' y 'comentarios'
+ese conteo cuesta más que la página misma. paginar() devuelve un objeto con la misma
+interfaz (render_pagination no cambia), pero:
+- Pide per_page + 1 filas: si hay página siguiente sale de la misma consulta, y en la
+  última página el total se deduce sin contar.
+- Guarda el total en una caché local por firma de la consulta (SQL + parámetros) y por
+  las versiones de los datos que lista (version_cache), con vencimiento corto
+  (PAGINACION_CONTEO_TTL). Las escrituras que incrementan esas versiones lo invalidan.
+- Cuenta como máximo PAGINACION_CONTEO_MAX filas (COUNT sobre un LIMIT). Si hay más, el
+  total queda aproximado ('aproximado' = True) y la navegación avanza sondeando la
+  página siguiente.
+paginar_en_flujo() es la variante para páginas ampliadas que se renderizan en flujo
+(utils/plantillas.py): la paginación sale solo del conteo y las filas se leen al enviarlas.
+"""
+import hashlib
+
+from flask import current_app
+from flask_sqlalchemy.pagination import QueryPagination
+from sqlalchemy import func, select
+from sqlalchemy.orm import lazyload
+
+from .cache import CacheLocal, version_cache
+from .plantillas import filas_en_flujo
+
+_conteos = CacheLocal(max_entradas=5000, ttl=60)
+
+class PaginacionConConteo(QueryPagination):
+    """Resultado de paginar(): total en caché y 'hay siguiente' por sondeo."""
+    aproximado = False
+
+    def _query_items(self):
+        filas = self._query_args['query'].limit(self.per_page + 1).offset(self._query_offset).all()
+        self._hay_siguiente = len(filas) > self.per_page
+        return filas[:self.per_page]
+
+    def _query_count(self):
+        # Última página (o listado vacío): el total es exacto sin consultar
+        if not self._hay_siguiente and (self.items or self.page == 1):
+            return self._query_offset + len(self.items)
+
+        tope = current_app.config['PAGINACION_CONTEO_MAX']
+        total = contar(self._query_args['query'], self._query_args['versiones'], tope, self._query_args['firma'])
+        self.aproximado = total > tope
+        # Un conteo en caché puede haber quedado corto respecto de lo que se acaba de leer
+        if self.items:
+            total = max(total, self._query_offset + len(self.items) + 1)
+        return total
+
+    @property
+    def has_next(self):
+        return self._hay_siguiente
+
+    @property
+    def pages(self):
+        paginas = super().pages
+        return max(paginas, self.page + 1) if self._hay_siguiente else paginas
+
+class PaginacionEnFlujo(PaginacionConConteo):
+    """Paginación sin leer las filas de la página: 'hay siguiente' sale del conteo."""
+
+    def _query_items(self):
+        return []
+
+    def _query_count(self):
+        tope = current_app.config['PAGINACION_CONTEO_MAX']
+        total = contar(self._query_args['query'], self._query_args['versiones'], tope, self._query_args['firma'])
+        self.aproximado = total > tope
+        self._hay_siguiente = total > self._query_offset + self.per_page
+        return total
+
+def contar(query, versiones=(), tope=None, firma=''):
+    """
+    query.count() en caché por firma de la consulta y versiones de los datos.
+    Con 'tope' cuenta como máximo tope + 1 filas. 'firma' agrega a la clave datos que
+    cambian con las filas contadas sin tener versión global (ej: firma_contadores).
+    """
+    from models import db  # Importación diferida
+
+    query = query.options(lazyload('*')).order_by(None)
+    compilada = query.statement.compile()
+    firma = f"{compilada}|{sorted(compilada.params.items())}|{tope}|{version_cache(*versiones)}|{firma}"
+    clave = hashlib.sha1(firma.encode()).hexdigest()
+
+    total = _conteos.obtener(clave)
+    if total is None:
+        if tope is not None:
+            query = query.limit(tope + 1)
+        total = db.session.scalar(select(func.count()).select_from(query.subquery()))
+        _conteos.guardar(clave, total)
+    return total
+
+def paginar(query, page, per_page, versiones=(), firma=''):
+    """
+    Como query.paginate(page=..., per_page=..., error_out=False).
+    'versiones': nombres de version_cache que cambian cuando cambian las filas del listado.
+    """
+    return PaginacionConConteo(page=page, per_page=per_page, error_out=False, query=query, versiones=versiones,
+                               firma=firma)
+
+def paginar_en_flujo(query, page, per_page, versiones=(), firma=''):
+    """Como paginar(), pero devuelve (paginación, filas de la página para render_en_flujo)."""
+    paginacion = PaginacionEnFlujo(page=page, per_page=per_page, max_per_page=None, error_out=False,
+                                   query=query, versiones=versiones, firma=firma)
+    return paginacion, filas_en_flujo(query.limit(per_page).offset((paginacion.page - 1) * per_page))
+
+def init_paginacion(app):
+    """Dimensiona la caché local de conteos."""
+    _conteos.ttl = app.config['PAGINACION_CONTEO_TTL']
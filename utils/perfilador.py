@@ -0,0 +1,214 @@
+# utils/perfilador.py
+"""
+Perfilador por muestreo para peticiones de producción.
+
+Una petición se perfila si:
+  - cae dentro de la fracción configurada (PERFILADOR_FRACCION, ej: 0.01 = 1%), o
+  - trae la cabecera X-Perfilar con un token firmado generado por un Admin en /admin/perfiles.
+
+Mientras dura la petición, un hilo toma una muestra de la pila del hilo que la atiende
+cada PERFILADOR_INTERVALO segundos (sin instrumentar cada llamada, por eso el costo es bajo).
+Las pilas se guardan agregadas en formato "folded" (raíz;...;hoja cantidad), listo para
+flamegraph.pl o speedscope, junto con la ruta, el usuario y el tiempo en BD.
+
+Con workers gevent no está disponible (PERFILADOR_HABILITADO = False): la petición corre en
+un greenlet cuyo id no aparece en sys._current_frames(), y los perfiles saldrían vacíos.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from flask_login import current_user
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import event
+
+CABECERA = 'X-Perfilar'
+PROFUNDIDAD_MAXIMA = 128
+
+class Muestreador(threading.Thread):
+    """Toma muestras periódicas de la pila de un hilo y las agrega por pila completa."""
+
+    def __init__(self, hilo_id, intervalo):
+        super().__init__(daemon=True)
+        self.hilo_id = hilo_id
+        self.intervalo = intervalo
+        self.pilas = {}
+        self.muestras = 0
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            frame = sys._current_frames().get(self.hilo_id)
+            if frame is None:
+                continue
+            pila = []
+            while frame is not None and len(pila) < PROFUNDIDAD_MAXIMA:
+                codigo = frame.f_code
+                pila.append(f"{codigo.co_name} ({_ruta_corta(codigo.co_filename)}:{codigo.co_firstlineno})")
+                frame = frame.f_back
+            clave = ';'.join(reversed(pila))
+            self.pilas[clave] = self.pilas.get(clave, 0) + 1
+            self.muestras += 1
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+
+def _ruta_corta(archivo):
+    """Acorta rutas de site-packages y del proyecto para que el flame graph sea legible."""
+    for marca in ('site-packages' + os.sep, os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep):
+        if marca in archivo:
+            return archivo.split(marca, 1)[1]
+    return archivo
+
+def _serializador(app):
+    return URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='perfilador')
+
+def generar_token_perfilado(app, usuario):
+    """Token firmado para la cabecera X-Perfilar (vence según PERFILADOR_TOKEN_TTL)."""
+    return _serializador(app).dumps({'admin': usuario.id})
+
+def _token_valido(app, valor):
+    try:
+        _serializador(app).loads(valor, max_age=app.config['PERFILADOR_TOKEN_TTL'])
+        return True
+    except BadSignature:
+        return False
+
+def directorio_perfiles(app):
+    return app.config.get('PERFILADOR_DIR') or os.path.join(app.instance_path, 'perfiles')
+
+def listar_perfiles(app):
+    """Metadatos de los perfiles guardados, del más reciente al más antiguo."""
+    directorio = directorio_perfiles(app)
+    if not os.path.isdir(directorio):
+        return []
+    perfiles = []
+    for nombre in sorted(os.listdir(directorio), reverse=True):
+        if not nombre.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directorio, nombre), encoding='utf-8') as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            continue
+        datos.pop('pilas', None)
+        datos['archivo'] = nombre[:-len('.json')]
+        perfiles.append(datos)
+    return perfiles
+
+def leer_perfil_folded(app, nombre):
+    """Pilas del perfil en formato folded (una línea por pila). None si no existe."""
+    ruta = os.path.join(directorio_perfiles(app), os.path.basename(nombre) + '.json')
+    if not os.path.isfile(ruta):
+        return None
+    with open(ruta, encoding='utf-8') as f:
+        pilas = json.load(f)['pilas']
+    return ''.join(f"{pila} {cantidad}\n" for pila, cantidad in sorted(pilas.items()))
+
+def _guardar_perfil(app, perfil):
+    directorio = directorio_perfiles(app)
+    os.makedirs(directorio, exist_ok=True)
+    nombre = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.json"
+    with open(os.path.join(directorio, nombre), 'w', encoding='utf-8') as f:
+        json.dump(perfil, f, ensure_ascii=False)
+
+    # Retención: se conservan solo los más recientes
+    archivos = sorted(a for a in os.listdir(directorio) if a.endswith('.json'))
+    for antiguo in archivos[:-app.config['PERFILADOR_MAX_ARCHIVOS']]:
+        try:
+            os.remove(os.path.join(directorio, antiguo))
+        except OSError:
+            pass
+
+def init_perfilador(app):
+    """Registra los hooks del perfilador y el conteo de tiempo en BD."""
+    from models import db  # Importación diferida
+
+    app.config.setdefault('PERFILADOR_HABILITADO', os.getenv('GUNICORN_WORKER_CLASS') != 'gevent')
+    app.config.setdefault('PERFILADOR_FRACCION', float(os.getenv('PERFILADOR_FRACCION', 0)))
+    app.config.setdefault('PERFILADOR_INTERVALO', float(os.getenv('PERFILADOR_INTERVALO', 0.005)))
+    app.config.setdefault('PERFILADOR_ENDPOINTS', [e for e in os.getenv('PERFILADOR_ENDPOINTS', '').split(',') if e])
+    app.config.setdefault('PERFILADOR_TOKEN_TTL', 3600)
+    app.config.setdefault('PERFILADOR_MAX_ARCHIVOS', 500)
+
+    if not app.config['PERFILADOR_HABILITADO'] and app.config['PERFILADOR_FRACCION']:
+        app.logger.warning("PERFILADOR_FRACCION se ignora: el perfilador no funciona con workers gevent.")
+
+    def debe_perfilar():
+        if not app.config['PERFILADOR_HABILITADO']:
+            return False
+        if request.endpoint in (None, 'static', 'metrics') or (request.endpoint or '').startswith('admin.perfil'):
+            return False
+        token = request.headers.get(CABECERA)
+        if token:
+            return _token_valido(app, token)
+        endpoints = app.config['PERFILADOR_ENDPOINTS']
+        if endpoints and request.endpoint not in endpoints:
+            return False
+        fraccion = app.config['PERFILADOR_FRACCION']
+        return fraccion > 0 and random.random() < fraccion
+
+    with app.app_context():
+        for engine in db.engines.values():
+            @event.listens_for(engine, 'before_cursor_execute')
+            def antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+                if has_request_context() and g.get('_perfil'):
+                    conn.info.setdefault('_perfil_inicio', []).append(time.perf_counter())
+
+            @event.listens_for(engine, 'after_cursor_execute')
+            def despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+                inicios = conn.info.get('_perfil_inicio')
+                if inicios and has_request_context() and g.get('_perfil'):
+                    g._perfil['bd_s'] += time.perf_counter() - inicios.pop()
+                    g._perfil['consultas'] += 1
+
+    @app.before_request
+    def iniciar_perfil():
+        if not debe_perfilar():
+            return
+        muestreador = Muestreador(threading.get_ident(), app.config['PERFILADOR_INTERVALO'])
+        g._perfil = {'inicio': time.perf_counter(), 'bd_s': 0.0, 'consultas': 0, 'muestreador': muestreador}
+        muestreador.start()
+
+    @app.after_request
+    def anotar_respuesta(response):
+        perfil = g.get('_perfil')
+        if perfil:
+            perfil['estado'] = response.status_code
+            if current_user.is_authenticated:
+                perfil['usuario_id'] = current_user.id
+                perfil['usuario_nombre'] = current_user.nombre_completo
+        return response
+
+    @app.teardown_request
+    def cerrar_perfil(exc):
+        perfil = g.pop('_perfil', None)
+        if not perfil:
+            return
+        muestreador = perfil['muestreador']
+        muestreador.detener()
+        try:
+            _guardar_perfil(app, {
+                'fecha': datetime.now().isoformat(timespec='seconds'),
+                'ruta': request.full_path.rstrip('?'),
+                'endpoint': request.endpoint,
+                'metodo': request.method,
+                'estado': perfil.get('estado', 500),
+                'usuario_id': perfil.get('usuario_id'),
+                'usuario_nombre': perfil.get('usuario_nombre'),
+                'duracion_ms': round((time.perf_counter() - perfil['inicio']) * 1000, 1),
+                'bd_ms': round(perfil['bd_s'] * 1000, 1),
+                'consultas': perfil['consultas'],
+                'muestras': muestreador.muestras,
+                'intervalo_ms': app.config['PERFILADOR_INTERVALO'] * 1000,
+                'pilas': muestreador.pilas,
+            })
+        except OSError as e:
+            print(f"Error al guardar perfil: {e}")
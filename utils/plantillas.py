@@ -0,0 +1,160 @@
+# utils/plantillas.py
+"""
+Plantillas ya compiladas al arrancar un worker, y calentamiento antes de recibir tráfico.
+
+- Caché de bytecode de Jinja en disco (PLANTILLAS_CACHE_DIR, por defecto instance/jinja_cache):
+  un worker nuevo carga el código compilado en vez de parsear y compilar base.html,
+  _macros.html y cada página en su primera visita. Jinja descarta la entrada de una
+  plantilla si su fuente cambió (guarda el checksum), así que no hay que limpiarla al desplegar.
+- 'flask precompilar-plantillas' (en el despliegue) llena esa caché con todo templates/.
+- calentar_worker(app) (hook post_worker_init de gunicorn.conf.py, CALENTAR_WORKERS=1):
+  carga las plantillas, los catálogos en caché y abre las conexiones del pool
+  antes de que el worker acepte peticiones.
+- render_en_flujo(): para listados largos (logs con página ampliada, equipo completo)
+  envía el layout y el encabezado de la tabla de inmediato y luego las filas a medida
+  que se leen por lotes de la BD, sin armar la página completa en memoria.
+  respuesta_en_flujo() es la base común (también para la exportación NDJSON de la API).
+"""
+import os
+import time
+
+from flask import Response, current_app, get_flashed_messages, render_template, stream_with_context
+from flask_wtf.csrf import generate_csrf
+from jinja2 import FileSystemBytecodeCache
+
+# Tamaño aproximado (caracteres) de cada bloque enviado al cliente
+TAMANO_BLOQUE = 16 * 1024
+
+def directorio_plantillas_cache(app):
+    return app.config.get('PLANTILLAS_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+
+def cargar_plantillas(app):
+    """Compila (o lee de la caché de bytecode) todas las plantillas. Devuelve cuántas cargó."""
+    nombres = app.jinja_env.list_templates(extensions=['html'])
+    for nombre in nombres:
+        app.jinja_env.get_template(nombre)
+    return len(nombres)
+
+def _abrir_pool(engine):
+    """Abre a la vez tantas conexiones como el tamaño del pool y las devuelve a él."""
+    tamano = engine.pool.size() if hasattr(engine.pool, 'size') else 1
+    conexiones = []
+    try:
+        for _ in range(tamano):
+            conexion = engine.connect()
+            conexion.exec_driver_sql('SELECT 1')
+            conexiones.append(conexion)
+    finally:
+        for conexion in conexiones:
+            conexion.close()
+    return len(conexiones)
+
+def calentar_worker(app):
+    """Deja listo un worker recién creado: plantillas, catálogos y conexiones a la BD."""
+    from models import db  # Importación diferida
+    from .catalogos import obtener_catalogos
+
+    inicio = time.perf_counter()
+    plantillas = cargar_plantillas(app)
+    with app.app_context():
+        obtener_catalogos()
+        conexiones = _abrir_pool(db.engine)
+    app.logger.info(f"Worker {os.getpid()} calentado en {(time.perf_counter() - inicio) * 1000:.0f} ms: "
+                    f"{plantillas} plantillas, {conexiones} conexiones.")
+
+class FilasEnFlujo:
+    """
+    Filas de una consulta leídas de a 'lote' (yield_per: cursor del lado del servidor en
+    MySQL), para recorrerlas una sola vez desde una plantilla en flujo.
+    'lote_nuevo' queda en True cada vez que se acaba de leer un lote de la BD.
+    """
+
+    def __init__(self, query, lote):
+        self._query = query
+        self.lote = lote
+        self.leidas = 0
+        self.lote_nuevo = False
+
+    def __iter__(self):
+        for fila in self._query.yield_per(self.lote):
+            if self.leidas % self.lote == 0:
+                self.lote_nuevo = True
+            self.leidas += 1
+            yield fila
+
+def filas_en_flujo(query):
+    return FilasEnFlujo(query, current_app.config['LISTADOS_FLUJO_LOTE'])
+
+def respuesta_en_flujo(generar, mimetype, headers=None):
+    """
+    Response cuyo cuerpo se genera mientras se envía. 'generar()' devuelve el generador y
+    corre dentro del contexto de la petición, con la misma sesión de BD de la vista:
+    Flask-SQLAlchemy la cerraría al terminar la vista, antes de enviar el cuerpo, así que
+    se saca del registro y el flujo la retoma con los objetos ya cargados (current_user, etc.).
+    """
+    from models import db  # Importación diferida
+
+    sesion = db.session()
+    db.session.registry.clear()
+
+    def flujo():
+        # El teardown al final del flujo cierra esta sesión como cierra la de cualquier vista
+        db.session.registry.set(sesion)
+        yield from generar()
+
+    respuesta = Response(stream_with_context(flujo()), mimetype=mimetype,
+                         headers={'X-Accel-Buffering': 'no', **(headers or {})})
+    respuesta.call_on_close(sesion.close)  # Por si el cliente corta antes de empezar el flujo
+    return respuesta
+
+def _en_bloques(plantilla, filas, contexto):
+    """
+    Genera la plantilla y agrupa sus fragmentos (uno por nodo de Jinja) en bloques de
+    ~TAMANO_BLOQUE. Antes de cada lote leído de la BD se envía lo acumulado: primero el
+    layout y el encabezado de la tabla, después las filas del lote anterior.
+    """
+    # Lo mismo que flask.stream_template, sin su propio stream_with_context anidado
+    contexto = dict(contexto, filas=filas)
+    current_app.update_template_context(contexto)
+    fragmentos = current_app.jinja_env.get_template(plantilla).generate(contexto)
+    bloque = []
+    acumulado = 0
+    try:
+        for fragmento in fragmentos:
+            if filas.lote_nuevo:
+                filas.lote_nuevo = False
+                if bloque:
+                    yield ''.join(bloque)
+                    bloque, acumulado = [], 0
+            bloque.append(fragmento)
+            acumulado += len(fragmento)
+            if acumulado >= TAMANO_BLOQUE:
+                yield ''.join(bloque)
+                bloque, acumulado = [], 0
+        if bloque:
+            yield ''.join(bloque)
+    finally:
+        fragmentos.close()
+
+def render_en_flujo(plantilla, filas, **contexto):
+    """
+    Como render_template(plantilla, filas=filas, ...). Si 'filas' es un FilasEnFlujo la
+    respuesta se genera mientras se envía (la plantilla debe recorrerlas una sola vez);
+    si es una lista (página normal) o LISTADOS_FLUJO=0, se renderiza completa, como antes.
+    """
+    if not isinstance(filas, FilasEnFlujo) or not current_app.config['LISTADOS_FLUJO_HABILITADO']:
+        return render_template(plantilla, filas=list(filas), **contexto)
+
+    # La cookie de sesión se escribe antes de enviar el cuerpo: lo que la plantilla
+    # saque o agregue a la sesión (mensajes flash, token CSRF) debe resolverse ahora.
+    get_flashed_messages(with_categories=True)
+    generate_csrf()
+    return respuesta_en_flujo(lambda: _en_bloques(plantilla, filas, contexto), 'text/html')
+
+def init_plantillas(app):
+    """Activa la caché de bytecode de Jinja (salvo PLANTILLAS_CACHE=0)."""
+    if not app.config['PLANTILLAS_CACHE_HABILITADO']:
+        return
+    directorio = directorio_plantillas_cache(app)
+    os.makedirs(directorio, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directorio)
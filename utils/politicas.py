@@ -0,0 +1,89 @@
+# utils/politicas.py
+"""
+Alcance de permisos de un usuario sobre los demás: a quién ve, a quién anota, qué exporta.
+
+Reúne las reglas que estaban repartidas entre las vistas:
+- visibles:  subordinados en la jerarquía (donde es jefe directo o segundo jefe, más toda
+             la cadena de jefes directos hacia abajo). Puede ver su libro, sus comentarios
+             y exportarlo a PDF (igual que es_superior_jerarquico).
+- anotables: a quién puede escribirle comentarios (reglas por rol de filtro_puede_anotar).
+- directos:  subordinados directos (ver el equipo de un encargado).
+El Admin tiene alcance total y no guarda listas de ids.
+
+Se calcula con tres consultas (la cadena con una CTE recursiva) y se guarda en la caché
+local del proceso junto a la versión 'usuarios', que se incrementa al crear, editar o
+activar usuarios: un cambio de jerarquía invalida los alcances de todos los workers.
+Dentro de una petición se memoriza en g (alcance_actual()).
+"""
+from flask import g
+from flask_login import current_user
+from sqlalchemy import select, true
+
+from .cache import CacheLocal, version_cache
+from .helpers import filtro_puede_anotar
+
+_alcances = CacheLocal(max_entradas=2000, ttl=600)
+
+class Alcance:
+    """Respuestas de permisos de un usuario, individuales o por lote."""
+
+    def __init__(self, usuario_id, rol, visibles=frozenset(), anotables=frozenset(), directos=frozenset()):
+        self.usuario_id = usuario_id
+        self.rol = rol
+        self.es_admin = (rol == 'Admin')
+        self.visibles = frozenset(visibles)
+        self.anotables = frozenset(anotables)
+        self.directos = frozenset(directos)
+
+    def puede_ver(self, usuario_id):
+        """Libro, comentarios y PDF de 'usuario_id' (incluye el propio)."""
+        return self.es_admin or usuario_id == self.usuario_id or usuario_id in self.visibles
+
+    puede_exportar = puede_ver
+
+    def puede_anotar(self, usuario_id):
+        return self.es_admin or usuario_id in self.anotables
+
+    def puede_ver_equipo(self, encargado_id):
+        return self.es_admin or encargado_id in self.directos
+
+    def filtro_visibles(self, columna):
+        """Condición SQL para limitar una consulta a los usuarios que puede ver."""
+        return true() if self.es_admin else columna.in_(self.visibles | {self.usuario_id})
+
+    def filtro_anotables(self, columna):
+        """Condición SQL para limitar una consulta a los usuarios que puede anotar."""
+        return true() if self.es_admin else columna.in_(self.anotables)
+
+def _calcular_alcance(usuario):
+    from models import db, Usuario  # Importación diferida
+
+    rol = usuario.rol.nombre
+    if rol == 'Admin':
+        return Alcance(usuario.id, rol)
+
+    # Cadena de jefes directos hacia abajo (UNION descarta repetidos, así que tolera ciclos)
+    cadena = select(Usuario.id).where(Usuario.jefe_directo_id == usuario.id).cte('cadena', recursive=True)
+    anterior = cadena.alias()
+    cadena = cadena.union(select(Usuario.id).join(anterior, Usuario.jefe_directo_id == anterior.c.id))
+    visibles = db.session.scalars(
+        select(cadena.c.id).union(select(Usuario.id).where(Usuario.segundo_jefe_id == usuario.id))
+    ).all()
+    anotables = db.session.scalars(select(Usuario.id).where(filtro_puede_anotar(usuario))).all()
+    directos = db.session.scalars(select(Usuario.id).where(Usuario.jefe_directo_id == usuario.id)).all()
+    return Alcance(usuario.id, rol, visibles, anotables, directos)
+
+def alcance_de(usuario):
+    """Alcance de 'usuario', desde la caché local mientras no cambie la versión 'usuarios'."""
+    clave = (usuario.id, version_cache('usuarios'))
+    alcance = _alcances.obtener(clave)
+    if alcance is None:
+        alcance = _calcular_alcance(usuario)
+        _alcances.guardar(clave, alcance)
+    return alcance
+
+def alcance_actual():
+    """Alcance del usuario conectado (una vez por petición)."""
+    if '_alcance' not in g:
+        g._alcance = alcance_de(current_user)
+    return g._alcance
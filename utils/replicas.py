@@ -0,0 +1,70 @@
+# utils/replicas.py
+"""
+Enrutamiento de lecturas a réplicas de la BD.
+
+Si se define DATABASE_REPLICA_URL (una o varias URL separadas por coma), create_app
+registra cada réplica como bind 'replica1', 'replica2', ... y SesionEnrutada envía a
+una de ellas los SELECT de las vistas marcadas con @solo_lectura.
+
+Lectura de las propias escrituras:
+  - Dentro de una misma sesión, después de cualquier escritura todo vuelve a la primaria.
+  - Tras una escritura, la sesión del navegador queda marcada y durante
+    REPLICA_VENTANA_ESCRITURA segundos sus lecturas también van a la primaria
+    (cubre el redirect posterior a crear/aceptar un comentario mientras la réplica se pone al día).
+"""
+import random
+import time
+
+from flask import current_app, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+
+PREFIJO_REPLICA = 'replica'
+CLAVE_ULTIMA_ESCRITURA = '_ultima_escritura'
+
+def binds_replicas(urls):
+    """Convierte 'url1,url2' en el diccionario SQLALCHEMY_BINDS de las réplicas."""
+    lista = [u.strip() for u in urls.split(',') if u.strip()]
+    return {f'{PREFIJO_REPLICA}{i}': url for i, url in enumerate(lista, start=1)}
+
+def _es_vista_solo_lectura():
+    vista = current_app.view_functions.get(request.endpoint) if request.endpoint else None
+    return getattr(vista, '_solo_lectura', False)
+
+def _escritura_reciente():
+    ultima = session.get(CLAVE_ULTIMA_ESCRITURA)
+    return bool(ultima) and time.time() - ultima < current_app.config.get('REPLICA_VENTANA_ESCRITURA', 10)
+
+class SesionEnrutada(Session):
+    """Sesión de Flask-SQLAlchemy que reparte lecturas entre la primaria y las réplicas."""
+
+    def _replica_elegida(self):
+        """Engine de réplica para esta sesión (se decide una vez y se mantiene hasta que termine)."""
+        if 'replica' not in self.info:
+            replicas = [engine for clave, engine in self._db.engines.items()
+                        if isinstance(clave, str) and clave.startswith(PREFIJO_REPLICA)]
+            usar = (replicas and has_request_context() and _es_vista_solo_lectura()
+                    and not _escritura_reciente())
+            self.info['replica'] = random.choice(replicas) if usar else None
+        return self.info['replica']
+
+    def _marcar_escritura(self):
+        self.info['escritura'] = True
+        if has_request_context():
+            session[CLAVE_ULTIMA_ESCRITURA] = time.time()
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+
+        es_lectura = (not self._flushing and clause is not None
+                      and getattr(clause, 'is_select', False)
+                      and getattr(clause, '_for_update_arg', None) is None)
+        if not es_lectura:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                self._marcar_escritura()
+        elif not self.info.get('escritura'):
+            replica = self._replica_elegida()
+            if replica is not None:
+                return replica
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,129 @@
+# utils/reportes.py
+"""
+Generación de reportes (PDF del Libro de Novedades).
+
+Este módulo NO se re-exporta desde utils/__init__.py: se importa dentro de las vistas
+que lo usan, así fpdf2 (y sus dependencias) solo se cargan en el worker que genera
+un reporte y no en cada proceso al arrancar la app.
+"""
+from datetime import date
+
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+from .metricas import PDF_DURACION
+
+TEXTO_LEGAL = (
+    "El registro de información en esta aplicación tiene carácter exclusivamente orientador y de ayuda memoria "
+    "para la gestión diaria entre el jefe directo y funcionario. No constituye antecedente válido para el proceso "
+    "de Calificación Funcionaria. Para efectos de evaluación del desempeño, se considerarán únicamente las "
+    "Anotaciones de Mérito y de Demérito debidamente formalizadas según la normativa vigente."
+)
+
+@PDF_DURACION.time()
+def generar_pdf_libro(funcionario, comentarios, periodo_reporte=""):
+    """Construye el PDF del libro de novedades de un funcionario y devuelve sus bytes."""
+    fecha_actual = date.today().strftime('%d/%m/%Y')
+
+    pdf = FPDF(orientation='P', unit='mm', format='Letter')
+    pdf.add_page()
+    pdf.set_font('Helvetica', '', 11)
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    pdf.set_font('Helvetica', 'B', 16)
+    pdf.cell(0, 10, 'Reporte de Registros de Eventos Funcionarios', new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C') 
+    pdf.ln(10)
+
+    pdf.set_font('Helvetica', '', 11)
+    pdf.set_fill_color(248, 249, 250)
+    pdf.set_draw_color(222, 226, 230)
+    pdf.set_line_width(0.3)
+    info = (
+        f"Funcionario: {funcionario.nombre_completo}\n"
+        f"RUT: {funcionario.rut}\n"
+        f"Unidad: {funcionario.unidad.nombre}\n"
+        f"Fecha de Generacion: {fecha_actual}\n"
+    )
+    if periodo_reporte:
+         info += f"{periodo_reporte}"
+
+    pdf.multi_cell(0, 6, info, border=1, fill=True, new_x=XPos.LMARGIN, new_y=YPos.NEXT, padding=5)
+    pdf.ln(10)
+
+    if not comentarios:
+        pdf.set_font('Helvetica', '', 11)
+        pdf.cell(0, 10, 'El funcionario no tiene comentarios registrados para los filtros seleccionados.', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    else:
+        ancho_etiqueta = 60
+        ancho_valor = pdf.w - pdf.l_margin - pdf.r_margin - ancho_etiqueta
+        altura_linea = 6
+
+        for comentario in comentarios:
+            table_data = [
+                ("Tipo de Comentario", comentario.tipo, True),
+                ("Factor / Sub-Factor", f"{comentario.subfactor.factor.nombre} / {comentario.subfactor.nombre}", False),
+                ("Creada por (Jefatura)", comentario.jefe.nombre_completo, False),
+                ("Estado", comentario.estado, False),
+                ("Motivo (Jefatura)", comentario.motivo_jefe or 'Sin respuesta.', False),
+                ("Observaciones (Funcionario)", comentario.observacion_funcionario or 'Sin respuesta.', False),
+            ]
+            if comentario.fecha_aceptacion:
+                table_data.append(("Fecha Aceptacion", comentario.fecha_aceptacion.strftime('%d/%m/%Y a las %H:%M:%S'), False))
+
+            altura_total_tabla = 8 
+            pdf.set_font('Helvetica', 'B', 10)
+            lineas_por_fila = []
+            for etiqueta, valor, _ in table_data:
+                lineas_etiqueta = len(pdf.multi_cell(w=ancho_etiqueta, h=altura_linea, txt=etiqueta, dry_run=True, split_only=True))
+                pdf.set_font('Helvetica', '', 10)
+                lineas_valor = len(pdf.multi_cell(w=ancho_valor, h=altura_linea, txt=str(valor), dry_run=True, split_only=True))
+                lineas_max = max(lineas_etiqueta, lineas_valor)
+                lineas_por_fila.append(lineas_max)
+                altura_total_tabla += lineas_max * altura_linea
+
+            if pdf.get_y() + altura_total_tabla > pdf.page_break_trigger:
+                pdf.add_page()
+            
+            pdf.set_font('Helvetica', 'B', 11)
+            pdf.set_fill_color(52, 73, 94)
+            pdf.set_text_color(255, 255, 255)
+            pdf.cell(0, 8, f"Folio #{comentario.folio} - Fecha: {comentario.fecha_creacion.strftime('%d/%m/%Y')}", border=1, new_x=XPos.LMARGIN, new_y=YPos.NEXT, fill=True, align='C')
+            pdf.set_text_color(0, 0, 0)
+            pdf.set_draw_color(204, 204, 204)
+            pdf.set_line_width(0.2)
+
+            for i, (etiqueta, valor, es_tipo) in enumerate(table_data):
+                y_antes = pdf.get_y()
+                num_lineas = lineas_por_fila[i]
+                altura_celda = num_lineas * altura_linea
+
+                pdf.set_font('Helvetica', 'B', 10)
+                pdf.multi_cell(ancho_etiqueta, altura_linea, etiqueta, border='L', align='L', new_x=XPos.RIGHT, new_y=YPos.TOP, max_line_height=altura_linea) 
+                
+                pdf.set_xy(pdf.l_margin + ancho_etiqueta, y_antes)
+                
+                pdf.set_font('Helvetica', '', 10)
+                if es_tipo:
+                    if valor == 'Favorable':
+                        pdf.set_text_color(25, 135, 84)
+                    else:
+                        pdf.set_text_color(220, 53, 69)
+                
+                pdf.multi_cell(ancho_valor, altura_linea, str(valor), border='R', align='L', new_x=XPos.LMARGIN, new_y=YPos.NEXT, max_line_height=altura_linea) 
+                
+                pdf.set_text_color(0, 0, 0)
+                pdf.line(pdf.l_margin, y_antes + altura_celda, pdf.w - pdf.r_margin, y_antes + altura_celda)
+                pdf.set_y(y_antes + altura_celda) 
+
+            pdf.ln(10)
+
+    if pdf.get_y() > 230:
+        pdf.add_page()
+        
+    pdf.ln(5)
+    pdf.set_font('Helvetica', 'I', 9) 
+    pdf.set_text_color(100, 100, 100)
+    
+    pdf.multi_cell(0, 5, TEXTO_LEGAL, align='C')
+
+    return bytes(pdf.output())
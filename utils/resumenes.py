@@ -0,0 +1,153 @@
+# utils/resumenes.py
+"""
+Resúmenes periódicos por correo ('flask enviar-resumenes', pensado para un cron diario).
+
+- A cada funcionario: sus comentarios que siguen 'Pendiente' hace más de N días.
+- A cada jefatura: los comentarios que escribió y fueron aceptados en el período,
+  más cuántos siguen pendientes (en vez de revisar el libro de cada persona).
+
+Cada tipo sale de una sola consulta (filas ordenadas y agrupadas en memoria). Los correos
+se envían en un lote por sesión SMTP con ritmo limitado, y cada envío queda en
+'envios_resumen' para no repetir el mismo resumen a la misma persona antes de 'min_horas'.
+Los mensajes usan url_for: llamar dentro de un contexto de petición (ver comandos.py).
+"""
+from datetime import timedelta
+
+from flask import url_for
+from markupsafe import escape
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import aliased
+
+from models import db, Comentario, EnvioResumen, Usuario, obtener_hora_chile
+from .email import enviar_correos_lote, get_email_template
+
+def _enviados_recientes(tipo, min_horas):
+    limite = obtener_hora_chile() - timedelta(hours=min_horas)
+    return set(db.session.scalars(
+        select(EnvioResumen.usuario_id).where(EnvioResumen.tipo == tipo, EnvioResumen.fecha >= limite)
+    ))
+
+def pendientes_por_funcionario(dias, min_horas):
+    """{usuario_id: {'nombre', 'email', 'comentarios': [(folio, tipo, fecha)]}} con pendientes de más de 'dias' días."""
+    limite = obtener_hora_chile().date() - timedelta(days=dias)
+    excluidos = _enviados_recientes('Pendientes', min_horas)
+    filas = db.session.execute(
+        select(Usuario.id, Usuario.nombre_completo, Usuario.email,
+               Comentario.folio, Comentario.tipo, Comentario.fecha_creacion)
+        .join(Comentario, Comentario.funcionario_id == Usuario.id)
+        .where(Comentario.estado == 'Pendiente', Comentario.fecha_creacion <= limite, Usuario.activo == True)
+        .order_by(Usuario.id, Comentario.fecha_creacion, Comentario.folio)
+    )
+    grupos = {}
+    for usuario_id, nombre, email, folio, tipo, fecha in filas:
+        if usuario_id in excluidos:
+            continue
+        grupo = grupos.setdefault(usuario_id, {'nombre': nombre, 'email': email, 'comentarios': []})
+        grupo['comentarios'].append((folio, tipo, fecha))
+    return grupos
+
+def resumen_por_jefatura(periodo_dias, min_horas):
+    """
+    {jefe_id: {'nombre', 'email', 'aceptados': [(folio, funcionario, fecha_aceptacion)],
+               'pendientes': n, 'pendiente_mas_antiguo': fecha}} de los comentarios que escribió cada jefatura.
+    """
+    desde = obtener_hora_chile() - timedelta(days=periodo_dias)
+    excluidos = _enviados_recientes('Jefatura', min_horas)
+    Funcionario = aliased(Usuario)
+    filas = db.session.execute(
+        select(Usuario.id, Usuario.nombre_completo, Usuario.email, Comentario.folio, Comentario.estado,
+               Comentario.fecha_creacion, Comentario.fecha_aceptacion, Funcionario.nombre_completo)
+        .join(Comentario, Comentario.jefe_id == Usuario.id)
+        .join(Funcionario, Funcionario.id == Comentario.funcionario_id)
+        .where(Usuario.activo == True, or_(
+            Comentario.estado == 'Pendiente',
+            and_(Comentario.estado == 'Aceptada', Comentario.fecha_aceptacion >= desde)
+        ))
+        .order_by(Usuario.id, Comentario.folio)
+    )
+    grupos = {}
+    for jefe_id, nombre, email, folio, estado, fecha_creacion, fecha_aceptacion, funcionario in filas:
+        if jefe_id in excluidos:
+            continue
+        grupo = grupos.setdefault(jefe_id, {'nombre': nombre, 'email': email, 'aceptados': [],
+                                            'pendientes': 0, 'pendiente_mas_antiguo': None})
+        if estado == 'Aceptada':
+            grupo['aceptados'].append((folio, funcionario, fecha_aceptacion))
+        else:
+            grupo['pendientes'] += 1
+            if grupo['pendiente_mas_antiguo'] is None or fecha_creacion < grupo['pendiente_mas_antiguo']:
+                grupo['pendiente_mas_antiguo'] = fecha_creacion
+    return grupos
+
+def _boton_sistema():
+    return f"""
+        <div style="text-align: center; margin: 30px 0;">
+            <a href="{url_for('auth.login', _external=True)}" style="background-color: #275c80; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; font-weight: bold;">
+                Ingresar al Sistema
+            </a>
+        </div>
+    """
+
+def mensaje_pendientes(datos, dias):
+    """(destinatario, asunto, html) del recordatorio de comentarios pendientes."""
+    filas = ''.join(
+        f"<li>Folio #{folio} ({tipo}) del {fecha.strftime('%d-%m-%Y')}</li>"
+        for folio, tipo, fecha in datos['comentarios']
+    )
+    cantidad = len(datos['comentarios'])
+    contenido = f"""
+        <p>Hola <strong>{escape(datos['nombre'])}</strong>,</p>
+        <p>Tienes {cantidad} comentario{'s' if cantidad != 1 else ''} en tu Libro de Novedades pendiente{'s' if cantidad != 1 else ''} de revisión hace más de {dias} días:</p>
+        <ul>{filas}</ul>
+        <p>Recuerda ingresar y marcar "Tomo conocimiento" en cada uno.</p>
+        {_boton_sistema()}
+    """
+    html = get_email_template("Comentarios Pendientes de Revisión", contenido)
+    return datos['email'], f'Tienes {cantidad} comentario(s) pendiente(s) en tu Libro de Novedades', html
+
+def mensaje_jefatura(datos, periodo_dias):
+    """(destinatario, asunto, html) del resumen de aceptaciones para una jefatura."""
+    aceptados = ''.join(
+        f"<li>Folio #{folio}: {escape(funcionario)} ({fecha.strftime('%d-%m-%Y')})</li>"
+        for folio, funcionario, fecha in datos['aceptados']
+    ) or '<li>Ninguno en este período.</li>'
+    pendientes = ''
+    if datos['pendientes']:
+        pendientes = (f"<p>Siguen pendientes de revisión <strong>{datos['pendientes']}</strong> comentarios "
+                      f"(el más antiguo del {datos['pendiente_mas_antiguo'].strftime('%d-%m-%Y')}).</p>")
+    contenido = f"""
+        <p>Hola <strong>{escape(datos['nombre'])}</strong>,</p>
+        <p>Comentarios que registraste y fueron aceptados en los últimos {periodo_dias} días:</p>
+        <ul>{aceptados}</ul>
+        {pendientes}
+        {_boton_sistema()}
+    """
+    html = get_email_template("Resumen de Comentarios de tu Equipo", contenido)
+    return datos['email'], 'Resumen de comentarios aceptados - Libro de Novedades', html
+
+def enviar_resumenes(dias_pendiente=3, periodo_dias=7, min_horas=20, por_minuto=None, simular=False):
+    """
+    Arma y envía ambos resúmenes. Retorna (preparados, enviados).
+    Con 'simular' solo cuenta los correos que se enviarían.
+    """
+    mensajes, registros = [], []
+    for usuario_id, datos in pendientes_por_funcionario(dias_pendiente, min_horas).items():
+        mensajes.append(mensaje_pendientes(datos, dias_pendiente))
+        registros.append(EnvioResumen(usuario_id=usuario_id, tipo='Pendientes', cantidad=len(datos['comentarios'])))
+    for jefe_id, datos in resumen_por_jefatura(periodo_dias, min_horas).items():
+        mensajes.append(mensaje_jefatura(datos, periodo_dias))
+        registros.append(EnvioResumen(usuario_id=jefe_id, tipo='Jefatura',
+                                      cantidad=len(datos['aceptados']) + datos['pendientes']))
+
+    if simular or not mensajes:
+        return len(mensajes), 0
+
+    def registrar_envio(i):
+        # Commit por correo: el lote puede durar una hora (por_minuto) y, si el proceso muere a
+        # medias, la próxima ejecución no debe repetir lo ya entregado
+        db.session.add(registros[i])
+        db.session.commit()
+
+    # Solo se registran los aceptados por el servidor: los fallidos se reintentan en la próxima ejecución
+    enviados = enviar_correos_lote(mensajes, por_minuto=por_minuto, al_enviar=registrar_envio)
+    return len(mensajes), enviados
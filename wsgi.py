@@ -0,0 +1,10 @@
+# wsgi.py
+"""
+Punto de entrada WSGI para producción.
+Uso: gunicorn -c gunicorn.conf.py wsgi:app
+
+El esquema NO se verifica aquí: ejecutar 'flask --app wsgi init-db' en el despliegue.
+"""
+from app import create_app
+
+app = create_app()